@@ -10,3 +10,9 @@ ASSETS_TEXTURES_FOLDER = os.path.join(ASSETS_FOLDER, "textures")
 ASSETS_MODELS_TTM_FOLDER = os.path.join(ASSETS_FOLDER, "models")
 ASSETS_CONFIGS_FOLDER = os.path.join(ASSETS_FOLDER, "configs")
 ASSETS_JSON_FOLDER = os.path.join(ASSETS_FOLDER, "json")
+
+# Folder where derived data (e.g. asset indices) is cached between runs
+CACHE_FOLDER = os.environ.get(
+    "COLOSSEUM_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "colosseum"),
+)
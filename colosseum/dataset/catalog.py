@@ -0,0 +1,370 @@
+import json
+import os
+import pickle
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from colosseum import ASSETS_JSON_FOLDER
+from colosseum.dataset.journal import read_journal
+from colosseum.dataset.utils import (
+    VARIATION_NUMBER,
+    EpisodeInfo,
+    episode_files,
+    episode_length,
+    find_episodes,
+)
+
+CATALOG_FILENAME = "catalog.sqlite"
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    spreadsheet_idx INTEGER NOT NULL,
+    variation_name TEXT,
+    rlbench_variation INTEGER,
+    episode_idx INTEGER NOT NULL,
+    length INTEGER,
+    total_bytes INTEGER,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS factors (
+    task TEXT NOT NULL,
+    spreadsheet_idx INTEGER NOT NULL,
+    factor_type TEXT NOT NULL,
+    factor_name TEXT NOT NULL,
+    enabled INTEGER NOT NULL,
+    PRIMARY KEY (task, spreadsheet_idx, factor_type, factor_name)
+);
+CREATE TABLE IF NOT EXISTS files (
+    episode_id INTEGER NOT NULL REFERENCES episodes(id) ON DELETE CASCADE,
+    relpath TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (episode_id, relpath)
+);
+CREATE INDEX IF NOT EXISTS episodes_task_idx
+    ON episodes (task, spreadsheet_idx);
+CREATE INDEX IF NOT EXISTS factors_enabled_idx
+    ON factors (factor_type, factor_name, enabled);
+"""
+
+
+class DatasetCatalog:
+    """
+    SQLite index of the tasks, variations, episodes and files of a dataset, so
+    that loaders can build file lists without walking the dataset folders
+    """
+
+    def __init__(self, db_path: str, dataset_root: Optional[str] = None):
+        """
+        Opens (or creates) a catalog
+
+        Parameters
+        ----------
+            db_path: str
+                The path to the SQLite database of the catalog
+            dataset_root: Optional[str]
+                The root folder of the dataset. Paths are stored relative to
+                it. If not given, the root stored in the catalog is used, or
+                the folder containing the database for new catalogs
+        """
+        self._db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(CATALOG_SCHEMA)
+
+        stored_root = self._get_meta("dataset_root")
+        if dataset_root is not None:
+            self._dataset_root = os.path.abspath(dataset_root)
+            self._set_meta("dataset_root", self._dataset_root)
+        elif stored_root is not None:
+            self._dataset_root = stored_root
+        else:
+            self._dataset_root = os.path.dirname(os.path.abspath(db_path))
+
+    @property
+    def dataset_root(self) -> str:
+        return self._dataset_root
+
+    def __enter__(self) -> "DatasetCatalog":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row is not None else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    def add_strategy(self, task: str, collection_cfg: Dict[str, Any]) -> None:
+        """
+        Records which variation factors are enabled for each spreadsheet index
+        of a task, given its data collection strategy (parsed from JSON)
+        """
+        for spreadsheet_cfg in collection_cfg["strategy"]:
+            for variation_cfg in spreadsheet_cfg["variations"]:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO factors (task, spreadsheet_idx, "
+                    + "factor_type, factor_name, enabled) "
+                    + "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        task,
+                        spreadsheet_cfg["spreadsheet_idx"],
+                        variation_cfg["type"],
+                        variation_cfg["name"],
+                        int(variation_cfg["enabled"]),
+                    ),
+                )
+
+    def add_episode(self, entry: Dict[str, Any]) -> int:
+        """
+        Adds (or replaces) an episode, given an entry in the same format used
+        by the collection journal. Returns the id of the episode
+        """
+        self._conn.execute(
+            "DELETE FROM episodes WHERE path = ?", (entry["path"],)
+        )
+        files: Dict[str, List[Any]] = entry.get("files", {})
+        cursor = self._conn.execute(
+            "INSERT INTO episodes (task, spreadsheet_idx, variation_name, "
+            + "rlbench_variation, episode_idx, length, total_bytes, path) "
+            + "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["task"],
+                entry["spreadsheet_idx"],
+                entry["variation_name"],
+                entry["rlbench_variation"],
+                entry["episode_idx"],
+                entry["length"],
+                sum(size for size, _ in files.values()),
+                entry["path"],
+            ),
+        )
+        episode_id = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT INTO files (episode_id, relpath, size, sha256) "
+            + "VALUES (?, ?, ?, ?)",
+            [
+                (episode_id, relpath, size, checksum or None)
+                for relpath, (size, checksum) in files.items()
+            ],
+        )
+        return episode_id
+
+    def episodes(
+        self,
+        task: Optional[str] = None,
+        spreadsheet_idx: Optional[int] = None,
+        variation_name: Optional[str] = None,
+        rlbench_variation: Optional[int] = None,
+        factors_enabled: List[str] = [],
+        factors_disabled: List[str] = [],
+    ) -> List[EpisodeInfo]:
+        """
+        Returns the episodes matching all the given filters
+
+        Parameters
+        ----------
+            task: Optional[str]
+                The name of the task the episodes belong to
+            spreadsheet_idx: Optional[int]
+                The spreadsheet index the episodes were collected for
+            variation_name: Optional[str]
+                The variation name from the data collection strategy
+            rlbench_variation: Optional[int]
+                The RLBench variation number used for the episodes
+            factors_enabled: List[str]
+                Factors that must be enabled, given either by type (e.g.
+                "light_color") or by name (e.g. "manip_obj_color")
+            factors_disabled: List[str]
+                Factors that must be disabled, given by type or by name
+
+        Returns
+        -------
+            List[EpisodeInfo]
+                The episodes found, with absolute paths
+        """
+        query = "SELECT * FROM episodes AS e WHERE 1"
+        args: List[Any] = []
+        for column, value in (
+            ("task", task),
+            ("spreadsheet_idx", spreadsheet_idx),
+            ("variation_name", variation_name),
+            ("rlbench_variation", rlbench_variation),
+        ):
+            if value is not None:
+                query += f" AND e.{column} = ?"
+                args.append(value)
+        for factors, enabled in ((factors_enabled, 1), (factors_disabled, 0)):
+            for factor in factors:
+                query += (
+                    " AND EXISTS (SELECT 1 FROM factors AS f WHERE "
+                    + "f.task = e.task AND f.spreadsheet_idx = "
+                    + "e.spreadsheet_idx AND f.enabled = ? AND "
+                    + "(f.factor_type = ? OR f.factor_name = ?))"
+                )
+                args.extend([enabled, factor, factor])
+        query += " ORDER BY e.task, e.spreadsheet_idx, e.episode_idx"
+
+        return [
+            EpisodeInfo(
+                task_name=row["task"],
+                spreadsheet_idx=row["spreadsheet_idx"],
+                episode_idx=row["episode_idx"],
+                path=os.path.join(self._dataset_root, row["path"]),
+            )
+            for row in self._conn.execute(query, args)
+        ]
+
+    def files(self, episode: EpisodeInfo) -> Dict[str, List[Any]]:
+        """
+        Returns the size and checksum of each file recorded for an episode,
+        keyed by the path of the file relative to the episode folder
+        """
+        relpath = os.path.relpath(episode.path, self._dataset_root)
+        rows = self._conn.execute(
+            "SELECT f.relpath, f.size, f.sha256 FROM files AS f "
+            + "JOIN episodes AS e ON e.id = f.episode_id WHERE e.path = ?",
+            (relpath,),
+        )
+        return {row["relpath"]: [row["size"], row["sha256"]] for row in rows}
+
+
+def load_collection_strategy(task: str) -> Optional[Dict[str, Any]]:
+    """Returns the data collection strategy of a task, if available"""
+    strategy_path = os.path.join(ASSETS_JSON_FOLDER, task) + ".json"
+    if not os.path.isfile(strategy_path):
+        return None
+    with open(strategy_path, "r") as fhandle:
+        return json.load(fhandle)
+
+
+def strategy_variation_name(
+    collection_cfg: Optional[Dict[str, Any]], spreadsheet_idx: int
+) -> str:
+    """
+    Returns the name of the variation for a spreadsheet index in the given
+    data collection strategy, or an empty string if it's not available
+    """
+    if collection_cfg is None or not (
+        0 <= spreadsheet_idx < len(collection_cfg["strategy"])
+    ):
+        return ""
+    return collection_cfg["strategy"][spreadsheet_idx]["variation_name"]
+
+
+def scan_episode(
+    dataset_root: str,
+    episode: EpisodeInfo,
+    collection_cfg: Optional[Dict[str, Any]],
+    checksums: bool = True,
+) -> Dict[str, Any]:
+    """
+    Creates a journal-like entry for an episode already stored on disk
+    """
+    rlbench_variation = 0
+    variation_number_path = os.path.join(episode.path, VARIATION_NUMBER)
+    if os.path.isfile(variation_number_path):
+        with open(variation_number_path, "rb") as fhandle:
+            rlbench_variation = int(pickle.load(fhandle))
+
+    return {
+        "task": episode.task_name,
+        "spreadsheet_idx": episode.spreadsheet_idx,
+        "variation_name": strategy_variation_name(
+            collection_cfg, episode.spreadsheet_idx
+        ),
+        "rlbench_variation": rlbench_variation,
+        "episode_idx": episode.episode_idx,
+        "length": episode_length(episode.path),
+        "path": os.path.relpath(episode.path, dataset_root),
+        "files": {
+            relpath: [size, checksum]
+            for relpath, (size, checksum) in episode_files(
+                episode.path, checksums
+            ).items()
+        },
+    }
+
+
+def build_catalog(
+    dataset_root: str,
+    db_path: Optional[str] = None,
+    from_journal: bool = False,
+    checksums: bool = True,
+    num_workers: int = 8,
+) -> str:
+    """
+    Builds (or updates) the catalog of a dataset
+
+    Parameters
+    ----------
+        dataset_root: str
+            The root folder of the dataset (data.save_path)
+        db_path: Optional[str]
+            Where to save the catalog, by default inside the dataset root
+        from_journal: bool
+            Whether to use the collection journal instead of scanning the
+            dataset folders (much faster, as no checksums are recomputed)
+        checksums: bool
+            Whether or not to compute checksums when scanning the folders
+        num_workers: int
+            The number of threads used to scan the episodes
+
+    Returns
+    -------
+        str
+            The path to the catalog
+    """
+    if db_path is None:
+        db_path = os.path.join(dataset_root, CATALOG_FILENAME)
+
+    if from_journal:
+        entries = read_journal(dataset_root)
+    else:
+        episodes = find_episodes(dataset_root)
+        strategies = {
+            task: load_collection_strategy(task)
+            for task in set(ep.task_name for ep in episodes)
+        }
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            entries = list(
+                executor.map(
+                    lambda ep: scan_episode(
+                        dataset_root, ep, strategies[ep.task_name], checksums
+                    ),
+                    episodes,
+                )
+            )
+
+    with DatasetCatalog(db_path, dataset_root) as catalog:
+        for task in sorted(set(entry["task"] for entry in entries)):
+            collection_cfg = load_collection_strategy(task)
+            if collection_cfg is not None:
+                catalog.add_strategy(task, collection_cfg)
+        for entry in entries:
+            catalog.add_episode(entry)
+
+    return db_path
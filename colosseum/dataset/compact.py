@@ -0,0 +1,325 @@
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from colosseum.dataset.utils import (
+    CAMERAS_NAMES,
+    COMPACT_FOLDER,
+    COMPACT_MANIFEST,
+    IMAGE_FORMAT,
+    IMAGE_MODALITIES,
+    count_frames,
+    decode_image,
+    image_folder,
+    load_demo,
+)
+from colosseum.utils import file_checksum
+
+COMPACT_VERSION = 1
+LOW_DIM_FILENAME = "low_dim.npz"
+CHUNK_FORMAT = "%s.%04d.npz"
+
+DEPTH_UINT16_SCALE = 2**16 - 1
+
+# Observation attributes that hold images, which are stored separately
+IMAGE_ATTRIBUTES_SUFFIXES = ("_rgb", "_depth", "_mask", "_point_cloud")
+
+
+def depth_to_uint16(depth: NDArray) -> NDArray:
+    """Quantizes depth values in [0, 1] into 16 bits"""
+    return np.round(np.clip(depth, 0.0, 1.0) * DEPTH_UINT16_SCALE).astype(
+        np.uint16
+    )
+
+
+def uint16_to_depth(depth: NDArray) -> NDArray:
+    """Converts 16 bits depth values back into float32 values in [0, 1]"""
+    return (depth / DEPTH_UINT16_SCALE).astype(np.float32)
+
+
+def mask_to_palette(masks: NDArray) -> Tuple[NDArray, NDArray]:
+    """
+    Encodes a stack of masks, either (n, h, w) or (n, h, w, c), as a palette of
+    the unique values found and an array of indices into that palette
+    """
+    if masks.ndim == 4:
+        palette, inverse = np.unique(
+            masks.reshape(-1, masks.shape[-1]), axis=0, return_inverse=True
+        )
+        shape = masks.shape[:-1]
+    else:
+        palette, inverse = np.unique(masks, return_inverse=True)
+        shape = masks.shape
+    dtype = np.uint8 if len(palette) <= 256 else np.uint16
+    return palette, inverse.astype(dtype).reshape(shape)
+
+
+def structured_low_dim(demo: Any) -> Dict[str, NDArray]:
+    """
+    Extracts every numeric low dimensional attribute of the observations of a
+    demo, including the numeric entries of `misc` (e.g. camera intrinsics), as
+    stacked arrays with the frames along the first axis
+    """
+    arrays: Dict[str, NDArray] = {}
+    first = demo[0]
+    candidates = [
+        name
+        for name, value in vars(first).items()
+        if value is not None
+        and name != "misc"
+        and not name.endswith(IMAGE_ATTRIBUTES_SUFFIXES)
+    ]
+    for name in candidates:
+        values = [getattr(demo[i], name) for i in range(len(demo))]
+        try:
+            arrays[name] = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            continue
+
+    misc = getattr(first, "misc", None) or {}
+    for key in misc:
+        values = [demo[i].misc.get(key) for i in range(len(demo))]
+        try:
+            arrays[f"misc/{key}"] = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            continue
+
+    return arrays
+
+
+def _encode_chunk(modality: str, frames: NDArray) -> Dict[str, NDArray]:
+    if modality == "depth":
+        return {"frames": depth_to_uint16(frames)}
+    if modality == "mask":
+        palette, indices = mask_to_palette(frames)
+        return {"palette": palette, "indices": indices}
+    return {"frames": frames}
+
+
+def _decode_chunk(modality: str, chunk: Dict[str, NDArray]) -> NDArray:
+    if modality == "depth":
+        return uint16_to_depth(chunk["frames"])
+    if modality == "mask":
+        return chunk["palette"][chunk["indices"]]
+    return chunk["frames"]
+
+
+def _check_decoded(modality: str, source: NDArray, decoded: NDArray) -> bool:
+    if source.shape != decoded.shape:
+        return False
+    if modality == "depth":
+        return bool(
+            np.all(
+                np.abs(np.clip(source, 0.0, 1.0) - decoded)
+                <= 0.5 / DEPTH_UINT16_SCALE + 1e-6
+            )
+        )
+    return bool(np.array_equal(source, decoded))
+
+
+def convert_episode(
+    episode_path: str,
+    chunk_size: int = 16,
+    with_low_dim: bool = True,
+) -> Dict[str, Any]:
+    """
+    Transcodes an episode from the folder-of-PNGs layout into the compact
+    layout: chunked compressed arrays per camera and modality, with 16 bits
+    depth and palette encoded masks, plus the structured low dimensional data.
+    The result is written into a temporary folder, verified against the source
+    frames, and only then moved into place, so interrupted conversions are
+    simply redone
+
+    Parameters
+    ----------
+        episode_path: str
+            The path to the episode folder
+        chunk_size: int
+            The number of frames stored in each chunk
+        with_low_dim: bool
+            Whether or not to store the structured low dimensional data (which
+            requires rlbench to unpickle the demo)
+
+    Returns
+    -------
+        Dict[str, Any]
+            The manifest of the converted episode
+    """
+    compact_path = os.path.join(episode_path, COMPACT_FOLDER)
+    tmp_path = compact_path + ".tmp"
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    manifest: Dict[str, Any] = {
+        "version": COMPACT_VERSION,
+        "chunk_size": chunk_size,
+        "length": 0,
+        "streams": {},
+        "files": {},
+        "source_bytes": 0,
+    }
+
+    for camera in CAMERAS_NAMES:
+        for modality in IMAGE_MODALITIES:
+            num_frames = count_frames(episode_path, camera, modality)
+            if num_frames < 1:
+                continue
+            stream = image_folder(camera, modality)
+            manifest["length"] = max(manifest["length"], num_frames)
+            manifest["streams"][stream] = {
+                "modality": modality,
+                "length": num_frames,
+                "chunks": [],
+            }
+            for chunk_idx, start in enumerate(range(0, num_frames, chunk_size)):
+                frames_paths = [
+                    os.path.join(episode_path, stream, IMAGE_FORMAT % i)
+                    for i in range(start, min(start + chunk_size, num_frames))
+                ]
+                manifest["source_bytes"] += sum(
+                    os.path.getsize(path) for path in frames_paths
+                )
+                source = np.stack(
+                    [decode_image(path, modality) for path in frames_paths]
+                )
+                chunk_name = CHUNK_FORMAT % (stream, chunk_idx)
+                chunk_path = os.path.join(tmp_path, chunk_name)
+                np.savez_compressed(
+                    chunk_path, **_encode_chunk(modality, source)
+                )
+                with np.load(chunk_path, allow_pickle=False) as chunk:
+                    decoded = _decode_chunk(modality, dict(chunk))
+                if not _check_decoded(modality, source, decoded):
+                    raise RuntimeError(
+                        f"Verification failed for {chunk_name} of episode "
+                        + f"{episode_path}"
+                    )
+                manifest["streams"][stream]["chunks"].append(chunk_name)
+
+    if with_low_dim:
+        demo = load_demo(episode_path)
+        np.savez_compressed(
+            os.path.join(tmp_path, LOW_DIM_FILENAME),
+            **structured_low_dim(demo),
+        )
+        manifest["length"] = max(manifest["length"], len(demo))
+
+    for fname in sorted(os.listdir(tmp_path)):
+        fpath = os.path.join(tmp_path, fname)
+        manifest["files"][fname] = [
+            os.path.getsize(fpath),
+            file_checksum(fpath),
+        ]
+
+    # The manifest is written last, so its presence marks a complete episode
+    with open(os.path.join(tmp_path, COMPACT_MANIFEST), "w") as fhandle:
+        json.dump(manifest, fhandle, indent=2)
+
+    if os.path.isdir(compact_path):
+        shutil.rmtree(compact_path)
+    os.rename(tmp_path, compact_path)
+
+    return manifest
+
+
+def load_manifest(episode_path: str) -> Optional[Dict[str, Any]]:
+    """Returns the compact manifest of an episode, if it was converted"""
+    manifest_path = os.path.join(episode_path, COMPACT_FOLDER, COMPACT_MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, "r") as fhandle:
+        return json.load(fhandle)
+
+
+def verify_compact_episode(
+    episode_path: str, checksums: bool = True
+) -> List[str]:
+    """
+    Checks the files of a converted episode against its manifest. Returns a
+    list with the problems found (empty if the episode is fine)
+    """
+    manifest = load_manifest(episode_path)
+    if manifest is None:
+        return ["missing compact manifest"]
+
+    problems: List[str] = []
+    compact_path = os.path.join(episode_path, COMPACT_FOLDER)
+    for fname, (size, checksum) in manifest["files"].items():
+        fpath = os.path.join(compact_path, fname)
+        if not os.path.isfile(fpath):
+            problems.append(f"missing compact file {fname}")
+        elif os.path.getsize(fpath) != size:
+            problems.append(f"size mismatch for compact file {fname}")
+        elif checksums and file_checksum(fpath) != checksum:
+            problems.append(f"checksum mismatch for compact file {fname}")
+    return problems
+
+
+def delete_source_images(episode_path: str) -> None:
+    """Removes the PNG folders of an episode that was already converted"""
+    manifest = load_manifest(episode_path)
+    assert manifest is not None, "Can't delete images of unconverted episode"
+    for stream in manifest["streams"]:
+        stream_path = os.path.join(episode_path, stream)
+        if os.path.isdir(stream_path):
+            shutil.rmtree(stream_path)
+
+
+class CompactEpisodeReader:
+    """
+    Random access reader for episodes in the compact layout. The last chunk
+    decoded for each stream is kept, so sequential reads decode each chunk once
+    """
+
+    def __init__(self, episode_path: str):
+        manifest = load_manifest(episode_path)
+        assert manifest is not None, f"{episode_path} isn't converted"
+        self._manifest: Dict[str, Any] = manifest
+        self._path = os.path.join(episode_path, COMPACT_FOLDER)
+        self._chunks: Dict[str, Tuple[int, NDArray]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def length(self) -> int:
+        return self._manifest["length"]
+
+    @property
+    def has_low_dim(self) -> bool:
+        return LOW_DIM_FILENAME in self._manifest["files"]
+
+    def has_stream(self, camera: str, modality: str) -> bool:
+        return image_folder(camera, modality) in self._manifest["streams"]
+
+    def frame(self, camera: str, modality: str, frame_id: int) -> NDArray:
+        """Returns the decoded image of a camera and modality at a frame"""
+        stream = image_folder(camera, modality)
+        chunk_idx, offset = divmod(frame_id, self._manifest["chunk_size"])
+        with self._lock:
+            cached = self._chunks.get(stream)
+        if cached is None or cached[0] != chunk_idx:
+            chunk_name = self._manifest["streams"][stream]["chunks"][chunk_idx]
+            with np.load(
+                os.path.join(self._path, chunk_name), allow_pickle=False
+            ) as chunk:
+                frames = _decode_chunk(modality, dict(chunk))
+            cached = (chunk_idx, frames)
+            with self._lock:
+                self._chunks[stream] = cached
+        return cached[1][offset]
+
+    def low_dim(self, fields: List[str]) -> Dict[str, NDArray]:
+        """Returns the requested low dimensional fields as float32 arrays"""
+        with np.load(
+            os.path.join(self._path, LOW_DIM_FILENAME), allow_pickle=False
+        ) as data:
+            return {
+                name: data[name].astype(np.float32).reshape(len(data[name]), -1)
+                for name in fields
+                if name in data
+            }
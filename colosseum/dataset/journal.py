@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from colosseum.dataset.utils import episode_files
+
+JOURNAL_FILENAME = "collection_journal.jsonl"
+
+
+def make_journal_entry(
+    save_path: str,
+    episode_path: str,
+    task_name: str,
+    spreadsheet_idx: int,
+    variation_name: str,
+    rlbench_variation: int,
+    episode_idx: int,
+    length: int,
+) -> Dict[str, Any]:
+    """
+    Creates the journal entry for an episode that was just saved to disk,
+    including the size and checksum of all of its files
+
+    Parameters
+    ----------
+        save_path: str
+            The root folder of the dataset (data.save_path)
+        episode_path: str
+            The folder where the episode was saved
+        task_name: str
+            The name of the task the episode belongs to
+        spreadsheet_idx: int
+            The index in the spreadsheet of the task variation
+        variation_name: str
+            The name of the variation from the data collection strategy
+        rlbench_variation: int
+            The RLBench variation number used for the episode
+        episode_idx: int
+            The index of the episode
+        length: int
+            The number of frames in the episode
+
+    Returns
+    -------
+        Dict[str, Any]
+            The entry, ready to be serialized into the journal
+    """
+    return {
+        "task": task_name,
+        "spreadsheet_idx": spreadsheet_idx,
+        "variation_name": variation_name,
+        "rlbench_variation": rlbench_variation,
+        "episode_idx": episode_idx,
+        "length": length,
+        "path": os.path.relpath(episode_path, save_path),
+        "files": {
+            relpath: [size, checksum]
+            for relpath, (size, checksum) in episode_files(episode_path).items()
+        },
+    }
+
+
+def append_journal_entry(save_path: str, entry: Dict[str, Any]) -> None:
+    """
+    Appends an entry to the journal of the dataset. Callers running in several
+    processes should hold the same lock used to save the episodes
+    """
+    journal_path = os.path.join(save_path, JOURNAL_FILENAME)
+    with open(journal_path, "a") as fhandle:
+        fhandle.write(json.dumps(entry) + "\n")
+        fhandle.flush()
+        os.fsync(fhandle.fileno())
+
+
+def read_journal(
+    save_path: str, journal_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Returns the entries of the journal of the given dataset. If an episode was
+    collected more than once (e.g. it was requeued), only the last entry for
+    that episode is kept. Truncated lines from crashed workers are skipped
+
+    Parameters
+    ----------
+        save_path: str
+            The root folder of the dataset (data.save_path)
+        journal_path: Optional[str]
+            The path to the journal, if not in the default location
+
+    Returns
+    -------
+        List[Dict[str, Any]]
+            The journal entries, in the order they were first collected
+    """
+    if journal_path is None:
+        journal_path = os.path.join(save_path, JOURNAL_FILENAME)
+    if not os.path.isfile(journal_path):
+        return []
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    with open(journal_path, "r") as fhandle:
+        for line in fhandle:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["path"]] = entry
+    return list(entries.values())
@@ -0,0 +1,105 @@
+import os
+from typing import Any, List, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from colosseum.dataset.utils import low_dim_arrays
+
+KEYFRAMES_FILENAME = "keyframes.npy"
+
+# Number of steps after a stop during which we don't look for another stop
+STOPPED_BUFFER_STEPS = 4
+
+
+def compute_keyframes(
+    gripper_open: NDArray,
+    joint_velocities: NDArray,
+    stopping_delta: float = 0.1,
+) -> NDArray:
+    """
+    Computes the keyframes of a demo in a vectorized pass. A frame is a keyframe
+    if the gripper changes its open state, if the arm stops (all the joint
+    velocities are near zero while the gripper state stays the same), or if
+    it's the last frame of the demo. This matches the keypoint discovery used
+    by PerAct-style agents
+
+    Parameters
+    ----------
+        gripper_open: NDArray
+            The gripper open state at each frame, with shape (num_frames,)
+        joint_velocities: NDArray
+            The arm joint velocities, with shape (num_frames, num_joints)
+        stopping_delta: float
+            The tolerance used to consider the joint velocities as zero
+
+    Returns
+    -------
+        NDArray
+            The indices of the keyframes, in increasing order
+    """
+    gripper_open = np.asarray(gripper_open).reshape(-1)
+    joint_velocities = np.asarray(joint_velocities)
+    num_frames = len(gripper_open)
+    if num_frames < 2:
+        return np.zeros(0, dtype=np.int64)
+
+    indices = np.arange(num_frames)
+    # Neighbours wrap around at the start, just like negative indexing does
+    prev_open = np.roll(gripper_open, 1)
+    prev_prev_open = np.roll(gripper_open, 2)
+    next_open = np.roll(gripper_open, -1)
+
+    small_delta = np.all(np.abs(joint_velocities) <= stopping_delta, axis=1)
+    gripper_no_change = (
+        (indices < num_frames - 2)
+        & (gripper_open == next_open)
+        & (gripper_open == prev_open)
+        & (prev_prev_open == prev_open)
+    )
+    stop_candidates = np.flatnonzero(
+        small_delta & gripper_no_change & (indices != num_frames - 2)
+    )
+
+    # After a stop we wait a few steps before accepting another one, which is
+    # the only part that depends on the previous decisions
+    stopped = np.zeros(num_frames, dtype=bool)
+    last_stop = -(STOPPED_BUFFER_STEPS + 1)
+    for idx in stop_candidates:
+        if idx - last_stop > STOPPED_BUFFER_STEPS:
+            stopped[idx] = True
+            last_stop = idx
+
+    is_keyframe = (gripper_open != prev_open) | stopped
+    is_keyframe[-1] = True
+    is_keyframe[0] = False
+    keyframes: List[int] = np.flatnonzero(is_keyframe).tolist()
+
+    if len(keyframes) > 1 and keyframes[-1] - 1 == keyframes[-2]:
+        keyframes.pop(-2)
+
+    return np.asarray(keyframes, dtype=np.int64)
+
+
+def keyframes_from_demo(demo: Any, stopping_delta: float = 0.1) -> NDArray:
+    """Computes the keyframes of an rlbench Demo (see compute_keyframes)"""
+    arrays = low_dim_arrays(demo, ["gripper_open", "joint_velocities"])
+    return compute_keyframes(
+        arrays["gripper_open"], arrays["joint_velocities"], stopping_delta
+    )
+
+
+def save_keyframes(episode_path: str, keyframes: NDArray) -> None:
+    """Saves the keyframes of an episode next to its low dimensional data"""
+    np.save(
+        os.path.join(episode_path, KEYFRAMES_FILENAME),
+        np.asarray(keyframes, dtype=np.int64),
+    )
+
+
+def load_keyframes(episode_path: str) -> Optional[NDArray]:
+    """Returns the stored keyframes of an episode, or None if not available"""
+    keyframes_path = os.path.join(episode_path, KEYFRAMES_FILENAME)
+    if not os.path.isfile(keyframes_path):
+        return None
+    return np.load(keyframes_path, allow_pickle=False)
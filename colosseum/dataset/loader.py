@@ -0,0 +1,328 @@
+import collections
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, OrderedDict, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from colosseum.dataset.compact import CompactEpisodeReader
+from colosseum.dataset.keyframes import keyframes_from_demo, load_keyframes
+from colosseum.dataset.utils import (
+    COMPACT_FOLDER,
+    COMPACT_MANIFEST,
+    DEFAULT_LOW_DIM_FIELDS,
+    IMAGE_FORMAT,
+    EpisodeInfo,
+    count_frames,
+    decode_image,
+    find_episodes,
+    image_folder,
+    load_demo,
+    low_dim_arrays,
+)
+
+# A sample is given by the index of its episode and the index of the frame
+Sample = Tuple[int, int]
+
+
+class PrefetchBatchSampler:
+    """
+    Framework agnostic batch iterator over a dataset collected with our tools.
+    Images are decoded by a pool of worker threads, and a number of batches are
+    kept in flight ahead of the consumer, so the training loop doesn't have to
+    wait for the decoding of the .png files. Episodes converted to the compact
+    layout (see tools/convert_dataset.py) are read from their chunks instead
+    """
+
+    def __init__(
+        self,
+        dataset_root: str,
+        batch_size: int = 32,
+        cameras: Optional[List[str]] = None,
+        modalities: Optional[List[str]] = None,
+        low_dim_fields: Optional[List[str]] = None,
+        tasks: Optional[List[str]] = None,
+        shuffle: bool = True,
+        shuffle_buffer_size: int = 1024,
+        prefetch_depth: int = 4,
+        num_workers: int = 8,
+        drop_last: bool = False,
+        seed: int = 0,
+        low_dim_cache_size: int = 64,
+        keyframes_only: bool = False,
+    ):
+        """
+        Creates a batch sampler over all frames of the episodes in a dataset
+
+        Parameters
+        ----------
+            dataset_root: str
+                The folder where the dataset was saved (data.save_path)
+            batch_size: int
+                The number of frames in each batch
+            cameras: Optional[List[str]]
+                The cameras whose images we want to load, or None for the front
+                camera only
+            modalities: Optional[List[str]]
+                The image modalities we want to load (rgb, depth, mask), or None
+                for the rgb images only
+            low_dim_fields: Optional[List[str]]
+                The Observation attributes to load from low_dim_obs.pkl, or None
+                for DEFAULT_LOW_DIM_FIELDS. Use an empty list to skip loading
+                the low dimensional data
+            tasks: Optional[List[str]]
+                A list of task names to use (whitelist), or None to use all
+            shuffle: bool
+                Whether or not to shuffle the frames on every epoch
+            shuffle_buffer_size: int
+                The size of the buffer used to shuffle the stream of frames
+            prefetch_depth: int
+                The number of batches to decode ahead of the consumer
+            num_workers: int
+                The number of threads used to decode images
+            drop_last: bool
+                Whether or not to drop the last batch if it's incomplete
+            seed: int
+                The base seed, combined with the epoch number to shuffle
+            low_dim_cache_size: int
+                The number of episodes whose low dimensional data (and compact
+                readers) are kept
+            keyframes_only: bool
+                Whether to sample only the keyframes of each episode, read from
+                the keyframes sidecar (computed from the demo if missing)
+        """
+        assert batch_size > 0, "Batch size must be a positive number"
+        assert prefetch_depth > 0, "Prefetch depth must be a positive number"
+        assert num_workers > 0, "Number of workers must be a positive number"
+
+        self._batch_size = batch_size
+        self._cameras = list(cameras) if cameras is not None else ["front"]
+        self._modalities = (
+            list(modalities) if modalities is not None else ["rgb"]
+        )
+        self._low_dim_fields = (
+            list(low_dim_fields)
+            if low_dim_fields is not None
+            else list(DEFAULT_LOW_DIM_FIELDS)
+        )
+        self._shuffle = shuffle
+        self._shuffle_buffer_size = max(shuffle_buffer_size, 1)
+        self._prefetch_depth = prefetch_depth
+        self._num_workers = num_workers
+        self._drop_last = drop_last
+        self._seed = seed
+        self._keyframes_only = keyframes_only
+        self._epoch = 0
+
+        self._low_dim_cache: OrderedDict[
+            int, Dict[str, NDArray]
+        ] = collections.OrderedDict()
+        self._low_dim_cache_size = max(low_dim_cache_size, 1)
+        self._low_dim_lock = threading.Lock()
+        self._readers: OrderedDict[
+            int, CompactEpisodeReader
+        ] = collections.OrderedDict()
+
+        self._episodes: List[EpisodeInfo] = find_episodes(dataset_root, tasks)
+        self._compact: List[bool] = [
+            os.path.isfile(
+                os.path.join(episode.path, COMPACT_FOLDER, COMPACT_MANIFEST)
+            )
+            for episode in self._episodes
+        ]
+        self._episodes_frames: List[NDArray] = [
+            self._episode_frames(episode) for episode in self._episodes
+        ]
+
+    @property
+    def episodes(self) -> List[EpisodeInfo]:
+        return self._episodes
+
+    @property
+    def num_samples(self) -> int:
+        return sum(len(frames) for frames in self._episodes_frames)
+
+    def __len__(self) -> int:
+        if self._drop_last:
+            return self.num_samples // self._batch_size
+        return -(-self.num_samples // self._batch_size)
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Sets the epoch used for the next iteration. The order of the samples
+        depends only on (seed, epoch), so a run can be resumed deterministically
+        """
+        self._epoch = epoch
+
+    def __iter__(self) -> Iterator[Dict[str, NDArray]]:
+        epoch = self._epoch
+        self._epoch += 1
+        return self._iterate(epoch)
+
+    def _episode_frames(self, episode: EpisodeInfo) -> NDArray:
+        if self._keyframes_only:
+            keyframes = load_keyframes(episode.path)
+            if keyframes is None:
+                keyframes = keyframes_from_demo(load_demo(episode.path))
+            return keyframes
+        return np.arange(self._episode_length(episode))
+
+    def _episode_length(self, episode: EpisodeInfo) -> int:
+        manifest_path = os.path.join(
+            episode.path, COMPACT_FOLDER, COMPACT_MANIFEST
+        )
+        if os.path.isfile(manifest_path):
+            return CompactEpisodeReader(episode.path).length
+        for camera in self._cameras:
+            for modality in self._modalities:
+                num_frames = count_frames(episode.path, camera, modality)
+                if num_frames > 0:
+                    return num_frames
+        if len(self._low_dim_fields) > 0:
+            return len(load_demo(episode.path))
+        return 0
+
+    def _samples_stream(self, rng: np.random.Generator) -> Iterator[Sample]:
+        """
+        Yields the samples for an epoch. Episodes are visited in a random order
+        and their frames are passed through a shuffle buffer, which keeps the
+        reads mostly local to a few episodes at a time
+        """
+        episodes_order = np.arange(len(self._episodes))
+        if self._shuffle:
+            rng.shuffle(episodes_order)
+
+        buffer: List[Sample] = []
+        for episode_id in episodes_order:
+            for frame_id in self._episodes_frames[episode_id]:
+                sample = (int(episode_id), int(frame_id))
+                if not self._shuffle:
+                    yield sample
+                elif len(buffer) < self._shuffle_buffer_size:
+                    buffer.append(sample)
+                else:
+                    idx = rng.integers(len(buffer))
+                    yield buffer[idx]
+                    buffer[idx] = sample
+
+        if self._shuffle:
+            rng.shuffle(buffer)
+        yield from buffer
+
+    def _batches_stream(
+        self, rng: np.random.Generator
+    ) -> Iterator[List[Sample]]:
+        batch: List[Sample] = []
+        for sample in self._samples_stream(rng):
+            batch.append(sample)
+            if len(batch) == self._batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0 and not self._drop_last:
+            yield batch
+
+    def _iterate(self, epoch: int) -> Iterator[Dict[str, NDArray]]:
+        rng = np.random.default_rng([self._seed, epoch])
+        batches = self._batches_stream(rng)
+        in_flight: Deque[List[Future]] = collections.deque()
+
+        executor = ThreadPoolExecutor(max_workers=self._num_workers)
+        try:
+            for batch in batches:
+                in_flight.append(
+                    [executor.submit(self._load_sample, s) for s in batch]
+                )
+                if len(in_flight) >= self._prefetch_depth:
+                    yield self._collate(in_flight.popleft())
+            while len(in_flight) > 0:
+                yield self._collate(in_flight.popleft())
+        finally:
+            # Don't keep decoding if the consumer stops early
+            for futures in in_flight:
+                for future in futures:
+                    future.cancel()
+            executor.shutdown(wait=True)
+
+    def _collate(self, futures: List[Future]) -> Dict[str, NDArray]:
+        samples = [future.result() for future in futures]
+        keys = set(samples[0])
+        for sample in samples[1:]:
+            if set(sample) != keys:
+                raise ValueError(
+                    "PrefetchBatchSampler > the episodes of a batch have "
+                    + f"different streams, {sorted(keys ^ set(sample))} are "
+                    + f"missing in episode {samples[0]['episode_id']} or "
+                    + f"{sample['episode_id']}"
+                )
+        return {key: np.stack([s[key] for s in samples]) for key in samples[0]}
+
+    def _load_sample(self, sample: Sample) -> Dict[str, NDArray]:
+        episode_id, frame_id = sample
+        episode = self._episodes[episode_id]
+
+        data: Dict[str, NDArray] = {
+            "episode_id": np.asarray(episode_id),
+            "frame_id": np.asarray(frame_id),
+        }
+        reader = self._get_reader(episode_id)
+        for camera in self._cameras:
+            for modality in self._modalities:
+                if reader is not None and reader.has_stream(camera, modality):
+                    data[image_folder(camera, modality)] = reader.frame(
+                        camera, modality, frame_id
+                    )
+                    continue
+                image_path = os.path.join(
+                    episode.path,
+                    image_folder(camera, modality),
+                    IMAGE_FORMAT % frame_id,
+                )
+                if os.path.isfile(image_path):
+                    data[image_folder(camera, modality)] = decode_image(
+                        image_path, modality
+                    )
+
+        if len(self._low_dim_fields) > 0:
+            for name, values in self._get_low_dim(episode_id).items():
+                data[name] = values[frame_id]
+
+        return data
+
+    def _get_low_dim(self, episode_id: int) -> Dict[str, NDArray]:
+        with self._low_dim_lock:
+            if episode_id in self._low_dim_cache:
+                self._low_dim_cache.move_to_end(episode_id)
+                return self._low_dim_cache[episode_id]
+
+        reader = self._get_reader(episode_id)
+        if reader is not None and reader.has_low_dim:
+            arrays = reader.low_dim(self._low_dim_fields)
+        else:
+            arrays = low_dim_arrays(
+                load_demo(self._episodes[episode_id].path),
+                self._low_dim_fields,
+            )
+
+        with self._low_dim_lock:
+            self._low_dim_cache[episode_id] = arrays
+            while len(self._low_dim_cache) > self._low_dim_cache_size:
+                self._low_dim_cache.popitem(last=False)
+        return arrays
+
+    def _get_reader(self, episode_id: int) -> Optional[CompactEpisodeReader]:
+        if not self._compact[episode_id]:
+            return None
+        with self._low_dim_lock:
+            if episode_id in self._readers:
+                self._readers.move_to_end(episode_id)
+                return self._readers[episode_id]
+
+        reader = CompactEpisodeReader(self._episodes[episode_id].path)
+
+        with self._low_dim_lock:
+            reader = self._readers.setdefault(episode_id, reader)
+            while len(self._readers) > self._low_dim_cache_size:
+                self._readers.popitem(last=False)
+        return reader
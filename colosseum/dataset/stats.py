@@ -0,0 +1,259 @@
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+from numpy.typing import NDArray
+
+from colosseum.dataset.utils import (
+    DEFAULT_LOW_DIM_FIELDS,
+    IMAGE_FORMAT,
+    count_frames,
+    decode_image,
+    image_folder,
+    load_demo,
+    low_dim_arrays,
+)
+
+
+class RunningMoments:
+    """
+    Running per-channel count, mean, variance, min and max. Partial results can
+    be merged in any order using the parallel variance formula from Chan et
+    al., so statistics computed over shards can be combined without having to
+    revisit the data
+    """
+
+    def __init__(self, dim: int):
+        self.count: int = 0
+        self.mean: NDArray = np.zeros(dim, dtype=np.float64)
+        self.m2: NDArray = np.zeros(dim, dtype=np.float64)
+        self.min: NDArray = np.full(dim, np.inf, dtype=np.float64)
+        self.max: NDArray = np.full(dim, -np.inf, dtype=np.float64)
+
+    @property
+    def var(self) -> NDArray:
+        return self.m2 / max(self.count, 1)
+
+    @property
+    def std(self) -> NDArray:
+        return np.sqrt(self.var)
+
+    def update(self, values: NDArray) -> "RunningMoments":
+        """
+        Adds a batch of values, with shape (num_values, dim), to the moments
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(
+            -1, len(self.mean)
+        )
+        if len(values) < 1:
+            return self
+        batch = RunningMoments(len(self.mean))
+        batch.count = len(values)
+        batch.mean = values.mean(axis=0)
+        batch.m2 = ((values - batch.mean) ** 2).sum(axis=0)
+        batch.min = values.min(axis=0)
+        batch.max = values.max(axis=0)
+        return self.merge(batch)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """Merges the moments of another set of values into these ones"""
+        if other.count < 1:
+            return self
+        if self.count < 1:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.m2 = other.m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = (
+            self.m2 + other.m2 + delta**2 * (self.count * other.count / count)
+        )
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count = count
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "m2": self.m2.tolist(),
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "RunningMoments":
+        moments = RunningMoments(len(data["mean"]))
+        moments.count = data["count"]
+        moments.mean = np.asarray(data["mean"], dtype=np.float64)
+        moments.m2 = np.asarray(data["m2"], dtype=np.float64)
+        moments.min = np.asarray(data["min"], dtype=np.float64)
+        moments.max = np.asarray(data["max"], dtype=np.float64)
+        return moments
+
+
+def merge_moments(
+    target: Dict[str, RunningMoments], source: Dict[str, RunningMoments]
+) -> Dict[str, RunningMoments]:
+    """Merges a set of named moments into another one (in place)"""
+    for key, moments in source.items():
+        if key not in target:
+            target[key] = RunningMoments(len(moments.mean))
+        target[key].merge(moments)
+    return target
+
+
+def episode_moments(
+    episode_path: str,
+    cameras: List[str],
+    modalities: List[str],
+    low_dim_fields: List[str] = DEFAULT_LOW_DIM_FIELDS,
+) -> Dict[str, RunningMoments]:
+    """
+    Computes the moments of a single episode, streaming its frames one at a
+    time. Images get per-channel moments, keyed by "<camera>_<modality>", and
+    each low dimensional field gets per-dimension moments keyed by its name
+
+    Parameters
+    ----------
+        episode_path: str
+            The path to the episode folder
+        cameras: List[str]
+            The cameras whose images we want statistics of
+        modalities: List[str]
+            The image modalities we want statistics of
+        low_dim_fields: List[str]
+            The Observation attributes we want statistics of
+
+    Returns
+    -------
+        Dict[str, RunningMoments]
+            The moments for each camera-modality pair and low dimensional field
+    """
+    moments: Dict[str, RunningMoments] = {}
+    for camera in cameras:
+        for modality in modalities:
+            key = image_folder(camera, modality)
+            for frame_id in range(count_frames(episode_path, camera, modality)):
+                image = decode_image(
+                    os.path.join(episode_path, key, IMAGE_FORMAT % frame_id),
+                    modality,
+                )
+                channels = image.shape[2] if image.ndim > 2 else 1
+                if key not in moments:
+                    moments[key] = RunningMoments(channels)
+                moments[key].update(image.reshape(-1, channels))
+
+    if len(low_dim_fields) > 0:
+        arrays = low_dim_arrays(load_demo(episode_path), low_dim_fields)
+        for name, values in arrays.items():
+            moments[name] = RunningMoments(values.shape[1]).update(values)
+
+    return moments
+
+
+class DatasetStats:
+    """
+    Moments of a dataset grouped by task and variation (spreadsheet index).
+    Aggregates per task and for the whole dataset are derived when saving, and
+    stats computed over different shards can be merged together
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _group(self, task: str, variation: str) -> Dict[str, Any]:
+        variations = self._groups.setdefault(task, {})
+        if variation not in variations:
+            variations[variation] = {
+                "variation_name": "",
+                "num_episodes": 0,
+                "moments": {},
+            }
+        return variations[variation]
+
+    def add(
+        self,
+        task: str,
+        variation: str,
+        variation_name: str,
+        moments: Dict[str, RunningMoments],
+        num_episodes: int = 1,
+    ) -> None:
+        """Adds the moments of some episodes of the given task variation"""
+        group = self._group(task, variation)
+        group["variation_name"] = variation_name or group["variation_name"]
+        group["num_episodes"] += num_episodes
+        merge_moments(group["moments"], moments)
+
+    def merge(self, other: "DatasetStats") -> "DatasetStats":
+        """Merges the stats of another shard into these ones"""
+        for task, variations in other._groups.items():
+            for variation, group in variations.items():
+                self.add(
+                    task,
+                    variation,
+                    group["variation_name"],
+                    group["moments"],
+                    group["num_episodes"],
+                )
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        dataset_moments: Dict[str, RunningMoments] = {}
+        dataset_episodes = 0
+        tasks: Dict[str, Any] = {}
+        for task, variations in sorted(self._groups.items()):
+            task_moments: Dict[str, RunningMoments] = {}
+            task_episodes = 0
+            tasks[task] = {"variations": {}}
+            for variation, group in sorted(variations.items()):
+                merge_moments(task_moments, group["moments"])
+                task_episodes += group["num_episodes"]
+                tasks[task]["variations"][variation] = {
+                    "variation_name": group["variation_name"],
+                    "num_episodes": group["num_episodes"],
+                    "stats": {
+                        key: moments.to_dict()
+                        for key, moments in group["moments"].items()
+                    },
+                }
+            tasks[task]["num_episodes"] = task_episodes
+            tasks[task]["stats"] = {
+                key: moments.to_dict() for key, moments in task_moments.items()
+            }
+            merge_moments(dataset_moments, task_moments)
+            dataset_episodes += task_episodes
+
+        return {
+            "tasks": tasks,
+            "num_episodes": dataset_episodes,
+            "stats": {
+                key: moments.to_dict()
+                for key, moments in dataset_moments.items()
+            },
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "DatasetStats":
+        stats = DatasetStats()
+        for task, task_data in data["tasks"].items():
+            for variation, group in task_data["variations"].items():
+                stats.add(
+                    task,
+                    variation,
+                    group["variation_name"],
+                    {
+                        key: RunningMoments.from_dict(moments)
+                        for key, moments in group["stats"].items()
+                    },
+                    group["num_episodes"],
+                )
+        return stats
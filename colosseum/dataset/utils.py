@@ -0,0 +1,260 @@
+import json
+import os
+import pickle
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
+
+from colosseum.utils import file_checksum
+
+# These mirror the names used in rlbench.backend.const. We don't import them
+# from there, as importing rlbench pulls PyRep (and CoppeliaSim) in, and the
+# dataset utilities should also work on training nodes without a simulator
+EPISODES_FOLDER = "episodes"
+EPISODE_FOLDER = "episode%d"
+VARIATIONS_FOLDER = "variation%d"
+IMAGE_FORMAT = "%d.png"
+LOW_DIM_PICKLE = "low_dim_obs.pkl"
+VARIATION_NUMBER = "variation_number.pkl"
+VARIATION_DESCRIPTIONS = "variation_descriptions.pkl"
+# Parameters applied by the variations on each episode (see variations.manager)
+VARIATION_PARAMS = "variation_params.npz"
+DEPTH_SCALE = 2**24 - 1
+
+# Folder and manifest of the compact copy of an episode (see dataset.compact)
+COMPACT_FOLDER = "compact"
+COMPACT_MANIFEST = "manifest.json"
+
+CAMERAS_NAMES: List[str] = [
+    "left_shoulder",
+    "right_shoulder",
+    "overhead",
+    "wrist",
+    "front",
+]
+
+IMAGE_MODALITIES: List[str] = ["rgb", "depth", "mask"]
+
+DEFAULT_LOW_DIM_FIELDS: List[str] = [
+    "joint_positions",
+    "joint_velocities",
+    "gripper_open",
+    "gripper_pose",
+    "gripper_joint_positions",
+]
+
+
+@dataclass
+class EpisodeInfo:
+    task_name: str = field(default="")
+    spreadsheet_idx: int = field(default=-1)
+    episode_idx: int = field(default=-1)
+    path: str = field(default="")
+
+
+def image_folder(camera: str, modality: str) -> str:
+    """Returns the name of the folder for the given camera and modality"""
+    return f"{camera}_{modality}"
+
+
+def find_episodes(
+    dataset_root: str, tasks: Optional[List[str]] = None
+) -> List[EpisodeInfo]:
+    """
+    Returns all episodes found in a dataset collected with our tools. Both the
+    layouts from `dataset_generator` (task_idx/[variation0/]episodes/episodeN)
+    and from `collect_demo` (task/variation0/episodes/episodeN) are supported
+
+    Parameters
+    ----------
+        dataset_root: str
+            The folder where the dataset was saved (data.save_path)
+        tasks: Optional[List[str]]
+            A list of task names to keep (whitelist), or None to keep all
+
+    Returns
+    -------
+        List[EpisodeInfo]
+            The episodes found, sorted by task, spreadsheet idx and episode idx
+    """
+    task_regex = re.compile(r"^(.*)_(\d+)$")
+    episode_regex = re.compile(r"^episode(\d+)$")
+
+    episodes: List[EpisodeInfo] = []
+    for task_folder in sorted(os.listdir(dataset_root)):
+        task_path = os.path.join(dataset_root, task_folder)
+        if not os.path.isdir(task_path):
+            continue
+        match = task_regex.match(task_folder)
+        task_name = match.group(1) if match else task_folder
+        spreadsheet_idx = int(match.group(2)) if match else -1
+        if tasks is not None and task_name not in tasks:
+            continue
+
+        candidates = [os.path.join(task_path, EPISODES_FOLDER)]
+        candidates += [
+            os.path.join(task_path, fname, EPISODES_FOLDER)
+            for fname in sorted(os.listdir(task_path))
+            if fname.startswith("variation")
+        ]
+        for episodes_path in candidates:
+            if not os.path.isdir(episodes_path):
+                continue
+            for fname in os.listdir(episodes_path):
+                ep_match = episode_regex.match(fname)
+                if ep_match is None:
+                    continue
+                episodes.append(
+                    EpisodeInfo(
+                        task_name=task_name,
+                        spreadsheet_idx=spreadsheet_idx,
+                        episode_idx=int(ep_match.group(1)),
+                        path=os.path.join(episodes_path, fname),
+                    )
+                )
+
+    episodes.sort(
+        key=lambda ep: (ep.task_name, ep.spreadsheet_idx, ep.episode_idx)
+    )
+    return episodes
+
+
+def count_frames(episode_path: str, camera: str, modality: str) -> int:
+    """
+    Returns the number of frames stored for the given camera and modality, or
+    zero if the episode doesn't contain that image folder
+    """
+    folder = os.path.join(episode_path, image_folder(camera, modality))
+    if not os.path.isdir(folder):
+        return 0
+    return len([fname for fname in os.listdir(folder) if fname[0].isdigit()])
+
+
+def episode_length(episode_path: str) -> int:
+    """
+    Returns the number of frames of an episode, read from its compact manifest
+    if it was converted, or counting the images of the first camera found, or
+    falling back to unpickling the low dimensional data if the episode doesn't
+    contain any images
+    """
+    manifest_path = os.path.join(episode_path, COMPACT_FOLDER, COMPACT_MANIFEST)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r") as fhandle:
+            return json.load(fhandle)["length"]
+    for camera in CAMERAS_NAMES:
+        for modality in IMAGE_MODALITIES:
+            num_frames = count_frames(episode_path, camera, modality)
+            if num_frames > 0:
+                return num_frames
+    return len(load_demo(episode_path))
+
+
+def episode_files(
+    episode_path: str, checksums: bool = True
+) -> Dict[str, Tuple[int, str]]:
+    """
+    Returns the size and sha256 checksum of every file in an episode folder
+
+    Parameters
+    ----------
+        episode_path: str
+            The path to the episode folder
+        checksums: bool
+            Whether or not to compute the checksums (empty strings otherwise)
+
+    Returns
+    -------
+        Dict[str, Tuple[int, str]]
+            A map from the path of each file, relative to the episode folder,
+            to its size in bytes and its checksum
+    """
+    files: Dict[str, Tuple[int, str]] = {}
+    for folder, _, fnames in os.walk(episode_path):
+        for fname in fnames:
+            fpath = os.path.join(folder, fname)
+            relpath = os.path.relpath(fpath, episode_path)
+            files[relpath] = (
+                os.path.getsize(fpath),
+                file_checksum(fpath) if checksums else "",
+            )
+    return files
+
+
+def rgb_to_depth(image: NDArray) -> NDArray:
+    """
+    Converts a depth image encoded into 24 bits RGB by `save_demo` back into a
+    float array (the inverse of rlbench's float_array_to_rgb_image)
+    """
+    packed = (
+        image[..., 0].astype(np.uint32) << 16
+        | image[..., 1].astype(np.uint32) << 8
+        | image[..., 2].astype(np.uint32)
+    )
+    return (packed / DEPTH_SCALE).astype(np.float32)
+
+
+def decode_image(path: str, modality: str) -> NDArray:
+    """
+    Decodes an image saved by `save_demo` into a numpy array. RGB images and
+    masks are returned as uint8 arrays, and depth images as float32 arrays
+
+    Parameters
+    ----------
+        path: str
+            The path to the .png file to decode
+        modality: str
+            The image modality, one of "rgb", "depth" or "mask"
+
+    Returns
+    -------
+        NDArray
+            The decoded image
+    """
+    with Image.open(path) as image:
+        array = np.asarray(image)
+    if modality == "depth":
+        return rgb_to_depth(array)
+    return array
+
+
+def load_demo(episode_path: str) -> Any:
+    """
+    Unpickles the low dimensional data (an rlbench Demo) of the given episode.
+    Notice that rlbench has to be importable for this to work
+    """
+    with open(os.path.join(episode_path, LOW_DIM_PICKLE), "rb") as fhandle:
+        return pickle.load(fhandle)
+
+
+def low_dim_arrays(
+    demo: Any, fields: List[str] = DEFAULT_LOW_DIM_FIELDS
+) -> Dict[str, NDArray]:
+    """
+    Stacks the requested low dimensional fields of all observations in a demo
+    into (num_frames, dim) float32 arrays
+
+    Parameters
+    ----------
+        demo: Demo
+            The rlbench demo from which to extract the low dimensional data
+        fields: List[str]
+            The names of the Observation attributes to extract
+
+    Returns
+    -------
+        Dict[str, NDArray]
+            A map from field name to the stacked array for that field
+    """
+    arrays: Dict[str, NDArray] = {}
+    for name in fields:
+        values = [getattr(demo[i], name) for i in range(len(demo))]
+        if any(value is None for value in values):
+            continue
+        arrays[name] = np.asarray(values, dtype=np.float32).reshape(
+            len(values), -1
+        )
+    return arrays
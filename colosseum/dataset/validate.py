@@ -0,0 +1,326 @@
+import json
+import os
+import pickle
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from colosseum.dataset.compact import load_manifest, verify_compact_episode
+from colosseum.dataset.journal import read_journal
+from colosseum.dataset.utils import (
+    CAMERAS_NAMES,
+    IMAGE_FORMAT,
+    IMAGE_MODALITIES,
+    LOW_DIM_PICKLE,
+    VARIATION_DESCRIPTIONS,
+    VARIATION_NUMBER,
+    EpisodeInfo,
+    decode_image,
+    find_episodes,
+    image_folder,
+    load_demo,
+)
+from colosseum.utils import file_checksum
+
+REPORT_FILENAME = "validation_report.json"
+REQUEUE_FILENAME = "requeue.json"
+QUARANTINE_FOLDER = "quarantine"
+
+FRAME_REGEX = re.compile(r"^(\d+)\.png$")
+
+
+def _check_pickle(path: str, name: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return f"missing {name}"
+    try:
+        with open(path, "rb") as fhandle:
+            pickle.load(fhandle)
+    except (ImportError, ModuleNotFoundError):
+        raise
+    except Exception as e:
+        return f"unreadable {name} ({e})"
+    return None
+
+
+def validate_episode(
+    episode: EpisodeInfo,
+    journal_entry: Optional[Dict[str, Any]] = None,
+    decode_images: bool = True,
+    checksums: bool = True,
+) -> Dict[str, Any]:
+    """
+    Checks that an episode was completely written to disk
+
+    Parameters
+    ----------
+        episode: EpisodeInfo
+            The episode to check
+        journal_entry: Optional[Dict[str, Any]]
+            The entry of the collection journal for this episode, if any. The
+            files recorded there must still exist with the same size and hash
+        decode_images: bool
+            Whether or not to fully decode every image (catches truncated
+            files, but it's the most expensive check)
+        checksums: bool
+            Whether or not to compare the checksums recorded in the journal
+
+    Returns
+    -------
+        Dict[str, Any]
+            The result for this episode, with the list of problems found and
+            the image streams it contains
+    """
+    problems: List[str] = []
+
+    # Unpickling needs rlbench. If it isn't installed that's a problem of the
+    # environment, not of the episode, so import errors are let through
+    length: Optional[int] = None
+    if not os.path.isfile(os.path.join(episode.path, LOW_DIM_PICKLE)):
+        problems.append(f"missing {LOW_DIM_PICKLE}")
+    else:
+        try:
+            length = len(load_demo(episode.path))
+        except (ImportError, ModuleNotFoundError):
+            raise
+        except Exception as e:
+            problems.append(f"unreadable {LOW_DIM_PICKLE} ({e})")
+    if length is None and journal_entry is not None:
+        length = journal_entry["length"]
+
+    streams: List[str] = []
+    for camera in CAMERAS_NAMES:
+        for modality in IMAGE_MODALITIES:
+            stream = image_folder(camera, modality)
+            folder = os.path.join(episode.path, stream)
+            if not os.path.isdir(folder):
+                continue
+            streams.append(stream)
+            frames: Set[int] = set()
+            for fname in os.listdir(folder):
+                match = FRAME_REGEX.match(fname)
+                if match is not None:
+                    frames.add(int(match.group(1)))
+            expected = set(range(length if length is not None else 0))
+            if length is not None and len(frames) != length:
+                problems.append(
+                    f"{stream} has {len(frames)} frames, expected {length}"
+                )
+            missing = sorted(expected - frames)
+            if len(missing) > 0:
+                problems.append(f"{stream} is missing frames {missing}")
+            if not decode_images:
+                continue
+            for frame_id in sorted(frames):
+                try:
+                    decode_image(
+                        os.path.join(folder, IMAGE_FORMAT % frame_id), modality
+                    )
+                except Exception as e:
+                    problems.append(
+                        f"{stream}/{IMAGE_FORMAT % frame_id} doesn't decode "
+                        + f"({e})"
+                    )
+
+    manifest = load_manifest(episode.path)
+    if manifest is not None:
+        problems.extend(verify_compact_episode(episode.path, checksums))
+        for stream, stream_info in manifest["streams"].items():
+            if stream not in streams:
+                streams.append(stream)
+            if length is not None and stream_info["length"] != length:
+                problems.append(
+                    f"compact {stream} has {stream_info['length']} frames, "
+                    + f"expected {length}"
+                )
+
+    # Episodes collected with all RLBench variations mixed store both pickles
+    # per episode. Otherwise the descriptions are shared by the variation
+    variation_folder = os.path.dirname(os.path.dirname(episode.path))
+    mixed_variations = not os.path.basename(variation_folder).startswith(
+        "variation"
+    )
+    if mixed_variations:
+        for name in (VARIATION_NUMBER, VARIATION_DESCRIPTIONS):
+            problem = _check_pickle(os.path.join(episode.path, name), name)
+            if problem is not None:
+                problems.append(problem)
+    else:
+        problem = _check_pickle(
+            os.path.join(variation_folder, VARIATION_DESCRIPTIONS),
+            VARIATION_DESCRIPTIONS,
+        )
+        if problem is not None:
+            problems.append(problem)
+
+    if journal_entry is not None:
+        # Images removed after converting the episode to the compact layout
+        converted = manifest["streams"] if manifest is not None else {}
+        for relpath, (size, checksum) in journal_entry["files"].items():
+            fpath = os.path.join(episode.path, relpath)
+            stream = relpath.split(os.sep)[0]
+            if stream in converted and not os.path.exists(
+                os.path.join(episode.path, stream)
+            ):
+                continue
+            if not os.path.isfile(fpath):
+                problems.append(f"{relpath} from the journal is missing")
+            elif os.path.getsize(fpath) != size:
+                problems.append(f"{relpath} doesn't match the journal size")
+            elif checksums and checksum and file_checksum(fpath) != checksum:
+                problems.append(f"{relpath} doesn't match the journal hash")
+
+    return {
+        "task": episode.task_name,
+        "spreadsheet_idx": episode.spreadsheet_idx,
+        "episode_idx": episode.episode_idx,
+        "path": episode.path,
+        "length": length,
+        "streams": streams,
+        "problems": problems,
+    }
+
+
+def validate_dataset(
+    dataset_root: str,
+    tasks: Optional[List[str]] = None,
+    decode_images: bool = True,
+    checksums: bool = True,
+    episodes_per_task: Optional[int] = None,
+    num_workers: int = 8,
+) -> Dict[str, Any]:
+    """
+    Checks every episode of a dataset in parallel, and builds a report with
+    the episodes that have problems, plus the episodes that are missing (gaps
+    in the episode indices of a task variation, or fewer episodes than given
+    by `episodes_per_task`)
+
+    Parameters
+    ----------
+        dataset_root: str
+            The root folder of the dataset (data.save_path)
+        tasks: Optional[List[str]]
+            A list of task names to check (whitelist), or None to check all
+        decode_images: bool
+            Whether or not to fully decode every image
+        checksums: bool
+            Whether or not to compare the checksums recorded in the journal
+        episodes_per_task: Optional[int]
+            The number of episodes expected for each task variation
+        num_workers: int
+            The number of processes used to check the episodes
+
+    Returns
+    -------
+        Dict[str, Any]
+            The report, ready to be serialized as JSON
+    """
+    episodes = find_episodes(dataset_root, tasks)
+    journal = {entry["path"]: entry for entry in read_journal(dataset_root)}
+    journal_entries = [
+        journal.get(os.path.relpath(episode.path, dataset_root))
+        for episode in episodes
+    ]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        results = list(
+            executor.map(
+                partial(
+                    validate_episode,
+                    decode_images=decode_images,
+                    checksums=checksums,
+                ),
+                episodes,
+                journal_entries,
+                chunksize=4,
+            )
+        )
+
+    # Streams present in some episodes of a task variation should be present
+    # in all of them, as they were collected with the same config
+    groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for result in results:
+        result["path"] = os.path.relpath(result["path"], dataset_root)
+        key = (result["task"], result["spreadsheet_idx"])
+        groups.setdefault(key, []).append(result)
+
+    missing: List[Dict[str, Any]] = []
+    for (task, spreadsheet_idx), group in sorted(groups.items()):
+        group_streams = set(s for result in group for s in result["streams"])
+        for result in group:
+            for stream in sorted(group_streams - set(result["streams"])):
+                result["problems"].append(f"missing {stream}")
+        indices = set(result["episode_idx"] for result in group)
+        expected = max(indices) + 1
+        if episodes_per_task is not None:
+            expected = max(expected, episodes_per_task)
+        missing.extend(
+            {
+                "task": task,
+                "spreadsheet_idx": spreadsheet_idx,
+                "episode_idx": episode_idx,
+            }
+            for episode_idx in sorted(set(range(expected)) - indices)
+        )
+
+    invalid = [result for result in results if len(result["problems"]) > 0]
+    return {
+        "dataset_root": os.path.abspath(dataset_root),
+        "num_episodes": len(results),
+        "num_valid": len(results) - len(invalid),
+        "num_invalid": len(invalid),
+        "num_missing": len(missing),
+        "invalid": invalid,
+        "missing": missing,
+    }
+
+
+def write_requeue(dataset_root: str, report: Dict[str, Any]) -> str:
+    """
+    Writes the list of episodes to collect again, grouped by task and
+    spreadsheet index, which `dataset_generator` picks up when the option
+    `data.use_requeue` is set. Returns the path to the written file
+    """
+    requeue: Dict[str, Dict[str, List[int]]] = {}
+    for item in report["invalid"] + report["missing"]:
+        indices = requeue.setdefault(item["task"], {}).setdefault(
+            str(item["spreadsheet_idx"]), []
+        )
+        indices.append(item["episode_idx"])
+    for task_requeue in requeue.values():
+        for indices in task_requeue.values():
+            indices.sort()
+
+    requeue_path = os.path.join(dataset_root, REQUEUE_FILENAME)
+    with open(requeue_path, "w") as fhandle:
+        json.dump(requeue, fhandle, indent=2)
+    return requeue_path
+
+
+def load_requeue(
+    save_path: str, task_name: str, spreadsheet_idx: int
+) -> Optional[List[int]]:
+    """
+    Returns the indices of the episodes of a task variation that should be
+    collected again, or None if nothing was requeued for it
+    """
+    requeue_path = os.path.join(save_path, REQUEUE_FILENAME)
+    if not os.path.isfile(requeue_path):
+        return None
+    with open(requeue_path, "r") as fhandle:
+        requeue = json.load(fhandle)
+    return requeue.get(task_name, {}).get(str(spreadsheet_idx), None)
+
+
+def quarantine_episode(dataset_root: str, relpath: str) -> str:
+    """
+    Moves a broken episode out of the dataset, keeping its relative path under
+    the quarantine folder, so it can be inspected later. Returns the new path
+    """
+    target = os.path.join(dataset_root, QUARANTINE_FOLDER, relpath)
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(os.path.join(dataset_root, relpath), target)
+    return target
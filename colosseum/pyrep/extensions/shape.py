@@ -1,9 +1,12 @@
 import warnings
-from typing import Tuple, Union
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
+from numpy.typing import NDArray
 from pyrep.backend.sim import simGetObjectInt32Parameter
 from pyrep.backend.simConst import sim_shapeintparam_compound
 from pyrep.const import ObjectType, TextureMappingMode
+from pyrep.objects.object import Object
 from pyrep.objects.shape import Shape
 from pyrep.textures.texture import Texture
 
@@ -29,6 +32,12 @@ class ShapeExt(Shape):
         self._obj_name: str = self.get_name()
         self._obj_scale: float = 1.0
 
+        # Dummies contained in the shape and their offsets from the shape, in
+        # the shape's frame, when the shape has a scale of 1.0. These are only
+        # captured the first time a non-model shape is scaled
+        self._dummies: Optional[List[Object]] = None
+        self._dummies_rest_offsets: Optional[NDArray] = None
+
     def set_friction(self, value: float) -> None:
         """
         Updates the friction coefficient of this shape in the simulation
@@ -64,22 +73,40 @@ class ShapeExt(Shape):
         desired_scale = scale
         current_scale = self._obj_scale
         scale_factor = desired_scale / current_scale
-        if self.is_model():
+        is_model = self.is_model()
+        if is_model:
             simSetObjectsScale([self._obj_handle], scale_factor)
         else:
+            self._cache_dummies_offsets()
             simSetObjectScale(self._obj_handle, scale_factor)
         self._obj_scale = desired_scale
 
-        if not self.is_model():
-            obj_init_pos = self.get_position()
-            # Relocate the positions of the dummies (if any)
-            dummies = self.get_objects_in_tree(object_type=ObjectType.DUMMY)
-            vectors_rel_init = [
-                (dummy.get_position() - obj_init_pos) for dummy in dummies
-            ]
-            for dummy, vec_init in zip(dummies, vectors_rel_init):
-                scaled_vec = scale * vec_init
-                dummy.set_position(obj_init_pos + scaled_vec)
+        if not is_model and self._dummies_rest_offsets is not None:
+            # Relocate the dummies (if any) from their offsets at rest, so the
+            # offsets don't compound after scaling the shape many times
+            offsets = desired_scale * self._dummies_rest_offsets
+            for dummy, offset in zip(self._dummies or [], offsets):
+                dummy.set_position(offset, relative_to=self)
+
+    def _cache_dummies_offsets(self) -> None:
+        """
+        Captures the dummies contained in the shape and their offsets at rest,
+        the first time they're needed
+        """
+        if self._dummies is not None:
+            return
+        self._dummies = self.get_objects_in_tree(object_type=ObjectType.DUMMY)
+        if len(self._dummies) < 1:
+            return
+        self._dummies_rest_offsets = (
+            np.array(
+                [
+                    dummy.get_position(relative_to=self)
+                    for dummy in self._dummies
+                ]
+            )
+            / self._obj_scale
+        )
 
     def get_scale(self) -> float:
         """Returns the current scale of the shape"""
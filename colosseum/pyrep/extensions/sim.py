@@ -1,8 +1,25 @@
-from typing import List
+import hashlib
+import os
+import warnings
+from typing import Dict, List, Optional
 
+import numpy as np
+from numpy.typing import NDArray
 from pyrep.backend._sim_cffi import ffi, lib
 from pyrep.backend.sim import _check_return, simImportMesh, simReleaseBuffer
 
+from colosseum import CACHE_FOLDER
+from colosseum.utils import file_checksum
+
+# Folder where meshes and convex hulls computed from mesh files are cached,
+# keyed by the checksum of the mesh file and the options used
+MESH_CACHE_FOLDER = os.path.join(CACHE_FOLDER, "meshes")
+# Bump to invalidate the cached data if the way it's computed changes
+MESH_CACHE_VERSION = 1
+
+HULL_MESH_OPTIONS = 3
+HULL_MESH_SHADING_ANGLE = 20.0 * 3.1415 / 180.0
+
 
 def simSetObjectScale(shape_handle: int, scale: float) -> None:
     ret = lib.simScaleObject(shape_handle, scale, scale, scale, 0)
@@ -19,16 +36,86 @@ def simSetObjectsScale(objects_handles: List[int], scale: float) -> None:
     _check_return(ret)
 
 
-def simGetConvexHullShape(pathAndFilename):
-    vertices, _, _ = simImportMesh(0, pathAndFilename, 0, False, 1.0)
+def _meshCachePath(pathAndFilename: str, kind: str, options: str) -> str:
+    key = hashlib.sha256(
+        ";".join(
+            [
+                file_checksum(pathAndFilename),
+                kind,
+                options,
+                str(MESH_CACHE_VERSION),
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(MESH_CACHE_FOLDER, f"{kind}_{key}.npz")
+
+
+def _loadMeshCache(cache_path: str) -> Optional[Dict[str, NDArray]]:
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with np.load(cache_path) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError):
+        return None
+
+
+def _saveMeshCache(cache_path: str, arrays: Dict[str, NDArray]) -> None:
+    # Written to a temporary file first, so concurrent workers never read a
+    # partially written file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    try:
+        os.makedirs(MESH_CACHE_FOLDER, exist_ok=True)
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        warnings.warn(f"Couldn't save the mesh cache {cache_path}: {e}")
+
+
+def simImportMeshData(
+    pathAndFilename: str, use_cache: bool = True
+) -> List[NDArray]:
+    """
+    Returns the vertices of the meshes in the given mesh file, as flat arrays
+    of (x, y, z) coordinates, reading them from the mesh cache if available
+    """
+    cache_path = _meshCachePath(pathAndFilename, "mesh", "vertices")
+    cached = _loadMeshCache(cache_path) if use_cache else None
+    if cached is not None:
+        return [cached[f"vertices_{i}"] for i in range(len(cached))]
 
+    vertices, _, _ = simImportMesh(0, pathAndFilename, 0, False, 1.0)
+    meshes = [np.asarray(mesh, dtype=np.float32) for mesh in vertices]
+    if use_cache:
+        _saveMeshCache(
+            cache_path,
+            {f"vertices_{i}": mesh for i, mesh in enumerate(meshes)},
+        )
+    return meshes
+
+
+def simGetConvexHull(
+    pathAndFilename: str, use_cache: bool = True
+) -> Dict[str, NDArray]:
+    """
+    Returns the vertices and indices of the convex hull of the first mesh in
+    the given mesh file, computing it only if it isn't in the mesh cache
+    """
+    cache_path = _meshCachePath(pathAndFilename, "hull", "qhull")
+    cached = _loadMeshCache(cache_path) if use_cache else None
+    if cached is not None:
+        return cached
+
+    vertices = simImportMeshData(pathAndFilename, use_cache)[0]
+
+    in_vertices = ffi.new("float[]", vertices.tolist())
     outVertices = ffi.new("float **")
     outVerticesCount = ffi.new("int *")
     outIndices = ffi.new("int **")
     outIndicesCount = ffi.new("int *")
     ret = lib.simGetQHull(
-        vertices[0],
-        len(vertices[0]),
+        in_vertices,
+        len(vertices),
         outVertices,
         outVerticesCount,
         outIndices,
@@ -38,23 +125,49 @@ def simGetConvexHullShape(pathAndFilename):
     )
     _check_return(ret)
 
-    mesh_options = 3
-    mesh_shading_angle = 20.0 * 3.1415 / 180.0
+    hull = {
+        "vertices": np.frombuffer(
+            ffi.buffer(outVertices[0], outVerticesCount[0] * 4),
+            dtype=np.float32,
+        ).copy(),
+        "indices": np.frombuffer(
+            ffi.buffer(outIndices[0], outIndicesCount[0] * 4),
+            dtype=np.int32,
+        ).copy(),
+    }
+    simReleaseBuffer(ffi.cast("char *", outVertices[0]))
+    simReleaseBuffer(ffi.cast("char *", outIndices[0]))
+
+    if use_cache:
+        _saveMeshCache(cache_path, hull)
+    return hull
+
+
+def simCreateMeshShape(
+    vertices: NDArray,
+    indices: NDArray,
+    options: int = HULL_MESH_OPTIONS,
+    shadingAngle: float = HULL_MESH_SHADING_ANGLE,
+) -> int:
+    """Creates a shape from flat arrays of vertices and indices"""
     handle = lib.simCreateMeshShape(
-        mesh_options,
-        mesh_shading_angle,
-        outVertices[0],
-        outVerticesCount[0],
-        outIndices[0],
-        outIndicesCount[0],
+        options,
+        shadingAngle,
+        ffi.new("float[]", vertices.tolist()),
+        len(vertices),
+        ffi.new("int[]", indices.tolist()),
+        len(indices),
         ffi.NULL,
     )
-
-    simReleaseBuffer(ffi.cast("char *", outVertices[0]))
-    simReleaseBuffer(ffi.cast("char *", outIndices[0]))
+    _check_return(handle)
     return handle
 
 
+def simGetConvexHullShape(pathAndFilename, use_cache: bool = True):
+    hull = simGetConvexHull(pathAndFilename, use_cache)
+    return simCreateMeshShape(hull["vertices"], hull["indices"])
+
+
 def simGetShapeTextureIdNoThrow(objectHandle):
     """Returns the texture ID, and -1 otherwise (instead of throwing)"""
     return lib.simGetShapeTextureId(objectHandle)
@@ -23,6 +23,7 @@ from rlbench.sim2real.domain_randomization_scene import DomainRandomizationScene
 
 from colosseum.rlbench.extensions.scene import SceneExt
 from colosseum.rlbench.extensions.task_environment import TaskEnvironmentExt
+from colosseum.variations.manager import VariationsManager
 
 # If the user doesn't provide the location of .ttm files, use this as default
 DEFAULT_PATH_TTMS = os.path.join(
@@ -155,6 +156,20 @@ class EnvironmentExt(Environment):
         # ---------------------------------------------------------------------
         self._action_mode.arm_action_mode.set_control_mode(self._robot)
 
+    def shutdown(self) -> None:
+        if isinstance(self._scene, SceneExt):
+            self._scene.shutdown_variations()
+        super().shutdown()
+
+    def get_variations_manager(self) -> Optional[VariationsManager]:
+        """
+        Returns the manager of the variations in the scene, or None if the
+        scene doesn't use our variations
+        """
+        if isinstance(self._scene, SceneExt):
+            return self._scene.variations_manager
+        return None
+
     def get_task(self, task_class: Type[Task]) -> TaskEnvironmentExt:
 
         # If user hasn't called launch, implicitly call it.
@@ -1,7 +1,7 @@
 import inspect
 import os
 import warnings
-from typing import List
+from typing import List, Optional
 
 from omegaconf import DictConfig, ListConfig
 from pyrep import PyRep
@@ -12,6 +12,12 @@ from rlbench.environment import Task
 from rlbench.observation_config import ObservationConfig
 
 from colosseum.variations.manager import VariationsManager
+from colosseum.variations.model_pool import DEFAULT_MODEL_POOL_SIZE, ModelPool
+from colosseum.variations.texture_cache import (
+    DEFAULT_TEXTURE_CACHE_SIZE,
+    TextureCache,
+)
+from colosseum.variations.utils import safeGetValue
 
 # If the user doesn't provide the location of .ttm files, use this as default
 DEFAULT_PATH_TTMS = os.path.join(
@@ -48,7 +54,18 @@ class SceneExt(Scene):
                 The path where the .ttm files of the tasks are located
             scene_config: DictConfig
                 The configuration of the scene, which includes the factors that
-                will be used to generate the variations in the simulation
+                will be used to generate the variations in the simulation, and
+                optionally the number of textures kept loaded in simulation
+                (texture_cache_size), of parked distractor models kept for
+                reuse (model_pool_size), and the render size used to pick the
+                downscaled variant of the textures (texture_size, 'auto' for
+                the largest image rendered by an RGB camera, or 0 to load the
+                original textures, the default).
+                Setting profile_variations times the calls to each variation,
+                and the summary is written to profile_path (or printed) when
+                the environment shuts down. The failure_rejection config
+                enables rejecting samples similar to the ones that led to
+                failed demos
         """
         super().__init__(pyrep, robot, obs_config, robot_setup)
 
@@ -61,7 +78,57 @@ class SceneExt(Scene):
         else:
             factors_config = scene_config.factors
 
-        self._var_manager = VariationsManager(self.pyrep, factors_config)
+        self._var_manager = VariationsManager(
+            self.pyrep,
+            factors_config,
+            profile=safeGetValue(scene_config, "profile_variations", False),
+            rejection_config=safeGetValue(
+                scene_config, "failure_rejection", None
+            ),
+        )
+        self._profile_path: Optional[str] = safeGetValue(
+            scene_config, "profile_path", None
+        )
+
+        texture_size = safeGetValue(scene_config, "texture_size", 0)
+        if texture_size == "auto":
+            texture_size = self._get_render_size(obs_config)
+        TextureCache.instance().set_render_size(texture_size)
+        TextureCache.instance().set_capacity(
+            safeGetValue(
+                scene_config, "texture_cache_size", DEFAULT_TEXTURE_CACHE_SIZE
+            )
+        )
+        ModelPool.instance().set_capacity(
+            safeGetValue(
+                scene_config, "model_pool_size", DEFAULT_MODEL_POOL_SIZE
+            )
+        )
+
+    def _get_render_size(self, obs_config: ObservationConfig) -> int:
+        """
+        Returns the largest side of the RGB images rendered by the enabled
+        cameras, or 0 (the original textures) if no camera renders RGB images
+        """
+        cameras = [
+            obs_config.left_shoulder_camera,
+            obs_config.right_shoulder_camera,
+            obs_config.overhead_camera,
+            obs_config.wrist_camera,
+            obs_config.front_camera,
+        ]
+        return max(
+            [max(camera.image_size) for camera in cameras if camera.rgb],
+            default=0,
+        )
+
+    @property
+    def variations_manager(self) -> VariationsManager:
+        return self._var_manager
+
+    def shutdown_variations(self) -> None:
+        """Writes the profile of the variations, if they were profiled"""
+        self._var_manager.shutdown(self._profile_path)
 
     def load(self, task: Task) -> None:
         """
@@ -1,16 +1,26 @@
-from typing import List
+from typing import List, Optional, Tuple
 
 import numpy as np
+from numpy.typing import NDArray
 from pyrep.objects.object import Object
 from rlbench.backend.exceptions import BoundaryError
 from rlbench.backend.spawn_boundary import SpawnBoundary
 
+# Number of candidate positions proposed at once for each placement
+NUM_CANDIDATES = 64
+
+# A footprint is the (x, y) position in world coordinates of an object placed
+# within the boundaries, the radius of a circle that contains its bounding box
+# for any rotation around z, and the object itself
+Footprint = Tuple[NDArray, float, Object]
+
 
 class SpawnBoundaryExt(SpawnBoundary):
     def __init__(
         self,
         boundaries: List[Object],
         use_boundary_as_init_location: bool = True,
+        use_footprints: bool = True,
     ):
         """
         Extension of SpawnBoundary, which allows to use the coordinates of the
@@ -23,10 +33,49 @@ class SpawnBoundaryExt(SpawnBoundary):
         use_boundary_as_init_location: bool
             A flag used to indicate whether or not use the coordinates of the
             sampled boundary for the sampled object.
+        use_footprints: bool
+            A flag used to indicate whether or not to keep track of the space
+            taken by the objects already placed, and propose only positions
+            that are free, instead of sampling positions blindly and asking the
+            simulator whether they collide.
         """
         super().__init__(boundaries)
 
         self._use_boundary_as_init_location = use_boundary_as_init_location
+        self._use_footprints = use_footprints
+        self._footprints: List[Footprint] = []
+
+        # Extents of each boundary in its own frame (min_x, max_x, min_y,
+        # max_y, min_z, max_z), as the boundaries don't change their shape
+        self._extents: NDArray = np.array(
+            [
+                boundary._boundary.get_bounding_box()
+                for boundary in self._boundaries
+            ]
+        )
+
+        self._num_placed: int = 0
+        self._num_fallbacks: int = 0
+        self._num_collision_checks: int = 0
+
+    @property
+    def num_placed(self) -> int:
+        """Number of objects placed using the footprints of placed objects"""
+        return self._num_placed
+
+    @property
+    def num_fallbacks(self) -> int:
+        """Number of objects placed falling back to rejection sampling"""
+        return self._num_fallbacks
+
+    @property
+    def num_collision_checks(self) -> int:
+        """Number of collision queries made to confirm placements"""
+        return self._num_collision_checks
+
+    def clear(self) -> None:
+        super().clear()
+        self._footprints.clear()
 
     def sample(
         self,
@@ -35,6 +84,125 @@ class SpawnBoundaryExt(SpawnBoundary):
         min_rotation=(0.0, 0.0, -3.14),
         max_rotation=(0.0, 0.0, 3.14),
         min_distance=0.01,
+    ) -> None:
+        if self._use_footprints:
+            if self._place_in_free_space(
+                obj, ignore_collisions, min_rotation, max_rotation, min_distance
+            ):
+                self._num_placed += 1
+                return
+            self._num_fallbacks += 1
+
+        self._sample_with_rejection(
+            obj, ignore_collisions, min_rotation, max_rotation, min_distance
+        )
+        if self._use_footprints:
+            self._footprints.append(
+                (obj.get_position()[:2], self._footprint_radius(obj), obj)
+            )
+
+    def _place_in_free_space(
+        self,
+        obj: Object,
+        ignore_collisions: bool,
+        min_rotation: Tuple[float, float, float],
+        max_rotation: Tuple[float, float, float],
+        min_distance: float,
+    ) -> bool:
+        """
+        Places the object at a position proposed from the free space left by
+        the objects already placed (dart throwing over the footprints), and
+        only asks the simulator to confirm the chosen position
+        """
+        radius = self._footprint_radius(obj)
+        obj_bbox = (
+            obj.get_model_bounding_box()
+            if obj.is_model()
+            else obj.get_bounding_box()
+        )
+
+        # Propose candidates within the boundaries, far enough from the edges
+        boundaries_idxs = np.random.choice(
+            len(self._boundaries), size=NUM_CANDIDATES, p=self._probabilities
+        )
+        extents = self._extents[boundaries_idxs]
+        low = extents[:, [0, 2]] + radius
+        high = extents[:, [1, 3]] - radius
+        fits = np.all(low <= high, axis=1)
+        if not fits.any():
+            return False
+        local_xy = low + np.random.uniform(size=low.shape) * (high - low)
+        local_z = np.where(
+            extents[:, 5] - extents[:, 4] < 1e-3,
+            extents[:, 5],
+            np.random.uniform(
+                extents[:, 4] + abs(obj_bbox[4]),
+                np.maximum(
+                    extents[:, 4] + abs(obj_bbox[4]),
+                    extents[:, 5] - obj_bbox[5],
+                ),
+            ),
+        )
+        local_pos = np.column_stack([local_xy, local_z])
+
+        # Discard the candidates that overlap the footprints of placed objects
+        matrices = [
+            boundary._boundary.get_matrix() for boundary in self._boundaries
+        ]
+        world_xy = np.array(
+            [
+                (matrices[b_idx][:3, :3] @ pos + matrices[b_idx][:3, 3])[:2]
+                for b_idx, pos in zip(boundaries_idxs, local_pos)
+            ]
+        )
+        free = fits
+        for center, other_radius, _ in self._footprints:
+            distances = np.linalg.norm(world_xy - center, axis=1)
+            free &= distances >= radius + other_radius + min_distance
+
+        for cand_idx in np.flatnonzero(free):
+            boundary = self._boundaries[boundaries_idxs[cand_idx]]
+            obj.set_position(
+                local_pos[cand_idx].tolist(), relative_to=boundary._boundary
+            )
+            obj.rotate(
+                list(np.random.uniform(list(min_rotation), list(max_rotation)))
+            )
+            if not ignore_collisions and self._collides(obj):
+                continue
+            self._footprints.append((world_xy[cand_idx], radius, obj))
+            contained: Optional[List[Object]] = getattr(
+                boundary, "_contained_objects", None
+            )
+            if contained is not None:
+                contained.append(obj)
+            return True
+        return False
+
+    def _collides(self, obj: Object) -> bool:
+        for _, _, other in self._footprints:
+            self._num_collision_checks += 1
+            if obj.check_collision(other):
+                return True
+        return False
+
+    def _footprint_radius(self, obj: Object) -> float:
+        bbox = (
+            obj.get_model_bounding_box()
+            if obj.is_model()
+            else obj.get_bounding_box()
+        )
+        half_x = max(abs(bbox[0]), abs(bbox[1]))
+        half_y = max(abs(bbox[2]), abs(bbox[3]))
+        return float(np.hypot(half_x, half_y))
+
+    def _sample_with_rejection(
+        self,
+        obj: Object,
+        ignore_collisions: bool,
+        min_rotation: Tuple[float, float, float],
+        max_rotation: Tuple[float, float, float],
+        min_distance: float,
     ) -> None:
         collision_fails = boundary_fails = self.MAX_SAMPLES
         while collision_fails > 0 and boundary_fails > 0:
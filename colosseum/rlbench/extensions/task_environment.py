@@ -16,6 +16,8 @@ from rlbench.demo import Demo
 from rlbench.observation_config import ObservationConfig
 from rlbench.task_environment import TaskEnvironment
 
+from colosseum.rlbench.extensions.scene import SceneExt
+
 _DT = 0.05
 _MAX_RESET_ATTEMPTS = 40
 _MAX_DEMO_ATTEMPTS = 10
@@ -71,15 +73,22 @@ class TaskEnvironmentExt(TaskEnvironment):
                         callable_each_step=callable_each_step)
                     demo.random_seed = random_seed
                     demos.append(demo)
+                    self._on_demo_finished(failed=False)
                     break
                 except Exception as e:
                     attempts -= 1
+                    self._on_demo_finished(failed=True)
                     logging.info('Bad demo. ' + str(e) + ' Attempts left: ' + str(attempts))
             if attempts <= 0:
                 raise RuntimeError(
                     'Could not collect demos. Maybe a problem with the task?')
         return demos
 
+    def _on_demo_finished(self, failed: bool) -> None:
+        """Lets the variations learn which samples lead to failed demos"""
+        if isinstance(self._scene, SceneExt):
+            self._scene.variations_manager.on_demo_finished(failed)
+
     def reset_to_demo(self, demo: Demo) -> (List[str], Observation):
         demo.restore_state()
         return self.reset()
@@ -21,7 +21,9 @@ from rlbench.demo import Demo
 from rlbench.observation_config import ObservationConfig
 
 from colosseum import TASKS_PY_FOLDER as DEFAULT_TASKS_PY_FOLDER
+from colosseum.dataset.keyframes import keyframes_from_demo, save_keyframes
 from colosseum.rlbench.extensions.environment import EnvironmentExt
+from colosseum.variations.utils import safeGetValue
 
 
 @dataclass
@@ -433,6 +435,9 @@ def save_demo(
     with open(os.path.join(example_path, const.LOW_DIM_PICKLE), "wb") as f:
         pickle.dump(demo, f)
 
+    if safeGetValue(data_cfg, "save_keyframes", True):
+        save_keyframes(example_path, keyframes_from_demo(demo))
+
     if variation is not None:
         with open(
             os.path.join(example_path, "variation_number.pkl"), "wb"
@@ -0,0 +1,69 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Tuple
+
+from colosseum.dataset.keyframes import (
+    keyframes_from_demo,
+    load_keyframes,
+    save_keyframes,
+)
+from colosseum.dataset.utils import EpisodeInfo, find_episodes, load_demo
+
+
+def process_episode(
+    episode: EpisodeInfo, stopping_delta: float, overwrite: bool
+) -> Tuple[str, int]:
+    """
+    Computes and stores the keyframes of a single episode. Returns the path of
+    the episode and its number of keyframes, or -1 if it was skipped
+    """
+    if not overwrite and load_keyframes(episode.path) is not None:
+        return episode.path, -1
+    keyframes = keyframes_from_demo(load_demo(episode.path), stopping_delta)
+    save_keyframes(episode.path, keyframes)
+    return episode.path, len(keyframes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Precomputes the keyframes of every episode of a dataset"
+    )
+    parser.add_argument("dataset_root", type=str)
+    parser.add_argument("--tasks", type=str, nargs="*", default=None)
+    parser.add_argument("--stopping-delta", type=float, default=0.1)
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Recompute the keyframes of episodes that already have them",
+    )
+    args = parser.parse_args()
+
+    episodes = find_episodes(args.dataset_root, args.tasks)
+    num_processed = num_skipped = 0
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        for path, num_keyframes in executor.map(
+            partial(
+                process_episode,
+                stopping_delta=args.stopping_delta,
+                overwrite=args.overwrite,
+            ),
+            episodes,
+            chunksize=4,
+        ):
+            if num_keyframes < 0:
+                num_skipped += 1
+            else:
+                num_processed += 1
+                print(f"{path}: {num_keyframes} keyframes")
+
+    print(
+        f"Done! processed {num_processed} episodes, "
+        + f"skipped {num_skipped} that already had keyframes"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    SystemExit(main())
@@ -0,0 +1,121 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Tuple
+
+from colosseum.dataset.compact import (
+    convert_episode,
+    delete_source_images,
+    load_manifest,
+    verify_compact_episode,
+)
+from colosseum.dataset.utils import EpisodeInfo, find_episodes
+
+
+def process_episode(
+    episode: EpisodeInfo,
+    chunk_size: int,
+    with_low_dim: bool,
+    delete_source: bool,
+    overwrite: bool,
+) -> Tuple[str, int, int]:
+    """
+    Converts a single episode into the compact layout. Episodes that were
+    already converted, and whose files still match their manifest, are skipped.
+    Returns the path of the episode and its size in bytes before and after the
+    conversion (-1 for skipped episodes)
+    """
+    manifest = load_manifest(episode.path)
+    if (
+        not overwrite
+        and manifest is not None
+        and len(verify_compact_episode(episode.path)) == 0
+    ):
+        if delete_source:
+            delete_source_images(episode.path)
+        return episode.path, -1, -1
+
+    manifest = convert_episode(episode.path, chunk_size, with_low_dim)
+    problems = verify_compact_episode(episode.path)
+    if len(problems) > 0:
+        raise RuntimeError(f"{episode.path}: {', '.join(problems)}")
+    if delete_source:
+        delete_source_images(episode.path)
+
+    return (
+        episode.path,
+        manifest["source_bytes"],
+        sum(size for size, _ in manifest["files"].values()),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Converts the episodes of a dataset from the folder of "
+        + "PNGs layout into the compact layout (chunked arrays, 16 bits depth, "
+        + "palette masks and structured low dimensional data)"
+    )
+    parser.add_argument("dataset_root", type=str)
+    parser.add_argument("--tasks", type=str, nargs="*", default=None)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "--no-low-dim",
+        action="store_true",
+        help="Don't store the structured low dimensional data (which requires "
+        + "rlbench to unpickle the demos)",
+    )
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Remove the PNG folders of each episode once its conversion was "
+        + "verified. The low_dim_obs.pkl file is always kept",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Convert again the episodes that were already converted",
+    )
+    args = parser.parse_args()
+
+    assert args.chunk_size > 0, "Chunk size must be a positive number"
+
+    episodes = find_episodes(args.dataset_root, args.tasks)
+    num_converted = num_skipped = num_failed = 0
+    source_bytes = compact_bytes = 0
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        futures = {
+            executor.submit(
+                process_episode,
+                episode,
+                args.chunk_size,
+                not args.no_low_dim,
+                args.delete_source,
+                args.overwrite,
+            ): episode
+            for episode in episodes
+        }
+        for future in as_completed(futures):
+            try:
+                path, before, after = future.result()
+            except Exception as e:
+                num_failed += 1
+                print(f"Failed to convert {futures[future].path}: {e}")
+                continue
+            if before < 0:
+                num_skipped += 1
+                continue
+            num_converted += 1
+            source_bytes += before
+            compact_bytes += after
+            print(f"{path}: {before / 2**20:.1f}MB -> {after / 2**20:.1f}MB")
+
+    print(
+        f"Done! converted {num_converted} episodes "
+        + f"({source_bytes / 2**20:.1f}MB -> {compact_bytes / 2**20:.1f}MB), "
+        + f"skipped {num_skipped} already converted, {num_failed} failed"
+    )
+    return 0 if num_failed == 0 else 1
+
+
+if __name__ == "__main__":
+    SystemExit(main())
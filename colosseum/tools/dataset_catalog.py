@@ -0,0 +1,83 @@
+import argparse
+import os
+
+from colosseum.dataset.catalog import (
+    CATALOG_FILENAME,
+    DatasetCatalog,
+    build_catalog,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Builds and queries the SQLite catalog of a dataset"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the catalog")
+    build_parser.add_argument("dataset_root", type=str)
+    build_parser.add_argument("--output", type=str, default=None)
+    build_parser.add_argument(
+        "--from-journal",
+        action="store_true",
+        help="Use the collection journal instead of scanning the dataset",
+    )
+    build_parser.add_argument(
+        "--no-checksums",
+        action="store_true",
+        help="Don't compute checksums when scanning the dataset",
+    )
+    build_parser.add_argument("--num-workers", type=int, default=8)
+
+    query_parser = subparsers.add_parser("query", help="Query the catalog")
+    query_parser.add_argument("catalog", type=str)
+    query_parser.add_argument("--task", type=str, default=None)
+    query_parser.add_argument("--spreadsheet-idx", type=int, default=None)
+    query_parser.add_argument("--variation-name", type=str, default=None)
+    query_parser.add_argument("--rlbench-variation", type=int, default=None)
+    query_parser.add_argument(
+        "--enabled",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Factors (types or names) that must be enabled",
+    )
+    query_parser.add_argument(
+        "--disabled",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Factors (types or names) that must be disabled",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        db_path = build_catalog(
+            args.dataset_root,
+            args.output,
+            from_journal=args.from_journal,
+            checksums=not args.no_checksums,
+            num_workers=args.num_workers,
+        )
+        print(f"Saved catalog to {db_path}")
+    else:
+        db_path = args.catalog
+        if os.path.isdir(db_path):
+            db_path = os.path.join(db_path, CATALOG_FILENAME)
+        with DatasetCatalog(db_path) as catalog:
+            for episode in catalog.episodes(
+                task=args.task,
+                spreadsheet_idx=args.spreadsheet_idx,
+                variation_name=args.variation_name,
+                rlbench_variation=args.rlbench_variation,
+                factors_enabled=args.enabled,
+                factors_disabled=args.disabled,
+            ):
+                print(episode.path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    SystemExit(main())
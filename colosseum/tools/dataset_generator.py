@@ -4,7 +4,7 @@ import json
 import os
 import pickle
 from multiprocessing import Manager, Process
-from typing import Any, Dict, Optional, Type, cast
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
 
 import hydra
 import numpy as np
@@ -14,6 +14,8 @@ from rlbench.action_modes.arm_action_modes import JointVelocity
 from rlbench.action_modes.gripper_action_modes import Discrete
 from rlbench.backend import const
 from rlbench.backend.task import Task
+from rlbench.demo import Demo
+from rlbench.task_environment import TaskEnvironment
 
 from colosseum import (
     ASSETS_CONFIGS_FOLDER,
@@ -21,6 +23,9 @@ from colosseum import (
     TASKS_PY_FOLDER,
     TASKS_TTM_FOLDER,
 )
+from colosseum.dataset.journal import append_journal_entry, make_journal_entry
+from colosseum.dataset.utils import VARIATION_PARAMS
+from colosseum.dataset.validate import load_requeue
 from colosseum.rlbench.extensions.environment import EnvironmentExt
 from colosseum.rlbench.utils import (
     ObservationConfigExt,
@@ -28,6 +33,15 @@ from colosseum.rlbench.utils import (
     name_to_class,
     save_demo,
 )
+from colosseum.variations.manager import (
+    PlanAssets,
+    VariationsManager,
+    VariationsPlan,
+    loadPlan,
+    loadPlanAssets,
+    remapPlanAssets,
+    savePlan,
+)
 from colosseum.variations.utils import safeGetValue
 
 OmegaConf.register_new_resolver("eval", eval)
@@ -54,6 +68,95 @@ class SaveCollectionState:
         self.save_path = save_path
 
 
+# What's needed to collect an episode again: the parameters applied by the
+# variations, the state of numpy's global random generator when the episode
+# started (object placements), the RLBench variation index, if saved, and the
+# filenames of the assets the parameters refer to, if saved
+ReplayData = Tuple[VariationsPlan, Optional[Any], Optional[int], PlanAssets]
+
+
+def load_replay(
+    replay_root: str, save_root: str, episode_path: str
+) -> Optional[ReplayData]:
+    """
+    Loads the data recorded for the episode at the same location as the given
+    episode path, but in the dataset being replayed
+    """
+    src_path = os.path.join(
+        replay_root, os.path.relpath(episode_path, save_root)
+    )
+    params_path = os.path.join(src_path, VARIATION_PARAMS)
+    demo_path = os.path.join(src_path, const.LOW_DIM_PICKLE)
+    if not os.path.isfile(params_path) or not os.path.isfile(demo_path):
+        print(f"Can't replay {src_path}, its variation parameters are missing")
+        return None
+
+    with open(demo_path, "rb") as fhandle:
+        random_seed = getattr(pickle.load(fhandle), "random_seed", None)
+    if random_seed is None:
+        print(f"{src_path} has no random seed, objects will be placed anew")
+
+    var_number: Optional[int] = None
+    var_number_path = os.path.join(src_path, const.VARIATION_NUMBER)
+    if os.path.isfile(var_number_path):
+        with open(var_number_path, "rb") as fhandle:
+            var_number = pickle.load(fhandle)
+
+    assets = loadPlanAssets(params_path)
+    if len(assets) < 1:
+        print(
+            f"{src_path} has no asset filenames, textures and models are "
+            + "assumed to be listed in the same order as when recorded"
+        )
+
+    return loadPlan(params_path), random_seed, var_number, assets
+
+
+def get_replay_indices(
+    data_cfg: DictConfig, ex_indices: List[int]
+) -> Optional[List[int]]:
+    """
+    Returns the indices of the episodes to collect again when replaying a
+    dataset (data.replay_from), optionally only the ones in data.replay_episodes
+    """
+    if safeGetValue(data_cfg, "replay_from", None) is None:
+        return None
+    replay_episodes = safeGetValue(data_cfg, "replay_episodes", None)
+    if replay_episodes is None:
+        return ex_indices
+    return [int(ex_idx) for ex_idx in replay_episodes]
+
+
+def collect_demo(
+    task_env: TaskEnvironment,
+    var_manager: Optional[VariationsManager],
+    replay: Optional[ReplayData],
+) -> Demo:
+    """
+    Collects a single live demo. When replaying an episode, the demo is tried
+    only once, starting from the recorded variation parameters and state of
+    the random generator, as retrying within get_demos would continue from
+    other values and the episode would no longer be a replay
+    """
+    if replay is None:
+        (demo,) = task_env.get_demos(amount=1, live_demos=True)
+        return demo
+
+    plan, random_seed, _, assets = replay
+    if var_manager is not None:
+        # The assets are matched by filename, as their indices may differ
+        plan = remapPlanAssets(plan, assets, var_manager.plan_assets())
+        var_manager.set_plan(plan, strict=True)
+    if random_seed is not None:
+        np.random.set_state(random_seed)
+    try:
+        (demo,) = task_env.get_demos(amount=1, live_demos=True, max_attempts=1)
+    finally:
+        if var_manager is not None:
+            var_manager.set_plan(None)
+    return demo
+
+
 def get_spreadsheet_config(
     base_cfg: DictConfig, collection_cfg: Dict[str, Any], spreadsheet_idx: int
 ) -> DictConfig:
@@ -165,6 +268,7 @@ def run_all_rlbench_variations(
     check_and_make(episodes_path)
 
     use_save_states = safeGetValue(data_cfg, "use_save_states", False)
+    use_journal = safeGetValue(data_cfg, "use_journal", False)
     save_state: Optional[SaveCollectionState] = None
     save_state_path = os.path.join(episodes_path, "save_state.pkl")
     if (
@@ -185,9 +289,35 @@ def run_all_rlbench_variations(
         )
 
     ex_start = save_state.number_episodes if save_state is not None else 0
+    ex_indices = list(range(ex_start, data_cfg.episodes_per_task))
+    if safeGetValue(data_cfg, "use_requeue", False):
+        # Collect again only the episodes flagged by validate_dataset
+        requeued = load_requeue(data_cfg.save_path, task_env.get_name(), i)
+        if requeued is not None:
+            ex_indices, save_state = requeued, None
+    replay_indices = get_replay_indices(data_cfg, ex_indices)
+    if replay_indices is not None:
+        # Collect again the episodes of another dataset, applying exactly the
+        # same variations (e.g. to render them at a higher resolution)
+        ex_indices, save_state = replay_indices, None
+    var_manager = rlbench_env.get_variations_manager()
+
     abort_variation = False
-    for ex_idx in range(ex_start, data_cfg.episodes_per_task):
+    for ex_idx in ex_indices:
+        episode_path = os.path.join(
+            episodes_path, const.EPISODE_FOLDER % ex_idx
+        )
+        replay: Optional[ReplayData] = None
+        if replay_indices is not None:
+            replay = load_replay(
+                data_cfg.replay_from, data_cfg.save_path, episode_path
+            )
+            if replay is None:
+                continue
+
         var_idx = np.random.randint(task_env.variation_count())
+        if replay is not None and replay[2] is not None:
+            var_idx = replay[2]
         task_env.set_variation(var_idx)
         descriptions, _ = task_env.reset()
 
@@ -201,7 +331,7 @@ def run_all_rlbench_variations(
         while attempts > 0:
             try:
                 # TODO: for now we do the explicit looping.
-                (demo,) = task_env.get_demos(amount=1, live_demos=True)
+                demo = collect_demo(task_env, var_manager, replay)
             except Exception as e:
                 attempts -= 1
                 if attempts > 0:
@@ -216,11 +346,14 @@ def run_all_rlbench_variations(
                 tasks_with_problems += problem
                 abort_variation = True
                 break
-            episode_path = os.path.join(
-                episodes_path, const.EPISODE_FOLDER % ex_idx
-            )
             with file_lock:
                 save_demo(data_cfg, demo, episode_path, var_idx)
+                if var_manager is not None:
+                    savePlan(
+                        os.path.join(episode_path, VARIATION_PARAMS),
+                        var_manager.applied_params(),
+                        var_manager.plan_assets(),
+                    )
                 if save_state is not None:
                     save_state.number_episodes += 1
                     with open(save_state.save_path, "wb") as fhandle:
@@ -231,6 +364,21 @@ def run_all_rlbench_variations(
                     "wb",
                 ) as f:
                     pickle.dump(descriptions, f)
+
+                if use_journal:
+                    append_journal_entry(
+                        data_cfg.save_path,
+                        make_journal_entry(
+                            data_cfg.save_path,
+                            episode_path,
+                            task_env.get_name(),
+                            i,
+                            variation_name,
+                            var_idx,
+                            ex_idx,
+                            len(demo),
+                        ),
+                    )
             break
         if abort_variation:
             break
@@ -289,6 +437,7 @@ def run(
     save_state: Optional[SaveCollectionState] = None
     save_state_path = os.path.join(episodes_path, "save_state.pkl")
     use_save_states = safeGetValue(data_cfg, "use_save_states", False)
+    use_journal = safeGetValue(data_cfg, "use_journal", False)
     if (
         os.path.exists(save_state_path)
         and os.path.isfile(save_state_path)
@@ -307,8 +456,32 @@ def run(
         )
 
     ex_start = save_state.number_episodes if save_state is not None else 0
+    ex_indices = list(range(ex_start, data_cfg.episodes_per_task))
+    if safeGetValue(data_cfg, "use_requeue", False):
+        # Collect again only the episodes flagged by validate_dataset
+        requeued = load_requeue(data_cfg.save_path, task_env.get_name(), i)
+        if requeued is not None:
+            ex_indices, save_state = requeued, None
+    replay_indices = get_replay_indices(data_cfg, ex_indices)
+    if replay_indices is not None:
+        # Collect again the episodes of another dataset, applying exactly the
+        # same variations (e.g. to render them at a higher resolution)
+        ex_indices, save_state = replay_indices, None
+    var_manager = rlbench_env.get_variations_manager()
+
     abort_variation = False
-    for ex_idx in range(ex_start, data_cfg.episodes_per_task):
+    for ex_idx in ex_indices:
+        episode_path = os.path.join(
+            episodes_path, const.EPISODE_FOLDER % ex_idx
+        )
+        replay = None
+        if replay_indices is not None:
+            replay = load_replay(
+                data_cfg.replay_from, data_cfg.save_path, episode_path
+            )
+            if replay is None:
+                continue
+
         print(
             "{}// Task: {} // Var: {} // RLBench-Var: {} // Demo: {}".format(
                 i, task_env.get_name(), variation_name, 0, ex_idx
@@ -319,7 +492,7 @@ def run(
         while attempts > 0:
             try:
                 # TODO: for now we do the explicit looping.
-                (demo,) = task_env.get_demos(amount=1, live_demos=True)
+                demo = collect_demo(task_env, var_manager, replay)
             except Exception as e:
                 attempts -= 1
                 if attempts > 0:
@@ -334,15 +507,33 @@ def run(
                 tasks_with_problems += problem
                 abort_variation = True
                 break
-            episode_path = os.path.join(
-                episodes_path, const.EPISODE_FOLDER % ex_idx
-            )
             with file_lock:
                 save_demo(data_cfg, demo, episode_path)
+                if var_manager is not None:
+                    savePlan(
+                        os.path.join(episode_path, VARIATION_PARAMS),
+                        var_manager.applied_params(),
+                        var_manager.plan_assets(),
+                    )
                 if save_state is not None:
                     save_state.number_episodes += 1
                     with open(save_state.save_path, "wb") as fhandle:
                         pickle.dump(save_state, fhandle)
+
+                if use_journal:
+                    append_journal_entry(
+                        data_cfg.save_path,
+                        make_journal_entry(
+                            data_cfg.save_path,
+                            episode_path,
+                            task_env.get_name(),
+                            i,
+                            variation_name,
+                            0,
+                            ex_idx,
+                            len(demo),
+                        ),
+                    )
             break
         if abort_variation:
             break
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Tuple
+
+from colosseum.dataset.catalog import (
+    load_collection_strategy,
+    strategy_variation_name,
+)
+from colosseum.dataset.stats import (
+    DatasetStats,
+    RunningMoments,
+    episode_moments,
+)
+from colosseum.dataset.utils import (
+    CAMERAS_NAMES,
+    DEFAULT_LOW_DIM_FIELDS,
+    EpisodeInfo,
+    find_episodes,
+)
+
+STATS_FILENAME = "dataset_stats.json"
+
+
+def process_episode(
+    episode: EpisodeInfo,
+    cameras: List[str],
+    modalities: List[str],
+    low_dim_fields: List[str],
+) -> Tuple[EpisodeInfo, Dict[str, RunningMoments]]:
+    return episode, episode_moments(
+        episode.path, cameras, modalities, low_dim_fields
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Computes normalization statistics of a dataset, keyed "
+        + "by task and variation"
+    )
+    parser.add_argument("dataset_root", type=str, nargs="?", default=None)
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--tasks", type=str, nargs="*", default=None)
+    parser.add_argument("--cameras", type=str, nargs="*", default=CAMERAS_NAMES)
+    parser.add_argument(
+        "--modalities", type=str, nargs="*", default=["rgb", "depth"]
+    )
+    parser.add_argument(
+        "--low-dim-fields", type=str, nargs="*", default=DEFAULT_LOW_DIM_FIELDS
+    )
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "--merge",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Stats files (e.g. from other shards) to merge into the output",
+    )
+    args = parser.parse_args()
+
+    stats = DatasetStats()
+    for stats_path in args.merge:
+        with open(stats_path, "r") as fhandle:
+            stats.merge(DatasetStats.from_dict(json.load(fhandle)))
+
+    output = args.output
+    if args.dataset_root is not None:
+        episodes = find_episodes(args.dataset_root, args.tasks)
+        strategies = {
+            task: load_collection_strategy(task)
+            for task in set(ep.task_name for ep in episodes)
+        }
+        with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+            for episode, moments in executor.map(
+                partial(
+                    process_episode,
+                    cameras=args.cameras,
+                    modalities=args.modalities,
+                    low_dim_fields=args.low_dim_fields,
+                ),
+                episodes,
+            ):
+                stats.add(
+                    episode.task_name,
+                    str(episode.spreadsheet_idx),
+                    strategy_variation_name(
+                        strategies[episode.task_name], episode.spreadsheet_idx
+                    ),
+                    moments,
+                )
+        if output is None:
+            output = os.path.join(args.dataset_root, STATS_FILENAME)
+
+    if output is None:
+        parser.error("either give a dataset root or an --output file")
+
+    with open(output, "w") as fhandle:
+        json.dump(stats.to_dict(), fhandle, indent=2)
+    print(f"Saved dataset statistics to {output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    SystemExit(main())
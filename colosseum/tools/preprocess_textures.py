@@ -0,0 +1,53 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from colosseum import ASSETS_TEXTURES_FOLDER
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.texture_variants import makeTextureVariant
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Creates the downscaled, power of two variants of the "
+        + "textures used by the variations, for the given render size. The "
+        + "variations only use these variants when env.scene.texture_size is "
+        + "set, either to a size or to 'auto' (from data.image_size)"
+    )
+    parser.add_argument("--folder", type=str, default=ASSETS_TEXTURES_FOLDER)
+    parser.add_argument(
+        "--image-size",
+        type=int,
+        nargs="+",
+        default=[128],
+        help="Render sizes (largest side of the images) to create variants for",
+    )
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    textures = AssetRegistry.instance().textures(args.folder)
+    num_failed = 0
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        futures = {
+            executor.submit(
+                makeTextureVariant, texture.path, image_size, args.overwrite
+            ): texture.path
+            for texture in textures
+            for image_size in args.image_size
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except OSError as e:
+                num_failed += 1
+                print(f"{futures[future]}: {e}")
+
+    print(
+        f"Created the variants of {len(textures)} textures for sizes "
+        + f"{args.image_size} ({num_failed} failed)"
+    )
+    return 0 if num_failed == 0 else 1
+
+
+if __name__ == "__main__":
+    SystemExit(main())
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from typing import Dict, List
+
+import hydra
+import numpy as np
+from numpy.typing import NDArray
+from omegaconf import DictConfig, OmegaConf, open_dict
+from PIL import Image, ImageDraw
+from rlbench.action_modes.action_mode import MoveArmThenGripper
+from rlbench.action_modes.arm_action_modes import JointVelocity
+from rlbench.action_modes.gripper_action_modes import Discrete
+
+from colosseum import ASSETS_CONFIGS_FOLDER, TASKS_PY_FOLDER, TASKS_TTM_FOLDER
+from colosseum.rlbench.extensions.environment import EnvironmentExt
+from colosseum.rlbench.utils import ObservationConfigExt, name_to_class
+from colosseum.variations.manager import planLength, savePlan
+from colosseum.variations.utils import safeGetValue, sliceParams
+
+OmegaConf.register_new_resolver("eval", eval)
+
+PREVIEW_CAMERAS = [
+    "left_shoulder",
+    "right_shoulder",
+    "overhead",
+    "wrist",
+    "front",
+]
+
+DEFAULT_NUM_SAMPLES = 8
+DEFAULT_OUTPUT = "variations_preview.png"
+
+
+def make_contact_sheet(
+    frames: List[Dict[str, NDArray]], cameras: List[str]
+) -> Image.Image:
+    """
+    Arranges the frames captured for each sample into a grid, with one row per
+    sample and one column per camera, labeling each tile
+
+    Parameters
+    ----------
+        frames: List[Dict[str, NDArray]]
+            The RGB frames of each sample, keyed by camera name
+        cameras: List[str]
+            The names of the cameras, in the order of the columns
+
+    Returns
+    -------
+        Image.Image
+            The contact sheet with all the frames
+    """
+    frame_shape = next(
+        (
+            frame.shape[:2]
+            for sample_frames in frames
+            for frame in sample_frames.values()
+        ),
+        None,
+    )
+    if frame_shape is None:
+        raise ValueError("make_contact_sheet > there are no frames to arrange")
+    height, width = frame_shape
+    sheet = Image.new("RGB", (width * len(cameras), height * len(frames)))
+    draw = ImageDraw.Draw(sheet)
+    for sample_idx, sample_frames in enumerate(frames):
+        for camera_idx, camera in enumerate(cameras):
+            left, top = camera_idx * width, sample_idx * height
+            frame = sample_frames.get(camera, None)
+            if frame is not None:
+                sheet.paste(Image.fromarray(frame), (left, top))
+            draw.text(
+                (left + 2, top + 2),
+                f"#{sample_idx} {camera}",
+                fill=(255, 255, 255),
+            )
+    return sheet
+
+
+def mean_max_ms(times: List[float]) -> Dict[str, float]:
+    """Returns the mean and max of the given times, in milliseconds"""
+    if len(times) < 1:
+        return {"mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": 1000.0 * float(np.mean(times)),
+        "max_ms": 1000.0 * float(np.max(times)),
+    }
+
+
+@hydra.main(
+    config_path=ASSETS_CONFIGS_FOLDER,
+    config_name="basketball_in_hoop.yaml",
+    version_base=None,
+)
+def main(cfg: DictConfig) -> int:
+    """
+    Renders a preview of the variations of a task, without collecting demos.
+    The variations are sampled for a number of settings, each one is applied
+    into the scene and a single frame is captured from each chosen camera. The
+    frames are written as a contact sheet, along with the time each variation
+    took to apply and the sampled plan. If no variation is enabled, the default
+    scene is rendered once instead, e.g.:
+
+        preview_variations --config-name close_box \\
+            +preview.num_samples=16 +preview.cameras=[front,overhead]
+    """
+    preview_cfg = safeGetValue(cfg, "preview", DictConfig({}))
+    num_samples = safeGetValue(preview_cfg, "num_samples", DEFAULT_NUM_SAMPLES)
+    cameras = list(safeGetValue(preview_cfg, "cameras", ["front"]))
+    output = os.path.abspath(
+        safeGetValue(preview_cfg, "output", DEFAULT_OUTPUT)
+    )
+    seed = safeGetValue(preview_cfg, "seed", cfg.env.seed)
+
+    if num_samples < 1:
+        print(f"The number of samples must be at least 1, got {num_samples}")
+        return 1
+
+    unknown_cameras = set(cameras) - set(PREVIEW_CAMERAS)
+    if len(unknown_cameras) > 0:
+        print(f"Unknown cameras {unknown_cameras}, use {PREVIEW_CAMERAS}")
+        return 1
+
+    task_class = name_to_class(cfg.env.task_name, TASKS_PY_FOLDER)
+    if task_class is None:
+        return 1
+
+    # Render only the RGB images of the chosen cameras
+    with open_dict(cfg):
+        cfg.data.images.rgb = True
+        cfg.data.images.depth = False
+        cfg.data.images.mask = False
+        cfg.data.images.point_cloud = False
+        for camera in PREVIEW_CAMERAS:
+            cfg.data.cameras[camera] = camera in cameras
+
+    env = EnvironmentExt(
+        action_mode=MoveArmThenGripper(
+            arm_action_mode=JointVelocity(), gripper_action_mode=Discrete()
+        ),
+        obs_config=ObservationConfigExt(cfg.data),
+        headless=True,
+        path_task_ttms=TASKS_TTM_FOLDER,
+        env_config=cfg.env,
+    )
+    env.launch()
+
+    start = time.perf_counter()
+    task_env = env.get_task(task_class)
+    task_env.reset()
+    setup_time = time.perf_counter() - start
+
+    var_manager = env.get_variations_manager()
+    if var_manager is None:
+        print("The environment doesn't use the Colosseum variations")
+        env.shutdown()
+        return 1
+
+    variations = {
+        variation.name: variation
+        for variation in var_manager.variations
+        if variation.enabled
+    }
+    plan = var_manager.sample_plan(num_samples, seed)
+    num_frames = planLength(plan)
+    if num_frames < 1:
+        print("No variations are enabled, rendering the default scene once")
+        num_frames = 1
+
+    frames: List[Dict[str, NDArray]] = []
+    apply_times: Dict[str, List[float]] = {name: [] for name in plan}
+    capture_times: List[float] = []
+    for sample_idx in range(num_frames):
+        for name, params in plan.items():
+            variation = variations[name]
+            variation.set_next_params(sliceParams(params, sample_idx))
+            start = time.perf_counter()
+            variation.randomize()
+            apply_times[name].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        obs = task_env.get_observation()
+        capture_times.append(time.perf_counter() - start)
+        frames.append(
+            {
+                camera: getattr(obs, f"{camera}_rgb")
+                for camera in cameras
+                if getattr(obs, f"{camera}_rgb", None) is not None
+            }
+        )
+        print(f"Rendered sample {sample_idx + 1} / {num_frames}")
+
+    env.shutdown()
+
+    if all(len(sample_frames) < 1 for sample_frames in frames):
+        print(f"The cameras {cameras} didn't render any RGB image")
+        return 1
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    make_contact_sheet(frames, cameras).save(output)
+    output_stem = os.path.splitext(output)[0]
+    if len(plan) > 0:
+        savePlan(f"{output_stem}_plan.npz", plan, var_manager.plan_assets())
+
+    timings = {
+        "setup_ms": 1000.0 * setup_time,
+        "capture_ms": mean_max_ms(capture_times)["mean_ms"],
+        "variations": {
+            name: mean_max_ms(times) for name, times in apply_times.items()
+        },
+    }
+    with open(f"{output_stem}_timings.json", "w") as fhandle:
+        json.dump(timings, fhandle, indent=2)
+
+    print(f"Wrote the preview of {num_frames} samples to {output}")
+    for name, values in sorted(
+        timings["variations"].items(), key=lambda item: -item[1]["mean_ms"]
+    ):
+        print(
+            f"  {name:<30} {values['mean_ms']:>9.2f} ms "
+            + f"(max {values['max_ms']:.2f} ms)"
+        )
+    print(f"  {'capture':<30} {timings['capture_ms']:>9.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    SystemExit(main())
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+
+from colosseum.dataset.validate import (
+    REPORT_FILENAME,
+    quarantine_episode,
+    validate_dataset,
+    write_requeue,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Checks the integrity of every episode of a dataset and "
+        + "writes a JSON report with the broken and missing episodes"
+    )
+    parser.add_argument("dataset_root", type=str)
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--tasks", type=str, nargs="*", default=None)
+    parser.add_argument("--num-workers", type=int, default=8)
+    parser.add_argument(
+        "--episodes-per-task",
+        type=int,
+        default=None,
+        help="Number of episodes expected for each task variation",
+    )
+    parser.add_argument(
+        "--no-decode",
+        action="store_true",
+        help="Only count the images, without decoding them",
+    )
+    parser.add_argument(
+        "--no-checksums",
+        action="store_true",
+        help="Only compare file sizes against the collection journal",
+    )
+    parser.add_argument(
+        "--requeue",
+        action="store_true",
+        help="Move broken episodes into the quarantine folder and write the "
+        + "list of episodes to collect again with dataset_generator (using "
+        + "data.use_requeue=True)",
+    )
+    args = parser.parse_args()
+
+    report = validate_dataset(
+        args.dataset_root,
+        tasks=args.tasks,
+        decode_images=not args.no_decode,
+        checksums=not args.no_checksums,
+        episodes_per_task=args.episodes_per_task,
+        num_workers=args.num_workers,
+    )
+
+    for result in report["invalid"]:
+        print(f"{result['path']}: {'; '.join(result['problems'])}")
+
+    if args.requeue:
+        for result in report["invalid"]:
+            quarantine_episode(args.dataset_root, result["path"])
+        requeue_path = write_requeue(args.dataset_root, report)
+        print(f"Saved the episodes to collect again to {requeue_path}")
+
+    output = args.output
+    if output is None:
+        output = os.path.join(args.dataset_root, REPORT_FILENAME)
+    with open(output, "w") as fhandle:
+        json.dump(report, fhandle, indent=2)
+
+    print(
+        f"Checked {report['num_episodes']} episodes: {report['num_valid']} "
+        + f"valid, {report['num_invalid']} invalid, {report['num_missing']} "
+        + f"missing. Saved the report to {output}"
+    )
+    return 0 if report["num_invalid"] + report["num_missing"] == 0 else 1
+
+
+if __name__ == "__main__":
+    SystemExit(main())
@@ -0,0 +1,10 @@
+import hashlib
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """Returns the sha256 hex digest of the given file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fhandle:
+        for chunk in iter(lambda: fhandle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import warnings
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from colosseum import (
+    ASSETS_MODELS_TTM_FOLDER,
+    ASSETS_TEXTURES_FOLDER,
+    CACHE_FOLDER,
+)
+
+ASSETS_INDEX_FILENAME = "assets_index.json"
+ASSETS_INDEX_VERSION = 3
+
+TEXTURES_REGEX = re.compile("(.*jpg$)|(.*png$)")
+MODELS_REGEX = re.compile("(.*ttm$)")
+
+
+@dataclass
+class AssetInfo:
+    name: str = field(default="")
+    filename: str = field(default="")
+    path: str = field(default="")
+    size: int = field(default=0)
+    mtime: float = field(default=0.0)
+    # Width and height of textures, in pixels
+    resolution: Optional[List[int]] = field(default=None)
+
+
+class AssetRegistry:
+    """
+    Process-wide index of the textures and models available to the variations.
+    Each asset folder is scanned only once, and the index is cached to disk so
+    later runs only need to check the modification time of the folder and the
+    size and modification time of each file, instead of listing the folder and
+    reading the headers of every file again. Assets are always returned sorted
+    by filename, so their indices are the same on every machine
+    """
+
+    _instance: Optional[AssetRegistry] = None
+
+    @staticmethod
+    def instance() -> AssetRegistry:
+        """Returns the asset registry shared by all variations"""
+        if AssetRegistry._instance is None:
+            AssetRegistry._instance = AssetRegistry()
+        return AssetRegistry._instance
+
+    def __init__(self, cache_folder: str = CACHE_FOLDER):
+        """
+        Creates an asset registry
+
+        Parameters
+        ----------
+            cache_folder: str
+                The folder where the index of the assets is cached
+        """
+        self._index_path = os.path.join(cache_folder, ASSETS_INDEX_FILENAME)
+        self._folders: Dict[str, Dict[str, Any]] = {}
+        self._checked: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def textures(
+        self, folder: str = ASSETS_TEXTURES_FOLDER, whitelist: List[str] = []
+    ) -> List[AssetInfo]:
+        """
+        Returns the textures (.png and .jpg files) in the given folder
+
+        Parameters
+        ----------
+            folder: str
+                The folder containing the textures
+            whitelist: List[str]
+                A list of texture filenames to keep, or empty to keep all
+
+        Returns
+        -------
+            List[AssetInfo]
+                The textures found, sorted by filename
+        """
+        return self._resolve(folder, "textures", whitelist)
+
+    def models(
+        self, folder: str = ASSETS_MODELS_TTM_FOLDER, whitelist: List[str] = []
+    ) -> List[AssetInfo]:
+        """
+        Returns the models (.ttm files) in the given folder
+
+        Parameters
+        ----------
+            folder: str
+                The folder containing the models
+            whitelist: List[str]
+                A list of model filenames to keep, or empty to keep all
+
+        Returns
+        -------
+            List[AssetInfo]
+                The models found, sorted by filename
+        """
+        return self._resolve(folder, "models", whitelist)
+
+    def asset(self, path: str) -> Optional[AssetInfo]:
+        """
+        Returns the info of the given asset, if its folder was already indexed
+        by a call to `textures` or `models`
+        """
+        folder = os.path.abspath(os.path.dirname(path))
+        with self._lock:
+            entry = self._folders.get(folder, None)
+            if entry is None or not self._checked.get(folder, False):
+                return None
+            asset = entry["assets"].get(os.path.basename(path), None)
+        return AssetInfo(**asset) if asset is not None else None
+
+    def _resolve(
+        self, folder: str, kind: str, whitelist: List[str]
+    ) -> List[AssetInfo]:
+        folder = os.path.abspath(folder)
+        with self._lock:
+            if not self._checked.get(folder, False):
+                entry = self._folders.get(folder, None)
+                if (
+                    entry is None
+                    or entry["kind"] != kind
+                    or entry["mtime"] != os.stat(folder).st_mtime
+                ):
+                    self._folders[folder] = self._scan(folder, kind)
+                    self._save_index()
+                elif self._refresh(entry, kind):
+                    self._save_index()
+                self._checked[folder] = True
+            assets = self._folders[folder]["assets"]
+
+        whitelist_set = set(whitelist)
+        return [
+            AssetInfo(**assets[filename])
+            for filename in sorted(assets)
+            if len(whitelist_set) < 1 or filename in whitelist_set
+        ]
+
+    def _refresh(self, entry: Dict[str, Any], kind: str) -> bool:
+        """
+        Reads again the assets of an indexed folder whose files were modified
+        in place (which doesn't change the folder's modification time), and
+        drops the ones that were removed. Returns True if any entry changed
+        """
+        changed = False
+        for fname, asset in list(entry["assets"].items()):
+            try:
+                stat = os.stat(asset["path"])
+            except OSError:
+                del entry["assets"][fname]
+                changed = True
+                continue
+            if stat.st_size != asset["size"] or stat.st_mtime != asset["mtime"]:
+                entry["assets"][fname] = self._scan_asset(asset["path"], kind)
+                changed = True
+        return changed
+
+    def _scan(self, folder: str, kind: str) -> Dict[str, Any]:
+        regex = TEXTURES_REGEX if kind == "textures" else MODELS_REGEX
+        assets: Dict[str, Any] = {}
+        # Sorted, so the indices of the assets are the same on every machine
+        for fname in sorted(os.listdir(folder)):
+            if regex.match(fname):
+                assets[fname] = self._scan_asset(
+                    os.path.join(folder, fname), kind
+                )
+        return {
+            "kind": kind,
+            "mtime": os.stat(folder).st_mtime,
+            "assets": assets,
+        }
+
+    def _scan_asset(self, fpath: str, kind: str) -> Dict[str, Any]:
+        fname = os.path.basename(fpath)
+        stat = os.stat(fpath)
+        asset = AssetInfo(
+            name=fname.split(".")[0],
+            filename=fname,
+            path=fpath,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+        )
+        if kind == "textures":
+            try:
+                # Only the header of the image is read here
+                with Image.open(fpath) as image:
+                    asset.resolution = list(image.size)
+            except OSError:
+                warnings.warn(f"AssetRegistry > Couldn't read {fpath}")
+        return asdict(asset)
+
+    def _load_index(self) -> None:
+        if not os.path.isfile(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r") as fhandle:
+                index = json.load(fhandle)
+        except (OSError, ValueError):
+            return
+        if index.get("version", None) == ASSETS_INDEX_VERSION:
+            self._folders = index["folders"]
+
+    def _save_index(self) -> None:
+        # Written to a temporary file first, so concurrent workers never read
+        # a partially written index
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            with open(tmp_path, "w") as fhandle:
+                json.dump(
+                    {"version": ASSETS_INDEX_VERSION, "folders": self._folders},
+                    fhandle,
+                )
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            warnings.warn(f"AssetRegistry > Couldn't save the index: {e}")
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
 import os
-import re
 import warnings
 from typing import Dict, List, Optional, Set, Tuple, cast
 
+import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType, TextureMappingMode
 from pyrep.objects.shape import Shape
 
 from colosseum import ASSETS_TEXTURES_FOLDER
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.texture_cache import TextureCache
 from colosseum.variations.utils import safeGetValue
 from colosseum.variations.variation import IVariation
 
@@ -30,6 +33,7 @@ class BackgroundTextureVariation(IVariation):
     """
 
     VARIATION_ID = "background_texture"
+    CAN_SKIP_UNCHANGED = True
 
     @staticmethod
     def CreateFromConfig(
@@ -113,44 +117,56 @@ class BackgroundTextureVariation(IVariation):
 
         # Use textures_filenames if given by the user, otherwise assumme all
         # textures in the given directory are available
-        regex = re.compile("(.*jpg$)|(.*png$)")
-        candidate_textures_names = [
-            fname
-            for fname in os.listdir(self._textures_folder)
-            if regex.match(fname)
-        ]
+        for texture in AssetRegistry.instance().textures(
+            self._textures_folder, list(self._textures_filenames_set)
+        ):
+            self._textures_paths.append(texture.path)
+            self._textures_names.append(texture.name)
+            self._textures_filemap[texture.name] = texture.path
+
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples random textures from the given folder for a number of episodes
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The indices of the textures (see textures_names) under the key
+                'texture', with shape (n,)
+        """
+        return {"texture": rng.integers(len(self._textures_names), size=n)}
 
-        # Check that candidates are in the whitelist (if any)
-        valid_textures_names = []
-        for candidate_tex_name in candidate_textures_names:
-            if len(self._textures_filenames_set) < 1:
-                valid_textures_names.append(candidate_tex_name)
-            elif candidate_tex_name in self._textures_filenames_set:
-                valid_textures_names.append(candidate_tex_name)
-
-        for fname in valid_textures_names:
-            texture_filepath = os.path.join(self._textures_folder, fname)
-            # TODO(wilbert): use a better approach to getting the texture name
-            texture_filename = fname.split(".")[0]
-            self._textures_paths.append(texture_filepath)
-            self._textures_names.append(texture_filename)
-            self._textures_filemap[texture_filename] = texture_filepath
-
-    def randomize(self) -> None:
+    def apply(self, params: Dict[str, NDArray]) -> None:
         """
-        Samples a random texture from the given folder, and applies it to all
-        the walls that surround the scene, using the given uv_scaling
+        Applies the given texture to all the walls that surround the scene,
+        using the given uv_scaling
         """
         assert len(self._walls_shapes) > 0
 
-        choice_name = self._rng.choice(self._textures_names)
-        choice_fpath = self._textures_filemap[choice_name]
+        texture_idx = int(params["texture"])
         if self._pyrep is not None:
-            texture_obj, texture = self._pyrep.create_texture(choice_fpath)
+            texture = TextureCache.instance().get(
+                self._pyrep, self._textures_paths[texture_idx]
+            )
+            # The texture id changes if the texture was evicted and reloaded
+            if not self._shouldApply(
+                "walls", [texture_idx, texture.get_texture_id()]
+            ):
+                return
 
             # Apply the texture to all walls ----------------------------------
             for wall_shape in self._walls_shapes:
                 wall_shape.set_texture(texture, **DEFAULT_TEXTURE_KWARGS)
             # -----------------------------------------------------------------
 
-            texture_obj.remove()
+    def asset_filenames(self) -> Dict[str, List[str]]:
+        return {
+            "texture": [os.path.basename(path) for path in self._textures_paths]
+        }
+
+    @property
+    def textures_names(self) -> List[str]:
+        """The names of the textures, in the order used by parameters"""
+        return self._textures_names
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import os
 from typing import Dict, List, Optional
 
+import numpy as np
+from numpy.random import default_rng
 from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
@@ -11,6 +14,37 @@ from colosseum.variations.utils import safeGetValue
 from colosseum.variations.variation import IVariation
 
 
+def eulerToQuaternion(eulers: NDArray) -> NDArray:
+    """
+    Converts Euler angles in the convention used by CoppeliaSim (rotation
+    Rx(alpha) * Ry(beta) * Rz(gamma)) into quaternions (qx, qy, qz, qw), as
+    used by the poses in PyRep
+
+    Parameters
+    ----------
+        eulers: NDArray
+            The Euler angles (alpha, beta, gamma), with shape (..., 3)
+
+    Returns
+    -------
+        NDArray
+            The quaternions, with shape (..., 4)
+    """
+    half = np.asarray(eulers, dtype=np.float64) / 2.0
+    cos, sin = np.cos(half), np.sin(half)
+    ca, cb, cg = cos[..., 0], cos[..., 1], cos[..., 2]
+    sa, sb, sg = sin[..., 0], sin[..., 1], sin[..., 2]
+    return np.stack(
+        [
+            sa * cb * cg + ca * sb * sg,
+            ca * sb * cg - sa * cb * sg,
+            ca * cb * sg + sa * sb * cg,
+            ca * cb * cg - sa * sb * sg,
+        ],
+        axis=-1,
+    )
+
+
 class CameraPoseVariation(IVariation):
     """Camera pose variation, can change camera's pose in the simulation"""
 
@@ -29,6 +63,9 @@ class CameraPoseVariation(IVariation):
         """
         euler_range = safeGetValue(cfg, "euler_range", [])
         position_range = safeGetValue(cfg, "position_range", [])
+        pose_table_size = safeGetValue(cfg, "pose_table_size", 0)
+        pose_table_seed = safeGetValue(cfg, "pose_table_seed", 0)
+        pose_table_path = safeGetValue(cfg, "pose_table_path", None)
         seed = safeGetValue(cfg, "seed", None)
 
         return CameraPoseVariation(
@@ -37,6 +74,9 @@ class CameraPoseVariation(IVariation):
             targets_names,
             euler_range=euler_range,
             position_range=position_range,
+            pose_table_size=pose_table_size,
+            pose_table_seed=pose_table_seed,
+            pose_table_path=pose_table_path,
             seed=seed,
         )
 
@@ -47,6 +87,9 @@ class CameraPoseVariation(IVariation):
         targets_names: List[str],
         euler_range: List[NDArray] = [],
         position_range: List[NDArray] = [],
+        pose_table_size: int = 0,
+        pose_table_seed: int = 0,
+        pose_table_path: Optional[str] = None,
         seed: Optional[int] = None,
     ):
         """
@@ -64,6 +107,16 @@ class CameraPoseVariation(IVariation):
                 The min. and max. ranges for the applied delta of orientation
             position_range: NDArray
                 The min. and max. ranges for the applied delta of position
+            pose_table_size: int
+                If greater than zero, the number of camera poses sampled once
+                with pose_table_seed, from which each episode picks one, so all
+                workers using the same config share the same set of poses
+            pose_table_seed: int
+                The seed used to sample the table of poses
+            pose_table_path: Optional[str]
+                A .npz file with a table of poses saved with `save_pose_table`,
+                used instead of sampling the table. It must exist and have the
+                deltas of all the cameras
             seed: Optional[int]
                 The seed used for any random number generators
         """
@@ -74,30 +127,131 @@ class CameraPoseVariation(IVariation):
         self._modify_orientation: bool = len(euler_range) == 2
         self._modify_position: bool = len(position_range) == 2
 
-        self._initial_poses: Dict[str, NDArray] = {}
-        for name, camera in self._targets.items():
-            self._initial_poses[name] = camera.get_pose()
+        # Initial positions and orientations of the cameras, with shape
+        # (cameras, 3), the poses are composed from these on every episode
+        self._base_positions: NDArray = np.array(
+            [camera.get_position() for camera in self._targets.values()]
+        ).reshape(-1, 3)
+        self._base_eulers: NDArray = np.array(
+            [camera.get_orientation() for camera in self._targets.values()]
+        ).reshape(-1, 3)
 
         self._euler_range = euler_range
         self._position_range = position_range
 
-    def randomize(self) -> None:
-        for name, camera in self._targets.items():
-            # Reset back to the initial pose before applying the deltas
-            self._targets[name].set_pose(self._initial_poses[name])
+        # Deltas of each pose in the table, with shape (poses, cameras, 3)
+        self._pose_table: Optional[Dict[str, NDArray]] = None
+        if pose_table_path is not None:
+            self._pose_table = self._load_pose_table(pose_table_path)
+        elif pose_table_size > 0:
+            self._pose_table = self._sample_deltas(
+                default_rng(pose_table_seed), pose_table_size
+            )
 
-            if self._modify_orientation:
-                euler_delta = self._rng.uniform(
-                    low=self._euler_range[0], high=self._euler_range[1]
-                )
-                current_euler = camera.get_orientation()
-                new_euler = current_euler + euler_delta
-                camera.set_orientation(new_euler)
+    @property
+    def pose_table(self) -> Optional[Dict[str, NDArray]]:
+        """The table of camera poses the episodes pick from, if any"""
+        return self._pose_table
 
-            if self._modify_position:
-                position_delta = self._rng.uniform(
-                    low=self._position_range[0], high=self._position_range[1]
+    def _load_pose_table(self, path: str) -> Dict[str, NDArray]:
+        """
+        Loads a table of poses saved with `save_pose_table`, checking that it
+        has the deltas of every camera of this variation
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(
+                f"CameraPoseVariation > pose table {path} doesn't exist"
+            )
+        with np.load(path) as data:
+            pose_table = {
+                "euler_deltas": data["euler_deltas"],
+                "position_deltas": data["position_deltas"],
+            }
+        num_poses = len(pose_table["euler_deltas"])
+        expected_shape = (num_poses, len(self._targets), 3)
+        for key, deltas in pose_table.items():
+            if num_poses < 1 or deltas.shape != expected_shape:
+                raise ValueError(
+                    f"CameraPoseVariation > {key} in pose table {path} has "
+                    + f"shape {deltas.shape}, expected (poses, cameras, 3) "
+                    + f"with {len(self._targets)} cameras and at least 1 pose"
                 )
-                current_position = camera.get_position()
-                new_position = current_position + position_delta
-                camera.set_position(new_position)
+        return pose_table
+
+    def save_pose_table(self, path: str) -> None:
+        """
+        Saves the table of camera poses into a .npz file, which can be given
+        as pose_table_path to reproduce the same set of camera poses
+
+        Parameters
+        ----------
+            path: str
+                The path of the .npz file to write
+        """
+        if self._pose_table is None:
+            raise RuntimeError("CameraPoseVariation > there's no pose table")
+        np.savez(path, **self._pose_table)
+
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples the deltas of orientation and position of the cameras for a
+        number of episodes, or picks them from the pose table if there's one.
+        Deltas that aren't modified are left as zeros
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The deltas under the keys 'euler_deltas' and 'position_deltas',
+                both with shape (n, cameras, 3)
+        """
+        if self._pose_table is None:
+            return self._sample_deltas(rng, n)
+        poses_idxs = rng.integers(len(self._pose_table["euler_deltas"]), size=n)
+        return {
+            key: deltas[poses_idxs] for key, deltas in self._pose_table.items()
+        }
+
+    def _sample_deltas(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples the deltas for a number of episodes in a single draw, in the
+        same order as sampling each camera of each episode at a time
+        """
+        num_cameras = len(self._targets)
+        euler_deltas = np.zeros((n, num_cameras, 3))
+        position_deltas = np.zeros((n, num_cameras, 3))
+        num_dims = 3 * (int(self._modify_orientation) + self._modify_position)
+        units = rng.random((n, num_cameras, num_dims))
+        if self._modify_orientation:
+            low, high = np.asarray(self._euler_range, dtype=np.float64)
+            euler_deltas = low + units[..., :3] * (high - low)
+        if self._modify_position:
+            low, high = np.asarray(self._position_range, dtype=np.float64)
+            position_deltas = low + units[..., -3:] * (high - low)
+        return {
+            "euler_deltas": euler_deltas,
+            "position_deltas": position_deltas,
+        }
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Moves the cameras by the given deltas from their initial poses. The
+        poses of all cameras are composed at once, and each camera is moved
+        with a single call to the simulator
+        """
+        positions = self._base_positions + params["position_deltas"]
+        quaternions = eulerToQuaternion(
+            self._base_eulers + params["euler_deltas"]
+        )
+        poses = np.concatenate([positions, quaternions], axis=-1)
+        deltas = np.concatenate(
+            [params["euler_deltas"], params["position_deltas"]], axis=-1
+        )
+        for (name, camera), pose, delta in zip(
+            self._targets.items(), poses, deltas
+        ):
+            if self._shouldApply(name, delta):
+                camera.set_pose(pose)
@@ -48,3 +48,12 @@ COLORS_MAP: Dict[str, NDArray] = {
     "black": np.array([0.0, 0.0, 0.0]),
     "white": np.array([1.0, 1.0, 1.0]),
 }
+
+# The colors of the library as an array, in the order of COLORS_NAMES, so that
+# batches of color names can be looked up with a single indexing operation
+COLORS_ARRAY: NDArray = np.stack([COLORS_MAP[name] for name in COLORS_NAMES])
+
+# The row of each color name in COLORS_ARRAY
+COLORS_INDEX: Dict[str, int] = {
+    name: idx for idx, name in enumerate(COLORS_NAMES)
+}
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import os
-import re
 import warnings
 from typing import Dict, List, Optional, Set
 
+import numpy as np
 from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
@@ -16,6 +16,8 @@ from rlbench.backend.spawn_boundary import SpawnBoundary
 
 from colosseum import ASSETS_MODELS_TTM_FOLDER
 from colosseum.rlbench.extensions.spawn_boundary import SpawnBoundaryExt
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.model_pool import ModelPool
 from colosseum.variations.utils import safeGetValue
 from colosseum.variations.variation import IVariation
 
@@ -130,28 +132,12 @@ class DistractorObjectVariation(IVariation):
             )
             return
 
-        regex = re.compile("(.*ttm$)")
-        candidate_models_filenames = [
-            fname
-            for fname in os.listdir(self._obj_ttm_folder)
-            if regex.match(fname)
-        ]
-
-        # Check that candidates are in the whitelist (if any)
-        valid_models_names = []
-        for candidate_obj_name in candidate_models_filenames:
-            if len(self._obj_filenames_set) < 1:
-                valid_models_names.append(candidate_obj_name)
-            elif candidate_obj_name in self._obj_filenames_set:
-                valid_models_names.append(candidate_obj_name)
-
-        for fname in valid_models_names:
-            model_filepath = os.path.join(self._obj_ttm_folder, fname)
-            # TODO(wilbert): use a better approach to getting the texture name
-            model_filename = fname.split(".")[0]
-            self._models_paths.append(model_filepath)
-            self._models_names.append(model_filename)
-            self._models_filemap[model_filename] = model_filepath
+        for model in AssetRegistry.instance().models(
+            self._obj_ttm_folder, list(self._obj_filenames_set)
+        ):
+            self._models_paths.append(model.path)
+            self._models_names.append(model.name)
+            self._models_filemap[model.name] = model.path
 
         boundaries = [boundary for _, boundary in self._targets.items()]
         self._spawn_boundary = SpawnBoundaryExt(boundaries)
@@ -164,6 +150,11 @@ class DistractorObjectVariation(IVariation):
             self._waiting = self._num_steps_to_wait > 0
             self._num_steps_waiting = 0
 
+    @property
+    def needs_step(self) -> bool:
+        # Only waiting to spawn the distractors requires stepping
+        return self._waiting
+
     def on_step_episode(self) -> None:
         if self._waiting:
             self._num_steps_waiting += 1
@@ -171,10 +162,28 @@ class DistractorObjectVariation(IVariation):
                 self._waiting = False
                 self.randomize()
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples the models to spawn for a number of episodes. Their placement
+        depends on the state of the scene, so it's sampled when spawning them
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The indices of the models (see models_names) under the key
+                'models', with shape (n, num_objects)
         """
-        Spawns a new object from the models folder into one of the selected
-        spawn areas.
+        models = rng.integers(
+            len(self._models_names), size=(n, self._num_objs_to_spawn)
+        )
+        return {"models": models}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Spawns the given models from the models folder into the selected spawn
+        areas.
         """
         if not self._ready:
             return
@@ -184,11 +193,11 @@ class DistractorObjectVariation(IVariation):
 
         self._spawn_boundary.clear()
         self.remove_models()
-        # Sample one oodel from the list of models available
-        for _ in range(self._num_objs_to_spawn):
-            choice_name = self._rng.choice(self._models_names)
-            choice_fpath = self._models_filemap[choice_name]
-            choice_model = self._pyrep.import_model(choice_fpath)
+        for model_idx in params["models"]:
+            choice_fpath = self._models_paths[int(model_idx)]
+            choice_model = ModelPool.instance().acquire(
+                self._pyrep, choice_fpath
+            )
             try:
                 self._spawn_boundary.sample(
                     choice_model,
@@ -231,10 +240,21 @@ class DistractorObjectVariation(IVariation):
 
     def remove_models(self) -> None:
         """
-        Removes all models spawned by this variation that are still part of the
-        simulation.
+        Takes all models spawned by this variation out of the scene. They are
+        parked in the model pool, so the next episodes can reuse them without
+        importing them again
         """
         while len(self._spawn_models) > 0:
             model = self._spawn_models.pop()
             if model is not None:
-                model.remove()
+                ModelPool.instance().release(model)
+
+    def asset_filenames(self) -> Dict[str, List[str]]:
+        return {
+            "models": [os.path.basename(path) for path in self._models_paths]
+        }
+
+    @property
+    def models_names(self) -> List[str]:
+        """The names of the models, in the order used by parameters"""
+        return self._models_names
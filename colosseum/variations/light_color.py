@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, cast
 
 import numpy as np
 from numpy.typing import NDArray
@@ -9,7 +9,12 @@ from pyrep import PyRep
 from pyrep.const import ObjectType
 from pyrep.objects.light import Light
 
-from colosseum.variations.utils import ColorCfgMode, safeGetValue, sampleColor
+from colosseum.variations.utils import (
+    ColorCfgMode,
+    safeGetValue,
+    sampleColors,
+    sampleTargetsParams,
+)
 from colosseum.variations.variation import IVariation
 
 
@@ -17,6 +22,7 @@ class LightColorVariation(IVariation):
     """Light color variation, can change lights' colors in the simulation"""
 
     VARIATION_ID = "light_color"
+    CAN_SKIP_UNCHANGED = True
 
     @staticmethod
     def CreateFromConfig(
@@ -104,36 +110,50 @@ class LightColorVariation(IVariation):
         elif len(color_range) > 0:
             self._config_mode = ColorCfgMode.USE_CUSTOM_COLOR_RANGE
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Samples a random color and sets it to the associated lights in the
-        simulation. Depending on the self._color_same parameter, all lights will
-        receive the same color or not
+        Samples the colors of the associated lights for a number of episodes.
+        Depending on the self._color_same parameter, all lights will receive
+        the same color or not
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The colors under the key 'colors', with shape (n, lights, 3)
         """
-        if self._color_same:
-            color_value = sampleColor(
+        colors = sampleTargetsParams(
+            lambda size, units: sampleColors(
                 self._config_mode,
-                self._rng,
+                rng,
+                size,
                 color_names=self._color_names,
                 color_list=self._color_list,
                 color_range=self._color_range,
-            )
-            if color_value is not None:
-                for _, light in self._targets.items():
-                    self.apply(cast(Light, light), color_value)
-        else:
-            for _, light in self._targets.items():
-                color_value = sampleColor(
-                    self._config_mode,
-                    self._rng,
-                    color_names=self._color_names,
-                    color_list=self._color_list,
-                    color_range=self._color_range,
-                )
-                if color_value is not None:
-                    self.apply(cast(Light, light), color_value)
-
-    def apply(self, light: Light, color: NDArray) -> None:
+                units=units,
+            ),
+            n,
+            len(self._targets),
+            self._color_same,
+            shape=(3,),
+            rng=rng,
+            sampling=self._sampling,
+            unit_dims=3,
+        )
+        return {"colors": colors}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given colors to the associated lights in the simulation
+        """
+        for (name, light), color in zip(
+            self._targets.items(), params["colors"]
+        ):
+            if not np.isnan(color).any() and self._shouldApply(name, color):
+                self._applyColor(cast(Light, light), color)
+
+    def _applyColor(self, light: Light, color: NDArray) -> None:
         """
         Applies the given light color to the given light
 
@@ -1,104 +1,498 @@
-from typing import List, Optional
+import warnings
+from typing import Any, Dict, List, Optional
 
-from omegaconf import ListConfig
+import numpy as np
+from numpy.random import default_rng
+from numpy.typing import NDArray
+from omegaconf import DictConfig, ListConfig
 from pyrep import PyRep
 
-from colosseum.variations.background_texture import BackgroundTextureVariation
-from colosseum.variations.camera_pose import CameraPoseVariation
-from colosseum.variations.distractor_object import DistractorObjectVariation
-from colosseum.variations.light_color import LightColorVariation
-from colosseum.variations.object_color import ObjectColorVariation
-from colosseum.variations.object_friction import ObjectFrictionVariation
-from colosseum.variations.object_mass import ObjectMassVariation
-from colosseum.variations.object_size import ObjectSizeVariation
-from colosseum.variations.object_texture import ObjectTextureVariation
-from colosseum.variations.table_color import TableColorVariation
-from colosseum.variations.table_texture import TableTextureVariation
-from colosseum.variations.utils import safeGetValue
+from colosseum.variations.profiling import VariationsProfiler
+from colosseum.variations.registry import VariationRegistry
+from colosseum.variations.rejection import FailureRejection
+from colosseum.variations.utils import SamplingMode, safeGetValue, sliceParams
 from colosseum.variations.variation import IVariation
 
+# A plan maps the name of each variation to its parameters, as returned by
+# IVariation.sample_params, with the episodes along the first axis
+VariationsPlan = Dict[str, Dict[str, NDArray]]
+# Filenames of the assets that the index parameters of a plan refer to, keyed
+# by variation and parameter name (see IVariation.asset_filenames)
+PlanAssets = Dict[str, Dict[str, List[str]]]
+
+# Prefix of the keys under which savePlan stores the filenames of the assets
+ASSETS_KEY_PREFIX = "assets:"
+
+
+def savePlan(
+    path: str, plan: VariationsPlan, assets: Optional[PlanAssets] = None
+) -> None:
+    """
+    Saves a plan of variation parameters into a .npz file, with one array per
+    variation and parameter, stored under the key '<variation>/<parameter>'
+
+    Parameters
+    ----------
+        path: str
+            The path of the .npz file to write
+        plan: VariationsPlan
+            The plan to be saved
+        assets: Optional[PlanAssets]
+            The filenames of the assets the index parameters of the plan refer
+            to, stored under the key 'assets:<variation>/<parameter>'
+    """
+    arrays = {
+        f"{var_name}/{param_name}": values
+        for var_name, params in plan.items()
+        for param_name, values in params.items()
+    }
+    for var_name, filenames in (assets or {}).items():
+        if var_name not in plan:
+            continue
+        for param_name, names in filenames.items():
+            arrays[f"{ASSETS_KEY_PREFIX}{var_name}/{param_name}"] = np.array(
+                names, dtype=str
+            )
+    np.savez_compressed(path, **arrays)
+
+
+def loadPlan(path: str) -> VariationsPlan:
+    """
+    Loads a plan of variation parameters saved with `savePlan`
+
+    Parameters
+    ----------
+        path: str
+            The path of the .npz file to read
+
+    Returns
+    -------
+        VariationsPlan
+            The plan stored in the given file
+    """
+    plan: VariationsPlan = {}
+    with np.load(path) as data:
+        for key in data.files:
+            if key.startswith(ASSETS_KEY_PREFIX):
+                continue
+            var_name, param_name = key.rsplit("/", 1)
+            plan.setdefault(var_name, {})[param_name] = data[key]
+    return plan
+
+
+def loadPlanAssets(path: str) -> PlanAssets:
+    """
+    Loads the filenames of the assets saved along with a plan by `savePlan`,
+    which is empty for plans saved without them
+    """
+    assets: PlanAssets = {}
+    with np.load(path) as data:
+        for key in data.files:
+            if not key.startswith(ASSETS_KEY_PREFIX):
+                continue
+            var_name, param_name = key.replace(ASSETS_KEY_PREFIX, "", 1).rsplit(
+                "/", 1
+            )
+            assets.setdefault(var_name, {})[param_name] = data[key].tolist()
+    return assets
+
+
+def remapPlanAssets(
+    plan: VariationsPlan, recorded: PlanAssets, current: PlanAssets
+) -> VariationsPlan:
+    """
+    Replaces the asset indices of a plan, recorded along with the filenames of
+    the assets they referred to, with the indices of the same assets in the
+    current lists of assets, which may be in a different order (e.g. on other
+    machines, or after adding assets)
+
+    Parameters
+    ----------
+        plan: VariationsPlan
+            The plan with the recorded indices
+        recorded: PlanAssets
+            The filenames of the assets when the plan was recorded
+        current: PlanAssets
+            The filenames of the assets available now
+
+    Returns
+    -------
+        VariationsPlan
+            A copy of the plan, with the indices of the current assets
+    """
+    remapped: VariationsPlan = {
+        var_name: dict(params) for var_name, params in plan.items()
+    }
+    for var_name, filenames in recorded.items():
+        for param_name, names in filenames.items():
+            if param_name not in remapped.get(var_name, {}):
+                continue
+            lookup = {
+                name: idx
+                for idx, name in enumerate(
+                    current.get(var_name, {}).get(param_name, [])
+                )
+            }
+            indices = np.asarray(remapped[var_name][param_name], dtype=int)
+            wanted = [names[idx] for idx in indices.reshape(-1)]
+            missing = sorted(set(wanted) - set(lookup))
+            if len(missing) > 0:
+                raise ValueError(
+                    f"remapPlanAssets > the assets {missing} used by variation "
+                    + f"'{var_name}' are not available"
+                )
+            remapped[var_name][param_name] = np.array(
+                [lookup[name] for name in wanted], dtype=int
+            ).reshape(indices.shape)
+    return remapped
+
+
+def planLength(plan: VariationsPlan) -> int:
+    """Returns the number of episodes covered by the given plan"""
+    lengths = [
+        len(values) for params in plan.values() for values in params.values()
+    ]
+    return min(lengths) if len(lengths) > 0 else 0
+
 
 class VariationsManager:
     def __init__(
-        self, pyrep: PyRep, factors_config: ListConfig = ListConfig([])
+        self,
+        pyrep: PyRep,
+        factors_config: ListConfig = ListConfig([]),
+        profile: bool = False,
+        rejection_config: Optional[DictConfig] = None,
     ):
+        """
+        Creates a manager for the variations given by the factors config
+
+        Parameters
+        ----------
+            pyrep: PyRep
+                A handle to the pyrep simulation
+            factors_config: ListConfig
+                The configuration of each variation factor
+            profile: bool
+                Whether to time the calls made to each variation and count the
+                simulator calls made within them (see `stats`)
+            rejection_config: Optional[DictConfig]
+                The configuration of the learner that rejects samples similar
+                to the ones that led to failed demos (see FailureRejection), or
+                None to accept every sample
+        """
         self._pyrep: PyRep = pyrep
         self._variations: List[IVariation] = []
         self._factors_config: ListConfig = factors_config
+        self._plan: Optional[VariationsPlan] = None
+        self._plan_episode: int = 0
+        self._plan_strict: bool = False
+        # Variations that still have to be called on the simulation steps of
+        # the current episode, so steps with nothing to do cost nothing
+        self._step_variations: List[IVariation] = []
+        self._profiler: Optional[VariationsProfiler] = (
+            VariationsProfiler() if profile else None
+        )
+        self._rejection: Optional[FailureRejection] = (
+            FailureRejection.CreateFromConfig(rejection_config)
+            if rejection_config is not None
+            and safeGetValue(rejection_config, "enabled", True)
+            else None
+        )
 
-    def on_init_task(self) -> None:
-        self._variations.clear()
+    @property
+    def variations(self) -> List[IVariation]:
+        return self._variations
 
-        for factor in self._factors_config:
-            variation: Optional[IVariation] = None
-            factor_type = safeGetValue(factor, "variation", None)
-            factor_enabled = safeGetValue(factor, "enabled", True)
-            factor_name = safeGetValue(factor, "name", None)
-            targets = safeGetValue(factor, "targets", [])
+    def sample_plan(self, n: int, seed: Optional[int] = None) -> VariationsPlan:
+        """
+        Samples the parameters of all enabled variations for a number of
+        episodes. The variations must have been created already (on_init_task)
 
-            if factor_type == LightColorVariation.VARIATION_ID:
-                variation = LightColorVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
+        Parameters
+        ----------
+            n: int
+                The number of episodes to sample parameters for
+            seed: Optional[int]
+                The seed of the random generator shared by all variations, or
+                None to use the random generator of each variation instead
 
-            elif factor_type == ObjectColorVariation.VARIATION_ID:
-                variation = ObjectColorVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
+        Returns
+        -------
+            VariationsPlan
+                The parameters of each enabled variation, keyed by its name
+        """
+        rng = default_rng(seed) if seed is not None else None
+        return {
+            variation.name: variation.sample_params(
+                rng if rng is not None else variation.rng, n
+            )
+            for variation in self._variations
+            if variation.enabled
+        }
 
-            elif factor_type == ObjectSizeVariation.VARIATION_ID:
-                variation = ObjectSizeVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
+    def set_plan(
+        self, plan: Optional[VariationsPlan], strict: bool = False
+    ) -> None:
+        """
+        Sets a plan whose parameters are applied on the next episodes, one
+        episode at a time, instead of sampling them at random. Once the plan is
+        exhausted, the variations go back to sampling their own parameters,
+        unless the plan is strict
 
-            elif factor_type == ObjectTextureVariation.VARIATION_ID:
-                variation = ObjectTextureVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
+        Parameters
+        ----------
+            plan: Optional[VariationsPlan]
+                The plan to follow, or None to go back to random sampling
+            strict: bool
+                Whether starting an episode once the plan is exhausted raises
+                an error instead (e.g. when replaying recorded episodes)
+        """
+        self._plan = plan
+        self._plan_episode = 0
+        self._plan_strict = strict
 
-            elif factor_type == TableColorVariation.VARIATION_ID:
-                variation = TableColorVariation.CreateFromConfig(
-                    self._pyrep, factor_name, factor
-                )
+    def plan_assets(self) -> PlanAssets:
+        """
+        Returns the filenames of the assets that the index parameters of the
+        enabled variations refer to (see IVariation.asset_filenames)
+        """
+        return {
+            variation.name: variation.asset_filenames()
+            for variation in self._variations
+            if variation.enabled and len(variation.asset_filenames()) > 0
+        }
 
-            elif factor_type == TableTextureVariation.VARIATION_ID:
-                variation = TableTextureVariation.CreateFromConfig(
-                    self._pyrep, factor_name, factor
-                )
+    def applied_params(self) -> VariationsPlan:
+        """
+        Returns the parameters applied by every enabled variation in the
+        current episode, as a plan of a single episode. Setting this plan back
+        (see `set_plan`) applies exactly the same values again
 
-            elif factor_type == BackgroundTextureVariation.VARIATION_ID:
-                variation = BackgroundTextureVariation.CreateFromConfig(
-                    self._pyrep, factor_name, factor
-                )
+        Returns
+        -------
+            VariationsPlan
+                The parameters of each variation that was applied, keyed by
+                its name, with a leading axis of size one
+        """
+        plan: VariationsPlan = {}
+        for variation in self._variations:
+            params = variation.applied_params
+            if variation.enabled and params is not None:
+                plan[variation.name] = {
+                    key: np.asarray(values)[np.newaxis]
+                    for key, values in params.items()
+                }
+        return plan
 
-            elif factor_type == DistractorObjectVariation.VARIATION_ID:
-                variation = DistractorObjectVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
+    def skip_counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns how many values each variation set into the simulation, and
+        how many it skipped as the targets already had the same values
 
-            elif factor_type == CameraPoseVariation.VARIATION_ID:
-                variation = CameraPoseVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
-            elif factor_type == ObjectFrictionVariation.VARIATION_ID:
-                variation = ObjectFrictionVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
-                )
-            elif factor_type == ObjectMassVariation.VARIATION_ID:
-                variation = ObjectMassVariation.CreateFromConfig(
-                    self._pyrep, factor_name, targets, factor
+        Returns
+        -------
+            Dict[str, Dict[str, int]]
+                The counts 'applied' and 'skipped', keyed by variation name
+        """
+        return {
+            variation.name: {
+                "applied": variation.num_applied,
+                "skipped": variation.num_skipped,
+            }
+            for variation in self._variations
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a snapshot of the stats of each variation: the counts of values
+        'applied' and 'skipped' (see `skip_counts`) and, when profiling, the
+        stats of each profiled method (number of calls, total, mean and max
+        time in milliseconds, and number of simulator calls)
+
+        Returns
+        -------
+            Dict[str, Dict[str, Any]]
+                The stats of each variation, keyed by variation name
+        """
+        stats: Dict[str, Dict[str, Any]] = {
+            name: dict(counts) for name, counts in self.skip_counts().items()
+        }
+        if self._profiler is not None:
+            for name, methods in self._profiler.stats().items():
+                stats.setdefault(name, {}).update(methods)
+        return stats
+
+    def shutdown(self, summary_path: Optional[str] = None) -> None:
+        """
+        Writes the summary of the profiled calls, if profiling, and of the
+        rejected samples, if rejecting samples (saving the recorded demos if
+        requested), and stops profiling
+
+        Parameters
+        ----------
+            summary_path: Optional[str]
+                The path of the file to write the summary to, or None to print
+        """
+        sections: List[str] = []
+        if self._profiler is not None:
+            sections.append(f"Variations profile:\n{self._profiler.summary()}")
+            self._profiler.close()
+            self._profiler = None
+        if self._rejection is not None:
+            if self._rejection.records_path is not None:
+                self._rejection.save(self._rejection.records_path)
+            rejection_stats = self._rejection.stats()
+            sections.append(
+                "Variations rejection: "
+                + f"{rejection_stats['rejected']} of "
+                + f"{rejection_stats['candidates']} samples rejected "
+                + f"({100.0 * rejection_stats['rejection_rate']:.1f}%), "
+                + f"{rejection_stats['failures']} of "
+                + f"{rejection_stats['recorded']} recorded demos failed, "
+                + f"{rejection_stats['exhausted']} episodes kept a sample "
+                + "after too many rejections"
+            )
+        if len(sections) < 1:
+            return
+
+        summary = "\n".join(sections)
+        if summary_path is not None:
+            with open(summary_path, "w") as fhandle:
+                fhandle.write(summary + "\n")
+        else:
+            print(summary)
+
+    def rejection_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Returns the stats of the samples rejected as similar ones led to failed
+        demos (see FailureRejection.stats), or None if samples aren't rejected
+        """
+        if self._rejection is None:
+            return None
+        return self._rejection.stats()
+
+    def on_demo_finished(self, failed: bool) -> None:
+        """
+        Records whether the demo of the current episode failed, so samples
+        similar to the ones that led to failures are rejected later on
+
+        Parameters
+        ----------
+            failed: bool
+                Whether the demo of the current episode failed
+        """
+        if self._rejection is None:
+            return
+        params = {
+            variation.name: variation.applied_params
+            for variation in self._variations
+            if variation.enabled and variation.applied_params is not None
+        }
+        if len(params) > 0:
+            self._rejection.record(params, failed)  # type: ignore
+
+    def on_init_task(self) -> None:
+        self._variations.clear()
+        self._step_variations = []
+
+        for factor_idx, factor in enumerate(self._factors_config):
+            variation: Optional[IVariation] = None
+            factor_type = safeGetValue(factor, "variation", None)
+            factor_enabled = safeGetValue(factor, "enabled", True)
+            # Unnamed factors get a name that's stable across runs, so their
+            # parameters can be found in a plan
+            factor_name = safeGetValue(
+                factor, "name", f"{factor_type}-{factor_idx}"
+            )
+            targets = safeGetValue(factor, "targets", [])
+
+            if factor_type is not None:
+                variation = VariationRegistry.instance().create(
+                    factor_type, self._pyrep, factor_name, targets, factor
                 )
 
             if variation is not None:
                 variation.setEnable(factor_enabled)
+                skip_unchanged = safeGetValue(factor, "skip_unchanged", None)
+                if skip_unchanged is not None:
+                    variation.setSkipUnchanged(skip_unchanged)
+                variation.setSampling(
+                    SamplingMode(safeGetValue(factor, "sampling", "iid")),
+                    safeGetValue(factor, "sampling_count", 1),
+                )
+                if self._profiler is not None:
+                    self._profiler.wrap(variation)
                 self._variations.append(variation)
 
     def on_init_episode(self) -> None:
+        for variation in self._variations:
+            variation.clear_applied_params()
+
+        if self._plan is not None:
+            if self._plan_episode < planLength(self._plan):
+                for variation in self._variations:
+                    if variation.name in self._plan:
+                        variation.set_next_params(
+                            sliceParams(
+                                self._plan[variation.name], self._plan_episode
+                            )
+                        )
+                self._plan_episode += 1
+            elif self._plan_strict:
+                raise RuntimeError(
+                    "VariationsManager > the plan of variations is exhausted, "
+                    + f"it only covers {planLength(self._plan)} episodes"
+                )
+            else:
+                warnings.warn(
+                    "VariationsManager > the plan of variations is exhausted, "
+                    + "sampling the parameters at random from now on"
+                )
+                self._plan = None
+
+        if self._plan is None and self._rejection is not None:
+            self._draw_accepted_params()
+
         for variation in self._variations:
             if variation.enabled:
                 variation.on_init_episode()
 
+        self._step_variations = [
+            variation
+            for variation in self._variations
+            if variation.enabled and variation.needs_step
+        ]
+
+    def _draw_accepted_params(self) -> None:
+        """
+        Draws the parameters of the next episode for all enabled variations,
+        drawing them again while the rejection learner rejects them
+        """
+        assert self._rejection is not None
+        variations = [
+            variation for variation in self._variations if variation.enabled
+        ]
+        for _ in range(self._rejection.max_resamples + 1):
+            params = {
+                variation.name: variation.draw_params()
+                for variation in variations
+            }
+            if self._rejection.accept(params):
+                break
+        else:
+            self._rejection.on_resamples_exhausted()
+
+        for variation in variations:
+            variation.set_next_params(params[variation.name])
+
     def on_step_episode(self) -> None:
-        for variation in self._variations:
-            if variation.enabled:
-                variation.on_step_episode()
+        if len(self._step_variations) < 1:
+            return
+
+        for variation in self._step_variations:
+            variation.on_step_episode()
+        self._step_variations = [
+            variation
+            for variation in self._step_variations
+            if variation.needs_step
+        ]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import collections
+from typing import Dict, Optional, OrderedDict, Tuple
+
+from numpy.typing import NDArray
+from pyrep import PyRep
+from pyrep.backend.sim import simGetModelProperty, simSetModelProperty
+from pyrep.backend.simConst import (
+    sim_modelproperty_not_collidable,
+    sim_modelproperty_not_detectable,
+    sim_modelproperty_not_dynamic,
+    sim_modelproperty_not_measurable,
+    sim_modelproperty_not_renderable,
+    sim_modelproperty_not_respondable,
+    sim_modelproperty_not_visible,
+)
+from pyrep.objects.object import Object
+
+DEFAULT_MODEL_POOL_SIZE = 16
+
+# Model properties used to take parked models out of rendering and physics
+PARKED_MODEL_PROPERTIES = (
+    sim_modelproperty_not_collidable
+    | sim_modelproperty_not_detectable
+    | sim_modelproperty_not_dynamic
+    | sim_modelproperty_not_measurable
+    | sim_modelproperty_not_renderable
+    | sim_modelproperty_not_respondable
+    | sim_modelproperty_not_visible
+)
+
+# Parked models are lined up along the x axis, away from the workspace
+PARKING_ORIGIN = (0.0, 0.0, -20.0)
+PARKING_SPACING = 1.0
+
+# An entry holds the path the model was imported from, the model itself, its
+# pose right after importing it, its model properties, and its name
+PoolEntry = Tuple[str, Object, NDArray, int, str]
+
+
+class ModelPool:
+    """
+    Process-wide pool of the models imported into the simulation. Models that
+    aren't used are parked out of the workspace, hidden from rendering, physics
+    and sensors, and reused the next time a model from the same file is asked
+    for, instead of being imported again. Once there are more parked models
+    than the capacity of the pool, the least recently used ones are removed
+    """
+
+    _instance: Optional[ModelPool] = None
+
+    @staticmethod
+    def instance() -> ModelPool:
+        """Returns the model pool shared by all variations"""
+        if ModelPool._instance is None:
+            ModelPool._instance = ModelPool()
+        return ModelPool._instance
+
+    def __init__(self, capacity: int = DEFAULT_MODEL_POOL_SIZE):
+        """
+        Creates an empty model pool
+
+        Parameters
+        ----------
+            capacity: int
+                The maximum number of parked models kept in the simulation
+        """
+        self._capacity: int = max(capacity, 0)
+        self._parked: OrderedDict[int, PoolEntry] = collections.OrderedDict()
+        self._in_use: Dict[int, PoolEntry] = {}
+        self._pyrep: Optional[PyRep] = None
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def set_capacity(self, capacity: int) -> None:
+        """
+        Updates the maximum number of parked models, removing the least
+        recently used ones if required
+        """
+        self._capacity = max(capacity, 0)
+        self._evict(self._capacity)
+
+    def acquire(self, pyrep: PyRep, path: str) -> Object:
+        """
+        Returns a model imported from the given .ttm file, placed at the pose
+        it had right after being imported, and ready to be spawned
+
+        Parameters
+        ----------
+            pyrep: PyRep
+                A handle to the pyrep simulation
+            path: str
+                The path to the .ttm file of the model
+
+        Returns
+        -------
+            Object
+                The base object of the model
+        """
+        if pyrep is not self._pyrep:
+            # The handles from a previous simulation are no longer valid
+            self._parked.clear()
+            self._in_use.clear()
+            self._pyrep = pyrep
+
+        for handle in reversed(list(self._parked.keys())):
+            entry = self._parked[handle]
+            if entry[0] != path:
+                continue
+            del self._parked[handle]
+            if not self._is_valid(entry):
+                continue
+            self._hits += 1
+            self._unpark(entry)
+            self._in_use[handle] = entry
+            return entry[1]
+
+        self._misses += 1
+        model = pyrep.import_model(path)
+        entry = (
+            path,
+            model,
+            model.get_pose(),
+            simGetModelProperty(model.get_handle()),
+            model.get_name(),
+        )
+        self._in_use[model.get_handle()] = entry
+        return model
+
+    def release(self, model: Object) -> None:
+        """
+        Parks a model that was acquired from this pool, or removes it from the
+        simulation if it doesn't belong to the pool
+        """
+        entry = self._in_use.pop(model.get_handle(), None)
+        if entry is None:
+            if model.still_exists():
+                model.remove()
+            return
+        if not self._is_valid(entry):
+            return
+        self._park(entry, len(self._parked))
+        self._parked[model.get_handle()] = entry
+        self._evict(self._capacity)
+
+    def clear(self) -> None:
+        """Removes all parked models from the simulation"""
+        self._evict(0)
+
+    def _is_valid(self, entry: PoolEntry) -> bool:
+        model = entry[1]
+        return model.still_exists() and model.get_name() == entry[4]
+
+    def _park(self, entry: PoolEntry, slot: int) -> None:
+        _, model, _, properties, _ = entry
+        simSetModelProperty(
+            model.get_handle(), properties | PARKED_MODEL_PROPERTIES
+        )
+        model.set_position(
+            [
+                PARKING_ORIGIN[0] + slot * PARKING_SPACING,
+                PARKING_ORIGIN[1],
+                PARKING_ORIGIN[2],
+            ]
+        )
+
+    def _unpark(self, entry: PoolEntry) -> None:
+        _, model, pose, properties, _ = entry
+        model.set_pose(pose)
+        simSetModelProperty(model.get_handle(), properties)
+        # Clear any velocities left from the last time the model was used
+        for obj in [model] + model.get_objects_in_tree(exclude_base=True):
+            obj.reset_dynamic_object()
+
+    def _evict(self, size: int) -> None:
+        while len(self._parked) > size:
+            _, entry = self._parked.popitem(last=False)
+            if self._is_valid(entry):
+                entry[1].remove()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, cast
 
 import numpy as np
 from numpy.typing import NDArray
@@ -9,7 +9,12 @@ from pyrep import PyRep
 from pyrep.const import ObjectType
 from pyrep.objects.shape import Shape
 
-from colosseum.variations.utils import ColorCfgMode, safeGetValue, sampleColor
+from colosseum.variations.utils import (
+    ColorCfgMode,
+    safeGetValue,
+    sampleColors,
+    sampleTargetsParams,
+)
 from colosseum.variations.variation import IVariation
 
 
@@ -108,33 +113,45 @@ class ObjectColorVariation(IVariation):
         elif len(color_range) > 0:
             self._config_mode = ColorCfgMode.USE_CUSTOM_COLOR_RANGE
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Samples a random color and sets it to the objects in the simulation.
-        Depending on the self._color_scame parameter, all objects will receive
-        the same color or different colors otherwise if the parameter is false
+        Samples the colors of the objects for a number of episodes. Depending
+        on the self._color_same parameter, all objects will receive the same
+        color or different colors otherwise if the parameter is false
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The colors under the key 'colors', with shape (n, objects, 3)
         """
-        if self._color_same:
-            color_value = sampleColor(
+        colors = sampleTargetsParams(
+            lambda size, units: sampleColors(
                 self._config_mode,
-                self._rng,
+                rng,
+                size,
                 color_names=self._color_names,
                 color_list=self._color_list,
                 color_range=self._color_range,
-            )
-
-            if color_value is not None:
-                for _, shape in self._targets.items():
-                    cast(Shape, shape).set_color(color_value.tolist())
-        else:
-            for _, shape in self._targets.items():
-                color_value = sampleColor(
-                    self._config_mode,
-                    self._rng,
-                    color_names=self._color_names,
-                    color_list=self._color_list,
-                    color_range=self._color_range,
-                )
+                units=units,
+            ),
+            n,
+            len(self._targets),
+            self._color_same,
+            shape=(3,),
+            rng=rng,
+            sampling=self._sampling,
+            unit_dims=3,
+        )
+        return {"colors": colors}
 
-                if color_value is not None:
-                    cast(Shape, shape).set_color(color_value.tolist())
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given colors to the objects in the simulation
+        """
+        for (name, shape), color in zip(
+            self._targets.items(), params["colors"]
+        ):
+            if not np.isnan(color).any() and self._shouldApply(name, color):
+                cast(Shape, shape).set_color(color.tolist())
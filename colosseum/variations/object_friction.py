@@ -2,15 +2,21 @@ from __future__ import annotations
 
 import warnings
 from enum import Enum
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, cast
 
 import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType
 
 from colosseum.pyrep.extensions.shape import ShapeExt
-from colosseum.variations.utils import safeGetValue
+from colosseum.variations.utils import (
+    chooseIndices,
+    safeGetValue,
+    sampleTargetsParams,
+    uniformValues,
+)
 from colosseum.variations.variation import IVariation
 
 
@@ -21,14 +27,17 @@ class FrictionConfigMode(Enum):
     USE_CUSTOM_FRICTION_RANGE = 2
 
 
-def sampleFriction(
+def sampleFrictions(
     mode: FrictionConfigMode,
     rng: np.random.Generator,
+    size: int,
     friction_list: List[float] = [],
     friction_range: List[float] = [],
-) -> Optional[float]:
+    units: Optional[NDArray] = None,
+) -> NDArray:
     """
-    Samples a random friction value using one of many options given by the user
+    Samples a batch of random friction values using one of many options given
+    by the user, with a single draw from the random generator
 
     Parameters
     ----------
@@ -36,27 +45,34 @@ def sampleFriction(
             The mode that will be used to sample friction values
         rng: np.random.Generator
             The random generator used to make the sampling process
+        size: int
+            The number of friction values to sample
         friction_list: List[float]
             A list of friction values which we can altentatively sample from
         friction_range: List[float]
             A list of two friction values that contain both low and high values
             to sample from using a uniform distribution
+        units: Optional[NDArray]
+            Points of shape (size, 1) used instead of drawing from rng, to
+            cover the choices evenly across episodes (see sampleUnitPoints)
 
     Returns
     -------
-        Optional[float]
-            A friction value sampled at random, or None in the worst case if
-            something went wrong during the sampling process
+        NDArray
+            The friction values sampled, with shape (size,). Values that
+            couldn't be sampled are given as NaN
     """
-    friction_value: Optional[float] = None
+    frictions = np.full(size, np.nan)
     if mode == FrictionConfigMode.USE_CUSTOM_FRICTION_VALUES:
         assert len(friction_list) > 0, "Must provide list of friction values"
-        friction_value = rng.choice(friction_list)
+        frictions = np.asarray(friction_list, dtype=np.float64)[
+            chooseIndices(rng, len(friction_list), size, units)
+        ]
     elif mode == FrictionConfigMode.USE_CUSTOM_FRICTION_RANGE:
         assert len(friction_range) == 2, "Friction range must be (low, high)"
         try:
-            friction_value = rng.uniform(
-                low=friction_range[0], high=friction_range[1]
+            frictions = uniformValues(
+                rng, friction_range[0], friction_range[1], size, units
             )
         except ValueError:
             warnings.warn(
@@ -65,7 +81,29 @@ def sampleFriction(
                 stacklevel=2,
             )
 
-    return friction_value
+    return frictions
+
+
+def sampleFriction(
+    mode: FrictionConfigMode,
+    rng: np.random.Generator,
+    friction_list: List[float] = [],
+    friction_range: List[float] = [],
+) -> Optional[float]:
+    """
+    Samples a random friction value using one of many options given by the user
+    (see sampleFrictions for the parameters)
+
+    Returns
+    -------
+        Optional[float]
+            A friction value sampled at random, or None in the worst case if
+            something went wrong during the sampling process
+    """
+    friction_value = sampleFrictions(
+        mode, rng, 1, friction_list, friction_range
+    )[0]
+    return None if np.isnan(friction_value) else float(friction_value)
 
 
 class ObjectFrictionVariation(IVariation):
@@ -144,29 +182,42 @@ class ObjectFrictionVariation(IVariation):
             # Replace Shape with ShapeExt
             self._targets[target_name] = ShapeExt(target_shape.get_handle())
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Samples a random friction value and sets it to the appropriate objects
-        in the simulation
+        Samples the friction values of the target objects for a number of
+        episodes
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The frictions under the key 'frictions', with shape (n, objects)
         """
-        if self._friction_same:
-            friction_value = sampleFriction(
+        frictions = sampleTargetsParams(
+            lambda size, units: sampleFrictions(
                 self._config_mode,
-                self._rng,
+                rng,
+                size,
                 friction_list=self._friction_list,
                 friction_range=self._friction_range,
-            )
-            for _, shape_ext in self._targets.items():
-                if friction_value is not None:
-                    cast(ShapeExt, shape_ext).set_friction(friction_value)
-        else:
-            for _, shape_ext in self._targets.items():
-                friction_value = sampleFriction(
-                    self._config_mode,
-                    self._rng,
-                    friction_list=self._friction_list,
-                    friction_range=self._friction_range,
-                )
-
-                if friction_value is not None:
-                    cast(ShapeExt, shape_ext).set_friction(friction_value)
+                units=units,
+            ),
+            n,
+            len(self._targets),
+            self._friction_same,
+            rng=rng,
+            sampling=self._sampling,
+        )
+        return {"frictions": frictions}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given friction values to the appropriate objects in the
+        simulation
+        """
+        for (name, shape_ext), friction in zip(
+            self._targets.items(), params["frictions"]
+        ):
+            if not np.isnan(friction) and self._shouldApply(name, friction):
+                cast(ShapeExt, shape_ext).set_friction(float(friction))
@@ -2,15 +2,21 @@ from __future__ import annotations
 
 import warnings
 from enum import Enum
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, cast
 
 import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType
 from pyrep.objects.shape import Shape
 
-from colosseum.variations.utils import safeGetValue
+from colosseum.variations.utils import (
+    chooseIndices,
+    safeGetValue,
+    sampleTargetsParams,
+    uniformValues,
+)
 from colosseum.variations.variation import IVariation
 
 
@@ -23,14 +29,17 @@ class MassConfigMode(Enum):
     USE_CUSTOM_MASS_RANGE = 2
 
 
-def sampleMass(
+def sampleMasses(
     mode: MassConfigMode,
     rng: np.random.Generator,
+    size: int,
     mass_list: List[float] = [],
     mass_range: List[float] = [],
-) -> Optional[float]:
+    units: Optional[NDArray] = None,
+) -> NDArray:
     """
-    Samples a random mass value using one of many options given by the user
+    Samples a batch of random mass values using one of many options given
+    by the user, with a single draw from the random generator
 
     Parameters
     ----------
@@ -38,33 +47,62 @@ def sampleMass(
             The mode that will be used to sample mass values
         rng: np.random.Generator
             The random generator used to make the sampling process
+        size: int
+            The number of mass values to sample
         mass_list: List[float]
             A list of mass values which we can altentatively sample from
         mass_range: List[float]
             A list of two mass values that contain both low and high values
             to sample from using a uniform distribution
+        units: Optional[NDArray]
+            Points of shape (size, 1) used instead of drawing from rng, to
+            cover the choices evenly across episodes (see sampleUnitPoints)
 
     Returns
     -------
-        Optional[float]
-            A mass value sampled at random, or None in the worst case if
-            something went wrong during the sampling process
+        NDArray
+            The mass values sampled, with shape (size,). Values that
+            couldn't be sampled are given as NaN
     """
-    mass_value: Optional[float] = None
+    masses = np.full(size, np.nan)
     if mode == MassConfigMode.USE_CUSTOM_MASS_VALUES:
         assert len(mass_list) > 0, "Must provide list of mass values"
-        mass_value = rng.choice(mass_list)
+        masses = np.asarray(mass_list, dtype=np.float64)[
+            chooseIndices(rng, len(mass_list), size, units)
+        ]
     elif mode == MassConfigMode.USE_CUSTOM_MASS_RANGE:
         assert len(mass_range) == 2, "Mass range must be (low, high)"
         try:
-            mass_value = rng.uniform(low=mass_range[0], high=mass_range[1])
+            masses = uniformValues(
+                rng, mass_range[0], mass_range[1], size, units
+            )
         except ValueError:
             warnings.warn(
                 " Something went wrong while using the given mass range",
                 stacklevel=2,
             )
 
-    return mass_value
+    return masses
+
+
+def sampleMass(
+    mode: MassConfigMode,
+    rng: np.random.Generator,
+    mass_list: List[float] = [],
+    mass_range: List[float] = [],
+) -> Optional[float]:
+    """
+    Samples a random mass value using one of many options given by the user
+    (see sampleMasses for the parameters)
+
+    Returns
+    -------
+        Optional[float]
+            A mass value sampled at random, or None in the worst case if
+            something went wrong during the sampling process
+    """
+    mass_value = sampleMasses(mode, rng, 1, mass_list, mass_range)[0]
+    return None if np.isnan(mass_value) else float(mass_value)
 
 
 class ObjectMassVariation(IVariation):
@@ -142,32 +180,42 @@ class ObjectMassVariation(IVariation):
                 "ObjectMassVariation> should pass valid args", stacklevel=2
             )
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Samples a random mass value and sets it to the appropriate objects
-        in the simulation
+        Samples the mass values of the target objects for a number of episodes.
+        If the variation wasn't given valid args, all masses are left as NaN
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The masses under the key 'masses', with shape (n, objects)
         """
         if self._config_mode == MassConfigMode.INVALID_MODE:
-            return
+            return {"masses": np.full((n, len(self._targets)), np.nan)}
 
-        if self._mass_same:
-            mass_value = sampleMass(
+        masses = sampleTargetsParams(
+            lambda size, units: sampleMasses(
                 self._config_mode,
-                self._rng,
+                rng,
+                size,
                 mass_list=self._mass_list,
                 mass_range=self._mass_range,
-            )
-            for _, shape in self._targets.items():
-                if mass_value is not None:
-                    cast(Shape, shape).set_mass(mass_value)
-        else:
-            for _, shape in self._targets.items():
-                mass_value = sampleMass(
-                    self._config_mode,
-                    self._rng,
-                    mass_list=self._mass_list,
-                    mass_range=self._mass_range,
-                )
-
-                if mass_value is not None:
-                    cast(Shape, shape).set_mass(mass_value)
+                units=units,
+            ),
+            n,
+            len(self._targets),
+            self._mass_same,
+            rng=rng,
+            sampling=self._sampling,
+        )
+        return {"masses": masses}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given mass values to the appropriate objects in the simulation
+        """
+        for (name, shape), mass in zip(self._targets.items(), params["masses"]):
+            if not np.isnan(mass) and self._shouldApply(name, mass):
+                cast(Shape, shape).set_mass(float(mass))
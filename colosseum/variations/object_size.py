@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, cast
 
+import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType
 
 from colosseum.pyrep.extensions.shape import ShapeExt
-from colosseum.variations.utils import ScaleCfgMode, safeGetValue, sampleScale
+from colosseum.variations.utils import (
+    ScaleCfgMode,
+    safeGetValue,
+    sampleScales,
+    sampleTargetsParams,
+)
 from colosseum.variations.variation import IVariation
 
 
@@ -96,30 +103,42 @@ class ObjectSizeVariation(IVariation):
             # Replace Shape with ShapeExt
             self._targets[target_name] = ShapeExt(target_shape.get_handle())
 
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Samples a random scale value and sets it to the appropriate object in
-        the simulation. If scale_same is True, the same scale value is applied
-        to all target objects
+        Samples the scales of the target objects for a number of episodes. If
+        scale_same is True, the same scale value is used for all target objects
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The scales under the key 'scales', with shape (n, objects)
         """
-        if self._scale_same:
-            scale_value = sampleScale(
+        scales = sampleTargetsParams(
+            lambda size, units: sampleScales(
                 self._config_mode,
-                self._rng,
+                rng,
+                size,
                 scale_list=self._scale_list,
                 scale_range=self._scale_range,
-            )
-            for _, shape_ext in self._targets.items():
-                if scale_value is not None:
-                    cast(ShapeExt, shape_ext).set_scale(scale_value)
-        else:
-            for _, shape_ext in self._targets.items():
-                scale_value = sampleScale(
-                    self._config_mode,
-                    self._rng,
-                    scale_list=self._scale_list,
-                    scale_range=self._scale_range,
-                )
-
-                if scale_value is not None:
-                    cast(ShapeExt, shape_ext).set_scale(scale_value)
+                units=units,
+            ),
+            n,
+            len(self._targets),
+            self._scale_same,
+            rng=rng,
+            sampling=self._sampling,
+        )
+        return {"scales": scales}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given scales to the appropriate objects in the simulation. The
+        scales are set even if unchanged, as restoring the state of the task on
+        every reset moves the dummies of non-model shapes back to their rest
+        positions, and setting the scale relocates them
+        """
+        for shape_ext, scale in zip(self._targets.values(), params["scales"]):
+            if not np.isnan(scale):
+                cast(ShapeExt, shape_ext).set_scale(float(scale))
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import os
-import re
 from typing import Dict, List, Optional, Set, Tuple, cast
 
+import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType, TextureMappingMode
+from pyrep.textures.texture import Texture
 
 from colosseum import ASSETS_TEXTURES_FOLDER
 from colosseum.pyrep.extensions.shape import ShapeExt
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.texture_cache import TextureCache
 from colosseum.variations.utils import safeGetValue
 from colosseum.variations.variation import IVariation
 
@@ -111,45 +115,72 @@ class ObjectTextureVariation(IVariation):
 
         self._textures_filemap: Dict[str, str] = {}
 
-        regex = re.compile("(.*jpg$)|(.*png$)")
-        candidate_textures_names = [
-            fname
-            for fname in os.listdir(self._textures_folder)
-            if regex.match(fname)
-        ]
-
-        # Check that candidates are in the whitelist (if any)
-        valid_textures_names = []
-        for candidate_tex_name in candidate_textures_names:
-            if len(self._textures_filenames_set) < 1:
-                valid_textures_names.append(candidate_tex_name)
-            elif candidate_tex_name in self._textures_filenames_set:
-                valid_textures_names.append(candidate_tex_name)
-
-        for fname in valid_textures_names:
-            texture_filepath = os.path.join(self._textures_folder, fname)
-            # TODO(wilbert): use a better approach to getting the texture name
-            texture_filename = fname.split(".")[0]
-            self._textures_paths.append(texture_filepath)
-            self._textures_names.append(texture_filename)
-            self._textures_filemap[texture_filename] = texture_filepath
+        for texture in AssetRegistry.instance().textures(
+            self._textures_folder, list(self._textures_filenames_set)
+        ):
+            self._textures_paths.append(texture.path)
+            self._textures_names.append(texture.name)
+            self._textures_filemap[texture.name] = texture.path
 
         for target_name, target_shape in self._targets.items():
             # Replace Shape with ShapeExt
             self._targets[target_name] = ShapeExt(target_shape.get_handle())
 
-    def randomize(self) -> None:
-        for _, shape_ext in self._targets.items():
-            choice_name = self._rng.choice(self._textures_names)
-            choice_fpath = self._textures_filemap[choice_name]
-            texture_obj, choice_texture = self._pyrep.create_texture(
-                choice_fpath
-            )
-            cast(ShapeExt, shape_ext).try_set_texture(
-                choice_texture,
-                mapping_mode=self._mapping_mode,
-                uv_scaling=self._uv_scale,
-                repeat_along_u=self._repeat_along_u,
-                repeat_along_v=self._repeat_along_v,
-            )
-            texture_obj.remove()
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples the textures of the target objects for a number of episodes
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The indices of the textures (see textures_names) under the key
+                'textures', with shape (n, objects)
+        """
+        textures = rng.integers(
+            len(self._textures_names), size=(n, len(self._targets))
+        )
+        return {"textures": textures}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Applies the given textures to the target objects in the simulation
+        """
+        # Look up each texture only once, even if shared by many targets, and
+        # pin them so loading one doesn't evict another before it's applied
+        textures: Dict[int, Texture] = {}
+        with TextureCache.instance().pin():
+            for (name, shape_ext), texture_idx in zip(
+                self._targets.items(), params["textures"]
+            ):
+                texture_idx = int(texture_idx)
+                if texture_idx not in textures:
+                    textures[texture_idx] = TextureCache.instance().get(
+                        self._pyrep, self._textures_paths[texture_idx]
+                    )
+                choice_texture = textures[texture_idx]
+                # The texture id changes if the texture was evicted and reloaded
+                if not self._shouldApply(
+                    name, [texture_idx, choice_texture.get_texture_id()]
+                ):
+                    continue
+                cast(ShapeExt, shape_ext).try_set_texture(
+                    choice_texture,
+                    mapping_mode=self._mapping_mode,
+                    uv_scaling=self._uv_scale,
+                    repeat_along_u=self._repeat_along_u,
+                    repeat_along_v=self._repeat_along_v,
+                )
+
+    def asset_filenames(self) -> Dict[str, List[str]]:
+        return {
+            "textures": [
+                os.path.basename(path) for path in self._textures_paths
+            ]
+        }
+
+    @property
+    def textures_names(self) -> List[str]:
+        """The names of the textures, in the order used by parameters"""
+        return self._textures_names
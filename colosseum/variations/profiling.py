@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import functools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from colosseum.variations.variation import IVariation
+
+# Methods of the variations that are timed when profiling
+PROFILED_METHODS = ["randomize", "on_init_episode", "on_step_episode"]
+
+
+@dataclass
+class CallStats:
+    calls: int = field(default=0)
+    total_time: float = field(default=0.0)
+    max_time: float = field(default=0.0)
+    sim_calls: int = field(default=0)
+
+    def add(self, elapsed: float, sim_calls: int) -> None:
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.sim_calls += sim_calls
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "total_ms": 1000.0 * self.total_time,
+            "mean_ms": 1000.0 * self.total_time / max(self.calls, 1),
+            "max_ms": 1000.0 * self.max_time,
+            "sim_calls": self.sim_calls,
+        }
+
+
+class SimCallCounter:
+    """
+    Counts the calls made to the simulator API through the functions of
+    pyrep.backend.sim, which the PyRep objects look up on every call, by
+    replacing them with counting wrappers while installed. Calls made directly
+    through the cffi library, or through functions imported by name before the
+    counter was installed, are not counted
+    """
+
+    _instance: Optional[SimCallCounter] = None
+
+    @staticmethod
+    def instance() -> SimCallCounter:
+        """Returns the counter shared by all profilers"""
+        if SimCallCounter._instance is None:
+            SimCallCounter._instance = SimCallCounter()
+        return SimCallCounter._instance
+
+    def __init__(self):
+        self._count = 0
+        self._users = 0
+        self._originals: Dict[str, Callable] = {}
+
+    @property
+    def count(self) -> int:
+        """The number of simulator calls made since the counter was created"""
+        return self._count
+
+    def install(self) -> None:
+        self._users += 1
+        if self._users > 1:
+            return
+        from pyrep.backend import sim
+
+        for name in dir(sim):
+            func = getattr(sim, name)
+            if name.startswith("sim") and callable(func):
+                self._originals[name] = func
+                setattr(sim, name, self._wrap(func))
+
+    def uninstall(self) -> None:
+        self._users = max(self._users - 1, 0)
+        if self._users > 0:
+            return
+        from pyrep.backend import sim
+
+        for name, func in self._originals.items():
+            setattr(sim, name, func)
+        self._originals.clear()
+
+    def _wrap(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def counted(*args, **kwargs):
+            self._count += 1
+            return func(*args, **kwargs)
+
+        return counted
+
+
+class VariationsProfiler:
+    """
+    Times the calls made to the variations (see PROFILED_METHODS), and counts
+    the simulator calls made within them, keyed by the name of the variation.
+    Nested calls (e.g. randomize within on_init_episode) are counted in both
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, CallStats]] = {}
+        self._counter = SimCallCounter.instance()
+        self._counter.install()
+
+    def wrap(self, variation: IVariation) -> None:
+        """
+        Replaces the profiled methods of the given variation with timed ones
+
+        Parameters
+        ----------
+            variation: IVariation
+                The variation to be profiled
+        """
+        var_stats = self._stats.setdefault(variation.name, {})
+        for method_name in PROFILED_METHODS:
+            method = getattr(variation, method_name)
+            call_stats = var_stats.setdefault(method_name, CallStats())
+            setattr(variation, method_name, self._timed(method, call_stats))
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Returns a snapshot of the stats of each variation and method, with the
+        number of calls, total, mean and max time in milliseconds, and number
+        of simulator calls
+        """
+        return {
+            var_name: {
+                method_name: call_stats.as_dict()
+                for method_name, call_stats in var_stats.items()
+                if call_stats.calls > 0
+            }
+            for var_name, var_stats in self._stats.items()
+        }
+
+    def summary(self) -> str:
+        """Returns a table of the stats, the most expensive calls first"""
+        rows: List[List[Any]] = [
+            [var_name, method_name, values]
+            for var_name, var_stats in self.stats().items()
+            for method_name, values in var_stats.items()
+        ]
+        rows.sort(key=lambda row: row[2]["total_ms"], reverse=True)
+        lines = [
+            f"{'variation':<30} {'method':<16} {'calls':>7} {'total ms':>10} "
+            + f"{'mean ms':>9} {'max ms':>9} {'sim calls':>10}"
+        ]
+        for var_name, method_name, values in rows:
+            lines.append(
+                f"{var_name:<30} {method_name:<16} {values['calls']:>7} "
+                + f"{values['total_ms']:>10.1f} {values['mean_ms']:>9.2f} "
+                + f"{values['max_ms']:>9.2f} {values['sim_calls']:>10}"
+            )
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        """Stops counting the simulator calls"""
+        self._counter.uninstall()
+
+    def _timed(self, method: Callable, call_stats: CallStats) -> Callable:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            sim_calls = self._counter.count
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                call_stats.add(
+                    time.perf_counter() - start,
+                    self._counter.count - sim_calls,
+                )
+
+        return timed
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import importlib
+import threading
+import warnings
+from importlib import metadata
+from typing import Callable, Dict, List, Optional, Type
+
+from omegaconf import DictConfig
+from pyrep import PyRep
+
+from colosseum.variations.variation import IVariation
+
+# Group of the package entry points used by other packages to provide their
+# own variations, as 'variation_id = package.module:VariationClass'
+ENTRY_POINTS_GROUP = "colosseum.variations"
+
+# Factories receive the simulation, the name of the variation, the names of
+# its targets and the configuration of the factor
+VariationFactory = Callable[[PyRep, str, List[str], DictConfig], IVariation]
+
+# Built-in variations as 'module:class', imported only when a config uses them
+BUILTIN_VARIATIONS: Dict[str, str] = {
+    "light_color": "colosseum.variations.light_color:LightColorVariation",
+    "object_color": "colosseum.variations.object_color:ObjectColorVariation",
+    "object_size": "colosseum.variations.object_size:ObjectSizeVariation",
+    "object_texture": (
+        "colosseum.variations.object_texture:ObjectTextureVariation"
+    ),
+    "table_color": "colosseum.variations.table_color:TableColorVariation",
+    "table_texture": "colosseum.variations.table_texture:TableTextureVariation",
+    "background_texture": (
+        "colosseum.variations.background_texture:BackgroundTextureVariation"
+    ),
+    "distractor_object": (
+        "colosseum.variations.distractor_object:DistractorObjectVariation"
+    ),
+    "camera_pose": "colosseum.variations.camera_pose:CameraPoseVariation",
+    "object_friction": (
+        "colosseum.variations.object_friction:ObjectFrictionVariation"
+    ),
+    "object_mass": "colosseum.variations.object_mass:ObjectMassVariation",
+}
+
+# Built-in variations whose factories don't take the names of the targets, as
+# they always affect the same objects in the scene
+UNTARGETED_VARIATIONS = {"table_color", "table_texture", "background_texture"}
+
+
+def _loadObject(spec: str) -> object:
+    """Imports the object given as 'module:attribute'"""
+    module_name, attr_name = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), attr_name)
+
+
+def _factoryFromClass(
+    variation_cls: Type[IVariation], takes_targets: bool = True
+) -> VariationFactory:
+    """Returns a factory that creates variations with CreateFromConfig"""
+    if takes_targets:
+        return variation_cls.CreateFromConfig  # type: ignore
+
+    def factory(
+        pyrep: PyRep, name: str, targets_names: List[str], cfg: DictConfig
+    ) -> IVariation:
+        return variation_cls.CreateFromConfig(pyrep, name, cfg)  # type: ignore
+
+    return factory
+
+
+class VariationRegistry:
+    """
+    Process-wide map from variation ID (the 'variation' key of the factors in
+    a config) to the factory that creates it. Variation modules are imported
+    only the first time a config references their ID, so processes only pay
+    the import cost of the variations they actually use. Other packages can
+    add variations with `registerVariation` or through the entry points group
+    'colosseum.variations', without editing the manager
+    """
+
+    _instance: Optional[VariationRegistry] = None
+
+    @staticmethod
+    def instance() -> VariationRegistry:
+        """Returns the variation registry shared by all managers"""
+        if VariationRegistry._instance is None:
+            VariationRegistry._instance = VariationRegistry()
+        return VariationRegistry._instance
+
+    def __init__(self):
+        self._factories: Dict[str, VariationFactory] = {}
+        self._lazy: Dict[str, Callable[[], VariationFactory]] = {}
+        self._lock = threading.RLock()
+
+        for variation_id, spec in BUILTIN_VARIATIONS.items():
+            self.register_lazy(
+                variation_id,
+                spec,
+                takes_targets=variation_id not in UNTARGETED_VARIATIONS,
+            )
+        self._add_entry_points()
+
+    def register(self, variation_id: str, factory: VariationFactory) -> None:
+        """
+        Registers the factory of a variation, replacing any previous one
+
+        Parameters
+        ----------
+            variation_id: str
+                The ID used to reference the variation in the configs
+            factory: VariationFactory
+                A function that creates the variation from a factor config
+        """
+        with self._lock:
+            self._factories[variation_id] = factory
+            self._lazy.pop(variation_id, None)
+
+    def register_lazy(
+        self, variation_id: str, spec: str, takes_targets: bool = True
+    ) -> None:
+        """
+        Registers a variation class given as 'module:class', which is imported
+        only once a config references the given ID
+
+        Parameters
+        ----------
+            variation_id: str
+                The ID used to reference the variation in the configs
+            spec: str
+                The module and name of the variation class
+            takes_targets: bool
+                Whether the CreateFromConfig factory of the class receives the
+                names of the targets
+        """
+        with self._lock:
+            self._factories.pop(variation_id, None)
+            self._lazy[variation_id] = lambda: _factoryFromClass(
+                _loadObject(spec), takes_targets  # type: ignore
+            )
+
+    def ids(self) -> List[str]:
+        """Returns the IDs of all registered variations"""
+        with self._lock:
+            return sorted(set(self._factories) | set(self._lazy))
+
+    def get(self, variation_id: str) -> Optional[VariationFactory]:
+        """
+        Returns the factory of a variation, importing its module if needed. If
+        the import fails, the error is raised again on every lookup
+
+        Parameters
+        ----------
+            variation_id: str
+                The ID used to reference the variation in the configs
+
+        Returns
+        -------
+            Optional[VariationFactory]
+                The factory of the variation, or None if it isn't registered
+        """
+        with self._lock:
+            factory = self._factories.get(variation_id, None)
+            if factory is None and variation_id in self._lazy:
+                factory = self._lazy[variation_id]()
+                self._factories[variation_id] = factory
+                del self._lazy[variation_id]
+            return factory
+
+    def create(
+        self,
+        variation_id: str,
+        pyrep: PyRep,
+        name: str,
+        targets_names: List[str],
+        cfg: DictConfig,
+    ) -> Optional[IVariation]:
+        """
+        Creates a variation from the configuration of a factor
+
+        Returns
+        -------
+            Optional[IVariation]
+                The variation created, or None if the ID isn't registered
+        """
+        factory = self.get(variation_id)
+        if factory is None:
+            warnings.warn(
+                f"VariationRegistry > unknown variation '{variation_id}', "
+                + f"available variations are: {self.ids()}"
+            )
+            return None
+        return factory(pyrep, name, targets_names, cfg)
+
+    def _add_entry_points(self) -> None:
+        try:
+            all_entry_points = metadata.entry_points()
+        except Exception as e:
+            warnings.warn(f"VariationRegistry > couldn't list plugins: {e}")
+            return
+        if hasattr(all_entry_points, "select"):
+            entry_points = all_entry_points.select(group=ENTRY_POINTS_GROUP)
+        else:
+            entry_points = all_entry_points.get(ENTRY_POINTS_GROUP, [])
+
+        for entry_point in entry_points:
+            if entry_point.name in self._lazy or (
+                entry_point.name in self._factories
+            ):
+                warnings.warn(
+                    f"VariationRegistry > plugin '{entry_point.value}' uses "
+                    + f"the ID '{entry_point.name}' of a registered variation, "
+                    + "ignoring it"
+                )
+                continue
+            self._lazy[
+                entry_point.name
+            ] = lambda entry_point=entry_point: _factoryFromClass(
+                entry_point.load()
+            )
+
+
+def registerVariation(
+    variation_id: str,
+) -> Callable[[Type[IVariation]], Type[IVariation]]:
+    """
+    Class decorator that registers a variation under the given ID. The class
+    must provide CreateFromConfig(pyrep, name, targets_names, cfg)
+
+    Parameters
+    ----------
+        variation_id: str
+            The ID used to reference the variation in the configs
+    """
+
+    def decorator(variation_cls: Type[IVariation]) -> Type[IVariation]:
+        VariationRegistry.instance().register(
+            variation_id, _factoryFromClass(variation_cls)
+        )
+        return variation_cls
+
+    return decorator
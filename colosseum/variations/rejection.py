@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from omegaconf import DictConfig
+
+from colosseum.variations.utils import safeGetValue
+
+# Parameters of a single episode, keyed by variation and parameter name
+EpisodeParams = Dict[str, Dict[str, NDArray]]
+
+DEFAULT_REJECTION_RADIUS = 0.1
+DEFAULT_REJECTION_MIN_FAILURES = 2
+DEFAULT_REJECTION_MAX_RESAMPLES = 10
+DEFAULT_REJECTION_MAX_RECORDS = 10000
+
+
+class FailureRejection:
+    """
+    Learns which regions of the variation parameters led to failed demos, and
+    rejects similar samples in later episodes. Two episodes are similar when
+    all their discrete parameters (e.g. texture or model indices) are the same,
+    and all their continuous parameters are within a radius of each other,
+    once scaled by the range of the values seen so far. A sample is rejected
+    with the probability of failure estimated from the similar episodes
+    recorded, but only once enough failures were seen around it
+    """
+
+    @staticmethod
+    def CreateFromConfig(cfg: DictConfig) -> FailureRejection:
+        """
+        Factory function used to create the learner from a given configuration
+        coming from yaml through OmegaConf
+        """
+        return FailureRejection(
+            radius=safeGetValue(cfg, "radius", DEFAULT_REJECTION_RADIUS),
+            min_failures=safeGetValue(
+                cfg, "min_failures", DEFAULT_REJECTION_MIN_FAILURES
+            ),
+            max_resamples=safeGetValue(
+                cfg, "max_resamples", DEFAULT_REJECTION_MAX_RESAMPLES
+            ),
+            max_records=safeGetValue(
+                cfg, "max_records", DEFAULT_REJECTION_MAX_RECORDS
+            ),
+            records_path=safeGetValue(cfg, "records_path", None),
+            seed=safeGetValue(cfg, "seed", None),
+        )
+
+    def __init__(
+        self,
+        radius: float = DEFAULT_REJECTION_RADIUS,
+        min_failures: int = DEFAULT_REJECTION_MIN_FAILURES,
+        max_resamples: int = DEFAULT_REJECTION_MAX_RESAMPLES,
+        max_records: int = DEFAULT_REJECTION_MAX_RECORDS,
+        records_path: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Creates a learner with no recorded episodes
+
+        Parameters
+        ----------
+            radius: float
+                The max. distance between the continuous parameters of similar
+                episodes, as a fraction of the range of each parameter
+            min_failures: int
+                The number of similar failed episodes needed before a sample
+                can be rejected
+            max_resamples: int
+                The max. number of times the parameters of an episode are
+                sampled again, after which the last sample is kept
+            max_records: int
+                The max. number of episodes remembered, the oldest ones are
+                forgotten first
+            records_path: Optional[str]
+                The .npz file where the recorded episodes are saved when the
+                manager shuts down (see `save`), or None to not save them
+            seed: Optional[int]
+                The seed of the random generator used to reject samples
+        """
+        self._radius = radius
+        self._min_failures = min_failures
+        self._max_resamples = max_resamples
+        self._max_records = max_records
+        self._records_path = records_path
+        self._rng = np.random.default_rng(seed)
+
+        # Layout of the parameters, as (variation, parameter, discrete), the
+        # number of values of each one and the layout of each feature, fixed
+        # by the first episode seen
+        self._layout: Optional[List[Tuple[str, str, bool]]] = None
+        self._sizes: List[int] = []
+        self._columns: List[Tuple[str, str, bool]] = []
+        # Features and outcome of each recorded episode
+        self._features: List[NDArray] = []
+        self._failed: List[bool] = []
+        # The features and outcomes stacked into arrays, until the next record
+        self._stacked: Optional[Tuple[NDArray, NDArray]] = None
+        # Whether scoring a sample with a different layout was reported
+        self._warned_layout = False
+
+        self._num_candidates = 0
+        self._num_rejected = 0
+        self._num_exhausted = 0
+
+    @property
+    def max_resamples(self) -> int:
+        return self._max_resamples
+
+    @property
+    def records_path(self) -> Optional[str]:
+        return self._records_path
+
+    def record(self, params: EpisodeParams, failed: bool) -> None:
+        """
+        Records the outcome of the demo of an episode. If the layout of the
+        parameters changed (e.g. a different config), the episodes recorded
+        with the previous layout are forgotten
+
+        Parameters
+        ----------
+            params: EpisodeParams
+                The parameters applied in the episode
+            failed: bool
+                Whether the demo of the episode failed
+        """
+        features = self._featurize(params, adopt=True)
+        if features is None:
+            return
+        self._features.append(features)
+        self._failed.append(failed)
+        self._stacked = None
+        if len(self._features) > self._max_records:
+            del self._features[0]
+            del self._failed[0]
+
+    def accept(self, params: EpisodeParams) -> bool:
+        """
+        Decides whether the sampled parameters of an episode are kept, or have
+        to be sampled again as similar ones led to failed demos
+
+        Parameters
+        ----------
+            params: EpisodeParams
+                The parameters sampled for the episode
+
+        Returns
+        -------
+            bool
+                True if the parameters are accepted
+        """
+        self._num_candidates += 1
+        failure_rate = self.failure_rate(params)
+        if failure_rate > 0.0 and self._rng.random() < failure_rate:
+            self._num_rejected += 1
+            return False
+        return True
+
+    def on_resamples_exhausted(self) -> None:
+        """Called when a sample is kept after rejecting max_resamples ones"""
+        self._num_exhausted += 1
+
+    def failure_rate(self, params: EpisodeParams) -> float:
+        """
+        Returns the estimated probability that the demo fails with the given
+        parameters, or zero if not enough similar failures were recorded
+
+        Parameters
+        ----------
+            params: EpisodeParams
+                The parameters of an episode
+        """
+        features = self._featurize(params)
+        if features is None or len(self._features) < 1:
+            return 0.0
+        if self._stacked is None:
+            self._stacked = (np.stack(self._features), np.array(self._failed))
+        recorded, failed = self._stacked
+        if failed.sum() < self._min_failures:
+            return 0.0
+
+        discrete = np.array([column[2] for column in self._columns], dtype=bool)
+        same = np.all(recorded[:, discrete] == features[discrete], axis=1)
+
+        continuous = ~discrete
+        if continuous.any():
+            values = recorded[:, continuous]
+            scale = np.nanmax(values, axis=0) - np.nanmin(values, axis=0)
+            scale = np.where(scale > 0, scale, 1.0)
+            distances = np.nan_to_num(
+                np.abs(values - features[continuous]) / scale
+            )
+            same &= np.all(distances <= self._radius, axis=1)
+
+        num_failed = int(failed[same].sum())
+        if num_failed < self._min_failures:
+            return 0.0
+        # Laplace smoothing, so a few failures never reject all samples
+        return num_failed / (int(same.sum()) + 2)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the number of recorded episodes and failures, the number of
+        candidate samples and rejected ones, the rejection rate, and the number
+        of episodes that kept a sample after too many rejections
+        """
+        return {
+            "recorded": len(self._failed),
+            "failures": int(np.sum(self._failed)),
+            "candidates": self._num_candidates,
+            "rejected": self._num_rejected,
+            "rejection_rate": self._num_rejected / max(self._num_candidates, 1),
+            "exhausted": self._num_exhausted,
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Saves the recorded episodes into a .npz file, with the features of each
+        episode, whether its demo failed, and the name of each feature
+        """
+        np.savez_compressed(
+            path,
+            features=(
+                np.stack(self._features)
+                if len(self._features) > 0
+                else np.zeros((0, len(self._columns)))
+            ),
+            failed=np.array(self._failed, dtype=bool),
+            names=np.array(
+                [
+                    f"{var_name}/{param_name}"
+                    for var_name, param_name, _ in self._columns
+                ]
+            ),
+        )
+
+    def _featurize(
+        self, params: EpisodeParams, adopt: bool = False
+    ) -> Optional[NDArray]:
+        """
+        Flattens the parameters of an episode into a feature vector, fixing the
+        layout of the features with the first episode seen. If the parameters
+        don't follow that layout (e.g. a different config), the model is reset
+        to the new layout when adopt is True, or None is returned otherwise
+        """
+        layout = [
+            (var_name, param_name, np.asarray(values).dtype.kind in "iub")
+            for var_name in sorted(params)
+            for param_name, values in sorted(params[var_name].items())
+        ]
+        sizes = [
+            np.asarray(params[var_name][param_name]).size
+            for var_name, param_name, _ in layout
+        ]
+        changed = self._layout is not None and (
+            layout != self._layout or sizes != self._sizes
+        )
+        if changed and not adopt:
+            if not self._warned_layout:
+                warnings.warn(
+                    "FailureRejection > the layout of the variation parameters "
+                    + "differs from the recorded episodes, samples with the "
+                    + "new layout aren't rejected until one is recorded"
+                )
+                self._warned_layout = True
+            return None
+        if self._layout is None or changed:
+            if changed:
+                warnings.warn(
+                    "FailureRejection > the layout of the variation parameters "
+                    + f"changed, forgetting {len(self._features)} recorded "
+                    + "episodes"
+                )
+            self._layout = layout
+            self._sizes = sizes
+            self._columns = [
+                column
+                for column, size in zip(layout, sizes)
+                for _ in range(size)
+            ]
+            self._features.clear()
+            self._failed.clear()
+            self._stacked = None
+            self._warned_layout = False
+
+        return np.concatenate(
+            [
+                np.asarray(
+                    params[var_name][param_name], dtype=np.float64
+                ).reshape(-1)
+                for var_name, param_name, _ in layout
+            ]
+            + [np.zeros(0)]
+        )
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-import warnings
-from typing import List, Optional, cast
+from typing import Dict, List, Optional
 
 import numpy as np
 from numpy.typing import NDArray
@@ -10,16 +9,22 @@ from pyrep import PyRep
 from pyrep.const import ObjectType
 from pyrep.objects.shape import Shape
 
-from colosseum.variations.utils import ColorCfgMode, safeGetValue, sampleColor
+from colosseum.variations.utils import (
+    DEFAULT_TABLE_NAME,
+    ColorCfgMode,
+    getTableTop,
+    safeGetValue,
+    sampleColors,
+    sampleTargetsParams,
+)
 from colosseum.variations.variation import IVariation
 
-DEFAULT_TABLE_NAME = "diningTable_visible"
-
 
 class TableColorVariation(IVariation):
     """Table color variation, can change tabletop's color in simulation"""
 
     VARIATION_ID = "table_color"
+    CAN_SKIP_UNCHANGED = True
 
     @staticmethod
     def CreateFromConfig(
@@ -83,8 +88,10 @@ class TableColorVariation(IVariation):
             else (np.zeros(3), np.ones(3))
         )
 
-        # Keep a reference to the table for easier access
-        self._table_shape = cast(Shape, self._targets[DEFAULT_TABLE_NAME])
+        # Keep a reference to the table top, split from the table only once
+        self._table_top: Optional[Shape] = None
+        if DEFAULT_TABLE_NAME in self._targets:
+            self._table_top = getTableTop(self._pyrep)
 
         if (
             len(color_names) < 1
@@ -99,25 +106,45 @@ class TableColorVariation(IVariation):
         elif len(color_range) > 0:
             self._config_mode = ColorCfgMode.USE_CUSTOM_COLOR_RANGE
 
-    def randomize(self) -> None:
-        color_value = sampleColor(
-            self._config_mode,
-            self._rng,
-            color_names=self._color_names,
-            color_list=self._color_list,
-            color_range=self._color_range,
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples the colors of the table top for a number of episodes
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The colors under the key 'color', with shape (n, 3)
+        """
+        colors = sampleTargetsParams(
+            lambda size, units: sampleColors(
+                self._config_mode,
+                rng,
+                size,
+                color_names=self._color_names,
+                color_list=self._color_list,
+                color_range=self._color_range,
+                units=units,
+            ),
+            n,
+            1,
+            True,
+            shape=(3,),
+            rng=rng,
+            sampling=self._sampling,
+            unit_dims=3,
         )
+        return {"color": colors[:, 0]}
 
-        if color_value is not None:
-            self._applyColor(color_value)
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Sets the given color to the table top in the simulation
+        """
+        color = params["color"]
+        if not np.isnan(color).any() and self._shouldApply("table", color):
+            self._applyColor(color)
 
     def _applyColor(self, color: NDArray) -> None:
-        table_shape_parts = self._table_shape.ungroup()
-        table_top_shape = table_shape_parts[0]
-        table_top_shape.set_color(color.tolist())
-        if self._pyrep is not None:
-            self._table_shape = self._pyrep.group_objects(table_shape_parts)
-        else:
-            warnings.warn(
-                "Tried to group shapes but don't have a handle to pyrep itself"
-            )
+        assert self._table_top is not None
+        self._table_top.set_color(color.tolist())
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import os
-import re
-from typing import Dict, List, Optional, Set, Tuple, cast
+from typing import Dict, List, Optional, Set, Tuple
 
+import numpy as np
+from numpy.typing import NDArray
 from omegaconf import DictConfig
 from pyrep import PyRep
 from pyrep.const import ObjectType, TextureMappingMode
@@ -11,11 +12,15 @@ from pyrep.objects.shape import Shape
 from pyrep.textures.texture import Texture
 
 from colosseum import ASSETS_TEXTURES_FOLDER
-from colosseum.variations.utils import safeGetValue
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.texture_cache import TextureCache
+from colosseum.variations.utils import (
+    DEFAULT_TABLE_NAME,
+    getTableTop,
+    safeGetValue,
+)
 from colosseum.variations.variation import IVariation
 
-DEFAULT_TABLE_NAME = "diningTable_visible"
-
 DEFAULT_TEXTURE_KWARGS = {
     "mapping_mode": TextureMappingMode.PLANE,
     "repeat_along_u": True,
@@ -30,6 +35,7 @@ class TableTextureVariation(IVariation):
     """
 
     VARIATION_ID = "table_texture"
+    CAN_SKIP_UNCHANGED = True
 
     @staticmethod
     def CreateFromConfig(
@@ -84,7 +90,7 @@ class TableTextureVariation(IVariation):
             pyrep, name, ObjectType.SHAPE, [DEFAULT_TABLE_NAME], seed=seed
         )
 
-        self._table_shape: Optional[Shape] = None
+        self._table_top: Optional[Shape] = None
         self._textures_folder: str = (
             textures_folder if textures_folder != "" else ASSETS_TEXTURES_FOLDER
         )
@@ -97,45 +103,54 @@ class TableTextureVariation(IVariation):
 
         self._uv_scale = uv_scale
 
-        # Keep a reference to the table for easier access
+        # Keep a reference to the table top, split from the table only once
         if DEFAULT_TABLE_NAME in self._targets:
-            self._table_shape = cast(Shape, self._targets[DEFAULT_TABLE_NAME])
-
-        regex = re.compile("(.*jpg$)|(.*png$)")
-        candidate_textures_names = [
-            fname
-            for fname in os.listdir(self._textures_folder)
-            if regex.match(fname)
-        ]
-
-        # Check that candidates are in the whitelist (if any)
-        valid_textures_names = []
-        for candidate_tex_name in candidate_textures_names:
-            if len(self._textures_filenames_set) < 1:
-                valid_textures_names.append(candidate_tex_name)
-            elif candidate_tex_name in self._textures_filenames_set:
-                valid_textures_names.append(candidate_tex_name)
-
-        for fname in valid_textures_names:
-            texture_filepath = os.path.join(self._textures_folder, fname)
-            # TODO(wilbert): use a better approach to getting the texture name
-            texture_filename = fname.split(".")[0]
-            self._textures_paths.append(texture_filepath)
-            self._textures_names.append(texture_filename)
-            self._textures_filemap[texture_filename] = texture_filepath
-
-    def randomize(self) -> None:
+            self._table_top = getTableTop(self._pyrep)
+
+        for texture in AssetRegistry.instance().textures(
+            self._textures_folder, list(self._textures_filenames_set)
+        ):
+            self._textures_paths.append(texture.path)
+            self._textures_names.append(texture.name)
+            self._textures_filemap[texture.name] = texture.path
+
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
+        """
+        Samples random textures from the given folder for a number of episodes
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                The indices of the textures (see textures_names) under the key
+                'texture', with shape (n,)
+        """
+        return {"texture": rng.integers(len(self._textures_names), size=n)}
+
+    def apply(self, params: Dict[str, NDArray]) -> None:
         """
-        Samples a random texture from the given folder, and applies it to the
-        table top using the given uv scaling
+        Applies the given texture to the table top using the given uv scaling
         """
-        assert self._table_shape is not None
+        assert self._table_top is not None
+
+        texture_idx = int(params["texture"])
+        texture = TextureCache.instance().get(
+            self._pyrep, self._textures_paths[texture_idx]
+        )
+        # The texture id changes if the texture was evicted and reloaded
+        if self._shouldApply("table", [texture_idx, texture.get_texture_id()]):
+            self._applyTexture(texture)
+
+    def asset_filenames(self) -> Dict[str, List[str]]:
+        return {
+            "texture": [os.path.basename(path) for path in self._textures_paths]
+        }
 
-        choice_name = self._rng.choice(self._textures_names)
-        choice_fpath = self._textures_filemap[choice_name]
-        texture_obj, texture = self._pyrep.create_texture(choice_fpath)
-        self._applyTexture(texture)
-        texture_obj.remove()
+    @property
+    def textures_names(self) -> List[str]:
+        """The names of the textures, in the order used by parameters"""
+        return self._textures_names
 
     def _applyTexture(self, choice_texture: Texture) -> None:
         """
@@ -146,13 +161,10 @@ class TableTextureVariation(IVariation):
             choice_texture: Texture
                 The texture object to be applied to the table top
         """
-        assert self._table_shape is not None
+        assert self._table_top is not None
 
         texture_args = DEFAULT_TEXTURE_KWARGS.copy()
         texture_args["mapping_mode"] = TextureMappingMode.PLANE
         texture_args["uv_scaling"] = self._uv_scale
 
-        table_shape_parts = self._table_shape.ungroup()
-        # Only the first part contains the tabletop
-        table_shape_parts[0].set_texture(choice_texture, **texture_args)
-        self._table_shape = self._pyrep.group_objects(table_shape_parts)
+        self._table_top.set_texture(choice_texture, **texture_args)
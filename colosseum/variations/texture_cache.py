@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+from typing import Iterator, Optional, OrderedDict, Set, Tuple
+
+from pyrep import PyRep
+from pyrep.objects.shape import Shape
+from pyrep.textures.texture import Texture
+
+from colosseum.variations.assets import AssetRegistry
+from colosseum.variations.texture_variants import getTextureVariant
+
+DEFAULT_TEXTURE_CACHE_SIZE = 32
+
+TEXTURE_HOLDER_NAME = "colosseum_texture_holder"
+
+# Where the shapes that hold the cached textures are kept, out of the workspace
+TEXTURE_HOLDER_POSITION = [0.0, 0.0, -10.0]
+
+
+class TextureCache:
+    """
+    Process-wide cache of the textures loaded into the simulation, keyed by the
+    path of the image file. PyRep creates a texture along with a plane shape
+    that holds it, so these shapes are hidden from rendering, physics and
+    sensors, and removed in least recently used order once the cache is full.
+    If a render size is set, the textures are loaded from their downscaled
+    variants for that size (see texture_variants) instead of the originals.
+    Textures used together (e.g. by a single apply) can be pinned, so they're
+    not evicted before they're used (see `pin`)
+    """
+
+    _instance: Optional[TextureCache] = None
+
+    @staticmethod
+    def instance() -> TextureCache:
+        """Returns the texture cache shared by all variations"""
+        if TextureCache._instance is None:
+            TextureCache._instance = TextureCache()
+        return TextureCache._instance
+
+    def __init__(self, capacity: int = DEFAULT_TEXTURE_CACHE_SIZE):
+        """
+        Creates an empty texture cache
+
+        Parameters
+        ----------
+            capacity: int
+                The maximum number of textures kept in the simulation
+        """
+        self._capacity: int = max(capacity, 1)
+        self._entries: OrderedDict[
+            str, Tuple[Shape, Texture, str]
+        ] = collections.OrderedDict()
+        self._pyrep: Optional[PyRep] = None
+        self._render_size: int = 0
+        # Textures returned while pinning, which can't be evicted until then
+        self._pin_depth: int = 0
+        self._pinned: Set[str] = set()
+        self._count: int = 0
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_capacity(self, capacity: int) -> None:
+        """
+        Updates the maximum number of cached textures, evicting the least
+        recently used ones if required. At least one texture is always kept, so
+        a texture is still valid right after being returned by `get`
+        """
+        self._capacity = max(capacity, 1)
+        self._evict(self._capacity)
+
+    @property
+    def render_size(self) -> int:
+        return self._render_size
+
+    def set_render_size(self, render_size: int) -> None:
+        """
+        Sets the largest side of the images rendered by the cameras, used to
+        pick the variant of the textures to load, or 0 to load the originals.
+        Textures already loaded for a different size are removed
+        """
+        render_size = max(int(render_size), 0)
+        if render_size != self._render_size:
+            self._render_size = render_size
+            self.clear()
+
+    @contextlib.contextmanager
+    def pin(self) -> Iterator[None]:
+        """
+        Keeps every texture returned by `get` within the block from being
+        evicted until the block exits, even if the cache has to grow beyond its
+        capacity meanwhile. Blocks can be nested
+        """
+        self._pin_depth += 1
+        try:
+            yield
+        finally:
+            self._pin_depth -= 1
+            if self._pin_depth == 0:
+                self._pinned.clear()
+                self._evict(self._capacity)
+
+    def get(self, pyrep: PyRep, path: str) -> Texture:
+        """
+        Returns the texture for the given image file, loading it into the
+        simulation only if it isn't in the cache already
+
+        Parameters
+        ----------
+            pyrep: PyRep
+                A handle to the pyrep simulation
+            path: str
+                The path to the image file of the texture
+
+        Returns
+        -------
+            Texture
+                The texture, ready to be applied to shapes in the simulation
+        """
+        if pyrep is not self._pyrep:
+            # The handles from a previous simulation are no longer valid
+            self._entries.clear()
+            self._pinned.clear()
+            self._pyrep = pyrep
+
+        if self._pin_depth > 0:
+            self._pinned.add(path)
+
+        entry = self._entries.get(path, None)
+        if entry is not None:
+            holder, texture, holder_name = entry
+            if holder.still_exists() and holder.get_name() == holder_name:
+                self._entries.move_to_end(path)
+                self._hits += 1
+                return texture
+            del self._entries[path]
+
+        self._misses += 1
+        self._evict(self._capacity - 1)
+        asset = AssetRegistry.instance().asset(path)
+        holder, texture = pyrep.create_texture(
+            getTextureVariant(
+                path,
+                self._render_size,
+                asset.resolution if asset is not None else None,
+            )
+        )
+        holder_name = f"{TEXTURE_HOLDER_NAME}{self._count}"
+        self._count += 1
+        holder.set_name(holder_name)
+        holder.set_position(TEXTURE_HOLDER_POSITION)
+        holder.set_renderable(False)
+        holder.set_detectable(False)
+        holder.set_measurable(False)
+        holder.set_collidable(False)
+        holder.set_respondable(False)
+        holder.set_dynamic(False)
+        self._entries[path] = (holder, texture, holder_name)
+        return texture
+
+    def clear(self) -> None:
+        """Removes all cached textures from the simulation"""
+        self._evict(0)
+
+    def _evict(self, size: int) -> None:
+        evictable = [path for path in self._entries if path not in self._pinned]
+        for path in evictable[: max(len(self._entries) - max(size, 0), 0)]:
+            holder, _, holder_name = self._entries.pop(path)
+            if holder.still_exists() and holder.get_name() == holder_name:
+                holder.remove()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import warnings
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from colosseum import CACHE_FOLDER
+
+# Folder where the downscaled variants of the textures are cached, in one
+# subfolder per variant size
+TEXTURE_VARIANTS_FOLDER = os.path.join(CACHE_FOLDER, "textures")
+
+
+def nextPowerOfTwo(value: int) -> int:
+    """Returns the smallest power of two greater than or equal to value"""
+    return 1 << max(int(value) - 1, 0).bit_length()
+
+
+def prevPowerOfTwo(value: int) -> int:
+    """Returns the largest power of two lower than or equal to value"""
+    return 1 << max(int(value).bit_length() - 1, 0)
+
+
+def variantResolution(
+    resolution: Tuple[int, int], render_size: int
+) -> Tuple[int, int]:
+    """
+    Returns the resolution of the variant of a texture for the given render
+    size: each side is the smallest power of two that covers the render size,
+    but never larger than the original texture
+
+    Parameters
+    ----------
+        resolution: Tuple[int, int]
+            The width and height of the original texture, in pixels
+        render_size: int
+            The largest side of the images rendered by the cameras, in pixels
+
+    Returns
+    -------
+        Tuple[int, int]
+            The width and height of the variant, in pixels
+    """
+    target = nextPowerOfTwo(render_size)
+    width, height = resolution
+    return (
+        min(target, prevPowerOfTwo(width)),
+        min(target, prevPowerOfTwo(height)),
+    )
+
+
+def textureVariantPath(path: str, render_size: int) -> str:
+    """
+    Returns the path where the variant of the given texture for the given
+    render size is cached. The name depends on the path, size and modification
+    time of the original file, so edited textures get a new variant
+    """
+    stat = os.stat(path)
+    key = hashlib.sha256(
+        f"{os.path.abspath(path)};{stat.st_size};{stat.st_mtime}".encode()
+    ).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(
+        TEXTURE_VARIANTS_FOLDER, str(render_size), f"{name}_{key}.png"
+    )
+
+
+def makeTextureVariant(
+    path: str, render_size: int, overwrite: bool = False
+) -> str:
+    """
+    Creates the variant of a texture for the given render size, downscaled to
+    power of two sides and stored as an uncompressed PNG, so it's quick to
+    decode and small to upload
+
+    Parameters
+    ----------
+        path: str
+            The path to the image file of the original texture
+        render_size: int
+            The largest side of the images rendered by the cameras, in pixels
+        overwrite: bool
+            Whether to create the variant again, even if it's cached already
+
+    Returns
+    -------
+        str
+            The path to the image file of the variant
+    """
+    variant_path = textureVariantPath(path, render_size)
+    if not overwrite and os.path.isfile(variant_path):
+        return variant_path
+
+    with Image.open(path) as image:
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        mode = "RGBA" if has_alpha else "RGB"
+        resolution = variantResolution(image.size, render_size)
+        variant = image.convert(mode)
+        if resolution != image.size:
+            variant = variant.resize(resolution, Image.LANCZOS)
+
+    # Written to a temporary file first, so concurrent workers never read a
+    # partially written variant
+    os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+    tmp_path = f"{variant_path}.{os.getpid()}.tmp.png"
+    variant.save(tmp_path, compress_level=0)
+    os.replace(tmp_path, variant_path)
+    return variant_path
+
+
+def getTextureVariant(
+    path: str, render_size: int, resolution: Optional[List[int]] = None
+) -> str:
+    """
+    Returns the path to the variant of a texture for the given render size,
+    creating it if it isn't cached yet. The original path is returned if the
+    render size is not given (0), if the resolution of the texture is known and
+    it's already the resolution of the variant, or if the variant couldn't be
+    created
+
+    Parameters
+    ----------
+        path: str
+            The path to the image file of the original texture
+        render_size: int
+            The largest side of the images rendered by the cameras, in pixels
+        resolution: Optional[List[int]]
+            The width and height of the original texture (see AssetRegistry),
+            or None if unknown
+
+    Returns
+    -------
+        str
+            The path to the image file to be loaded into the simulation
+    """
+    if render_size < 1:
+        return path
+    if resolution is not None and variantResolution(
+        (resolution[0], resolution[1]), render_size
+    ) == tuple(resolution):
+        return path
+    try:
+        return makeTextureVariant(path, render_size)
+    except OSError as e:
+        warnings.warn(f"Couldn't create a variant of texture {path}: {e}")
+        return path
@@ -1,12 +1,163 @@
 import warnings
 from enum import Enum
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
 from omegaconf import DictConfig
+from pyrep import PyRep
+from pyrep.objects.object import Object
+from pyrep.objects.shape import Shape
 
-from colosseum.variations.const import COLORS_MAP, COLORS_NAMES
+from colosseum.variations.const import COLORS_ARRAY, COLORS_INDEX
+
+DEFAULT_TABLE_NAME = "diningTable_visible"
+DEFAULT_TABLE_TOP_NAME = "diningTable_top"
+
+# Above this number of cells, stratified sampling uses latin hypercubes instead
+MAX_STRATIFIED_CELLS = 1 << 20
+
+
+class SamplingMode(Enum):
+    # Independent uniform samples for each episode
+    IID = "iid"
+    # Jittered samples from a grid of cells, one cell per episode
+    STRATIFIED = "stratified"
+    # Latin hypercube samples, one stratum per episode along each dimension
+    LATIN_HYPERCUBE = "lhs"
+    # Scrambled Sobol sequence (requires scipy)
+    SOBOL = "sobol"
+
+
+def sampleUnitPoints(
+    rng: np.random.Generator, mode: SamplingMode, n: int, dims: int
+) -> NDArray:
+    """
+    Samples points in the unit hypercube that cover it evenly across the given
+    number of episodes, according to the given sampling mode
+
+    Parameters
+    ----------
+        rng: np.random.Generator
+            The random generator used to make the sampling process
+        mode: SamplingMode
+            The sampling mode used to place the points
+        n: int
+            The number of points (episodes) to sample
+        dims: int
+            The number of dimensions of each point
+
+    Returns
+    -------
+        NDArray
+            An array of shape (n, dims) with values in [0, 1)
+    """
+    if mode == SamplingMode.SOBOL:
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            warnings.warn(
+                "Couldn't import scipy, using latin hypercube sampling "
+                + "instead of Sobol sampling"
+            )
+            mode = SamplingMode.LATIN_HYPERCUBE
+        else:
+            with warnings.catch_warnings():
+                # Sobol points are only balanced for powers of two, but still
+                # cover the space better than independent ones otherwise
+                warnings.simplefilter("ignore", UserWarning)
+                return qmc.Sobol(d=dims, scramble=True, seed=rng).random(n)
+
+    if mode == SamplingMode.STRATIFIED:
+        cells_per_dim = max(int(np.ceil(n ** (1.0 / max(dims, 1)))), 1)
+        if cells_per_dim**dims <= MAX_STRATIFIED_CELLS:
+            cells = rng.choice(cells_per_dim**dims, size=n, replace=False)
+            cells_idxs = np.column_stack(
+                np.unravel_index(cells, (cells_per_dim,) * dims)
+            )
+            return (cells_idxs + rng.random((n, dims))) / cells_per_dim
+        mode = SamplingMode.LATIN_HYPERCUBE
+
+    if mode == SamplingMode.LATIN_HYPERCUBE:
+        strata = np.column_stack([rng.permutation(n) for _ in range(dims)])
+        return (strata + rng.random((n, dims))) / n
+
+    return rng.random((n, dims))
+
+
+def chooseIndices(
+    rng: np.random.Generator,
+    num_values: int,
+    size: int,
+    units: Optional[NDArray] = None,
+) -> NDArray:
+    """
+    Picks a batch of indices into a list of values at random, or the indices
+    that correspond to the given points in the unit interval
+
+    Parameters
+    ----------
+        rng: np.random.Generator
+            The random generator used to make the sampling process
+        num_values: int
+            The number of values to pick from
+        size: int
+            The number of indices to pick
+        units: Optional[NDArray]
+            Points of shape (size, dims) used instead of drawing from rng, of
+            which only the first dimension is used (see sampleUnitPoints)
+
+    Returns
+    -------
+        NDArray
+            An integer array of shape (size,)
+    """
+    if units is None:
+        return rng.integers(num_values, size=size)
+    return np.minimum(
+        (units[:, 0] * num_values).astype(np.int64), num_values - 1
+    )
+
+
+def uniformValues(
+    rng: np.random.Generator,
+    low: Any,
+    high: Any,
+    size: int,
+    units: Optional[NDArray] = None,
+) -> NDArray:
+    """
+    Samples a batch of values uniformly between low and high, or the values
+    that correspond to the given points in the unit hypercube
+
+    Parameters
+    ----------
+        rng: np.random.Generator
+            The random generator used to make the sampling process
+        low: Any
+            The lower bound, either a scalar or an array
+        high: Any
+            The upper bound, with the same shape as low
+        size: int
+            The number of values to sample
+        units: Optional[NDArray]
+            Points of shape (size, dims) used instead of drawing from rng, with
+            at least as many dimensions as elements in low (see
+            sampleUnitPoints)
+
+    Returns
+    -------
+        NDArray
+            An array of shape (size,) + shape of low
+    """
+    low = np.asarray(low, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    if units is None:
+        return rng.uniform(low=low, high=high, size=(size,) + low.shape)
+    if np.any(high < low):
+        raise ValueError(f"Range low {low} is greater than high {high}")
+    units = units[:, : max(low.size, 1)].reshape((size,) + low.shape)
+    return low + units * (high - low)
 
 
 class ColorCfgMode(Enum):
@@ -20,15 +171,18 @@ class ColorCfgMode(Enum):
     USE_CUSTOM_COLOR_RANGE = 3
 
 
-def sampleColor(
+def sampleColors(
     mode: ColorCfgMode,
     rng: np.random.Generator,
+    size: int,
     color_names: List[str] = [],
     color_list: List[NDArray] = [],
     color_range: Tuple[NDArray, NDArray] = (np.zeros(3), np.ones(3)),
-) -> Optional[NDArray]:
+    units: Optional[NDArray] = None,
+) -> NDArray:
     """
-    Samples a random color using one of many options given by the user
+    Samples a batch of random colors using one of many options given by the
+    user, with a single draw from the random generator
 
     Parameters
     ----------
@@ -36,6 +190,8 @@ def sampleColor(
             The mode that will be used to sample colors
         rng: np.random.Generator
             The random generator used to make the sampling process
+        size: int
+            The number of colors to sample
         color_names: List[str]
             The list of color names names used to sample from, used only if
             using the USE_CUSTOM_COLOR_NAMES mode
@@ -45,42 +201,78 @@ def sampleColor(
         color_range: Tuple[NDArray, NDArray]
             Both the minimum and maximum RGB values to sample from, used only
             if using the USE_CUSTOM_COLOR_RANGE mode
+        units: Optional[NDArray]
+            Points of shape (size, 3) used instead of drawing from rng, to
+            cover the choices evenly across episodes (see sampleUnitPoints)
 
     Returns
     -------
-        Optional[NDArray]
-            A color sampled at random, or None in the worst case if something
-            went wrong during the sampling process
+        NDArray
+            The colors sampled, with shape (size, 3). Colors that couldn't be
+            sampled are given as NaN
     """
-    color_value: Optional[NDArray] = None
+    colors = np.full((size, 3), np.nan)
     if mode == ColorCfgMode.USE_RANDOM_FROM_LIBRARY:
-        color_value = COLORS_MAP[rng.choice(COLORS_NAMES)]
+        colors = COLORS_ARRAY[
+            chooseIndices(rng, len(COLORS_ARRAY), size, units)
+        ]
     elif mode == ColorCfgMode.USE_CUSTOM_COLOR_NAMES:
         assert len(color_names) > 0, "Not enough color names provided"
-        color_name = rng.choice(color_names)
-        if color_name not in COLORS_MAP:
+        library_idxs = np.array(
+            [COLORS_INDEX.get(name, -1) for name in color_names]
+        )[chooseIndices(rng, len(color_names), size, units)]
+        found = library_idxs >= 0
+        colors[found] = COLORS_ARRAY[library_idxs[found]]
+        if not found.all():
             warnings.warn(
                 (
-                    "Tried to pick a color name ('{}') that is not"
+                    "Tried to pick color names ({}) that are not"
                     + " in the default colors library"
-                ).format(color_name)
+                ).format(
+                    [name for name in color_names if name not in COLORS_INDEX]
+                )
             )
-        else:
-            color_value = COLORS_MAP[color_name]
     elif mode == ColorCfgMode.USE_CUSTOM_COLOR_VALUES:
         assert len(color_list) > 0, "Not enough colors provided in list"
-        color_value = rng.choice(color_list)
+        colors = np.asarray(color_list, dtype=np.float64)[
+            chooseIndices(rng, len(color_list), size, units)
+        ]
     elif mode == ColorCfgMode.USE_CUSTOM_COLOR_RANGE:
         assert len(color_range) == 2, "Color range must be in format (low,high)"
         try:
-            color_value = rng.uniform(low=color_range[0], high=color_range[1])
+            colors = uniformValues(
+                rng, color_range[0], color_range[1], size, units
+            )
         except ValueError:
             warnings.warn(
                 "Something went wrong while using the"
                 + f" given color ranges. Range given is '{color_range}'"
             )
 
-    return color_value
+    return colors
+
+
+def sampleColor(
+    mode: ColorCfgMode,
+    rng: np.random.Generator,
+    color_names: List[str] = [],
+    color_list: List[NDArray] = [],
+    color_range: Tuple[NDArray, NDArray] = (np.zeros(3), np.ones(3)),
+) -> Optional[NDArray]:
+    """
+    Samples a random color using one of many options given by the user (see
+    sampleColors for the parameters)
+
+    Returns
+    -------
+        Optional[NDArray]
+            A color sampled at random, or None in the worst case if something
+            went wrong during the sampling process
+    """
+    color_value = sampleColors(
+        mode, rng, 1, color_names, color_list, color_range
+    )[0]
+    return None if np.isnan(color_value).any() else color_value
 
 
 class ScaleCfgMode(Enum):
@@ -92,14 +284,17 @@ class ScaleCfgMode(Enum):
     USE_CUSTOM_SCALE_VALUES = 2
 
 
-def sampleScale(
+def sampleScales(
     mode: ScaleCfgMode,
     rng: np.random.Generator,
+    size: int,
     scale_range: Tuple[float, float] = (0.75, 1.25),
     scale_list: List[float] = [],
-) -> Optional[float]:
+    units: Optional[NDArray] = None,
+) -> NDArray:
     """
-    Samples a random scale value using one of many options given by the user
+    Samples a batch of random scale values using one of many options given by
+    the user, with a single draw from the random generator
 
     Parameters
     ----------
@@ -107,26 +302,33 @@ def sampleScale(
             The mode that will be used to sample scale values
         rng: np.random.Generator
             The random generator used to make the sampling process
+        size: int
+            The number of scale values to sample
         scale_range: Tuple[float, float]
             The minimum and maximum scale values to sample from, used only if
             using the USE_CUSTOM_SCALE_RANGE mode
         scale_list: List[float]
             The list of scale values from which to sample from, used only if
             using the USE_CUSTOM_SCALE_VALUES mode
+        units: Optional[NDArray]
+            Points of shape (size, 1) used instead of drawing from rng, to
+            cover the choices evenly across episodes (see sampleUnitPoints)
 
     Returns
     -------
-        Optional[float]
-            A scale value sampled at random, or None in the worst case if
-            something went wrong during the sampling process
+        NDArray
+            The scale values sampled, with shape (size,). Values that couldn't
+            be sampled are given as NaN
     """
-    scale_value: Optional[float] = None
+    scales = np.full(size, np.nan)
     if mode == ScaleCfgMode.USE_DEFAULT_SCALE_RANGE:
-        scale_value = rng.uniform(0.0, 1.0)
+        scales = uniformValues(rng, 0.0, 1.0, size, units)
     elif mode == ScaleCfgMode.USE_CUSTOM_SCALE_RANGE:
         assert len(scale_range) == 2, "Scale range must be in format (low,high)"
         try:
-            scale_value = rng.uniform(low=scale_range[0], high=scale_range[1])
+            scales = uniformValues(
+                rng, scale_range[0], scale_range[1], size, units
+            )
         except ValueError:
             warnings.warn(
                 "Something went wrong while using the"
@@ -134,9 +336,31 @@ def sampleScale(
             )
     elif mode == ScaleCfgMode.USE_CUSTOM_SCALE_VALUES:
         assert len(scale_list) > 0, "Not enough scales provided in list"
-        scale_value = rng.choice(scale_list)
+        scales = np.asarray(scale_list, dtype=np.float64)[
+            chooseIndices(rng, len(scale_list), size, units)
+        ]
 
-    return scale_value
+    return scales
+
+
+def sampleScale(
+    mode: ScaleCfgMode,
+    rng: np.random.Generator,
+    scale_range: Tuple[float, float] = (0.75, 1.25),
+    scale_list: List[float] = [],
+) -> Optional[float]:
+    """
+    Samples a random scale value using one of many options given by the user
+    (see sampleScales for the parameters)
+
+    Returns
+    -------
+        Optional[float]
+            A scale value sampled at random, or None in the worst case if
+            something went wrong during the sampling process
+    """
+    scale_value = sampleScales(mode, rng, 1, scale_range, scale_list)[0]
+    return None if np.isnan(scale_value) else float(scale_value)
 
 
 def safeGetValue(config: DictConfig, key: str, default: Any) -> Any:
@@ -159,3 +383,126 @@ def safeGetValue(config: DictConfig, key: str, default: Any) -> Any:
             The value for the requested key, or the given default if not found
     """
     return config[key] if key in config else default
+
+
+def getTableTop(
+    pyrep: PyRep,
+    table_name: str = DEFAULT_TABLE_NAME,
+    table_top_name: str = DEFAULT_TABLE_TOP_NAME,
+) -> Optional[Shape]:
+    """
+    Returns the shape of the table top, splitting it from the table the first
+    time it's requested. The table is a compound shape whose first part is the
+    table top, so it's ungrouped once, the table top is kept as a shape on its
+    own, and the remaining parts are grouped back under the table's name. This
+    way the table variations can modify the table top directly on every
+    episode, without having to ungroup and regroup the whole table
+
+    Parameters
+    ----------
+        pyrep: PyRep
+            A handle to the pyrep simulation
+        table_name: str
+            The name of the (compound) shape of the table
+        table_top_name: str
+            The name given to the shape of the table top once it's split
+
+    Returns
+    -------
+        Optional[Shape]
+            The table top, or None if the table couldn't be found
+    """
+    if Object.exists(table_top_name):
+        return Shape(table_top_name)
+    if not Object.exists(table_name):
+        return None
+
+    table_parts = Shape(table_name).ungroup()
+    if len(table_parts) < 2:
+        # Not a compound shape, so the whole table is the table top
+        return table_parts[0]
+
+    table_top, table_rest = table_parts[0], table_parts[1:]
+    table_top.set_name(table_top_name)
+    if len(table_rest) > 1:
+        table_rest = [pyrep.group_objects(table_rest)]
+    table_rest[0].set_name(table_name)
+    return table_top
+
+
+def sliceParams(params: Dict[str, NDArray], idx: int) -> Dict[str, NDArray]:
+    """
+    Selects the parameters of a single episode from the parameters sampled for
+    many episodes (see IVariation.sample_params)
+
+    Parameters
+    ----------
+        params: Dict[str, NDArray]
+            A map from parameter name to an array with the values for each
+            episode along the first axis
+        idx: int
+            The index of the episode to select
+
+    Returns
+    -------
+        Dict[str, NDArray]
+            A map from parameter name to the values for the selected episode
+    """
+    return {key: values[idx] for key, values in params.items()}
+
+
+def sampleTargetsParams(
+    sampler: Callable[[int, Optional[NDArray]], NDArray],
+    n: int,
+    num_targets: int,
+    same: bool,
+    shape: Tuple[int, ...] = (),
+    rng: Optional[np.random.Generator] = None,
+    sampling: SamplingMode = SamplingMode.IID,
+    unit_dims: int = 1,
+) -> NDArray:
+    """
+    Samples a value for each target of a variation over a number of episodes,
+    with a single call to a batched sampler. Values are drawn in the same order
+    as when sampling one episode and target at a time, and values the sampler
+    couldn't produce are left as NaN
+
+    Parameters
+    ----------
+        sampler: Callable[[int, Optional[NDArray]], NDArray]
+            A function that returns a batch of random values, given the number
+            of values and, optionally, points in the unit hypercube of shape
+            (size, unit_dims) to use instead of drawing random numbers
+        n: int
+            The number of episodes to sample values for
+        num_targets: int
+            The number of targets of the variation
+        same: bool
+            Whether all targets get the same value on each episode
+        shape: Tuple[int, ...]
+            The shape of a single value (e.g. (3,) for RGB colors)
+        rng: Optional[np.random.Generator]
+            The random generator used to place the points of the sampling mode
+        sampling: SamplingMode
+            How the values are spread across the episodes
+        unit_dims: int
+            The number of dimensions of the points given to the sampler
+
+    Returns
+    -------
+        NDArray
+            An array of shape (n, num_targets, *shape) with the sampled values
+    """
+    num_values = 1 if same else num_targets
+    units: Optional[NDArray] = None
+    if sampling != SamplingMode.IID and rng is not None:
+        units = sampleUnitPoints(
+            rng, sampling, n, num_values * unit_dims
+        ).reshape(n * num_values, unit_dims)
+
+    values = np.asarray(
+        sampler(n * num_values, units), dtype=np.float64
+    ).reshape((n, num_values) + shape)
+    if same:
+        values = np.broadcast_to(values, (n, num_targets) + shape).copy()
+    return values
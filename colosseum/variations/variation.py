@@ -1,19 +1,35 @@
 import abc
 import warnings
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 from numpy.random import default_rng
+from numpy.typing import NDArray
 from pyrep import PyRep
 from pyrep.const import ObjectType
 from pyrep.objects.object import Object
 
+from colosseum.variations.utils import SamplingMode, sliceParams
+
 
 class IVariation(abc.ABC):
-    """Interface for variation factors in the simulation."""
+    """
+    Interface for variation factors in the simulation. The random values used
+    by a variation are sampled separately from being applied into the
+    simulation, so the values for a whole run can be sampled (and inspected,
+    saved or shipped to workers) ahead of time. Parameters are given as a map
+    from parameter name to an array with the episodes along the first axis
+    """
 
     DEFAULT_VARIATION_NAME = "variation"
     DEFAULT_VARIATION_COUNT = 0
 
+    # Whether unchanged values can be skipped (see `setSkipUnchanged`). Only
+    # safe for targets that nothing but this variation modifies: objects of
+    # the task are restored by RLBench on every reset, and the init_episode of
+    # the task (which runs after the variations) may modify them as well
+    CAN_SKIP_UNCHANGED = False
+
     def __init__(
         self,
         pyrep: PyRep,
@@ -49,6 +65,21 @@ class IVariation(abc.ABC):
 
         self._rng = default_rng(self._seed)
         self._enabled = False
+        self._next_params: Optional[Dict[str, NDArray]] = None
+        self._applied_params: Optional[Dict[str, NDArray]] = None
+
+        # How continuous values are spread across episodes, and how many
+        # episodes are sampled together so that the spread is noticeable
+        self._sampling = SamplingMode.IID
+        self._sampling_count = 1
+        self._sampled_params: Optional[Dict[str, NDArray]] = None
+        self._sampled_idx = 0
+
+        # Last values set into the simulation, used to skip redundant calls
+        self._skip_unchanged = self.CAN_SKIP_UNCHANGED
+        self._last_applied: Dict[str, NDArray] = {}
+        self._num_applied = 0
+        self._num_skipped = 0
 
         objects_available = self._pyrep.get_objects_in_tree(
             object_type=self._targets_type
@@ -79,6 +110,60 @@ class IVariation(abc.ABC):
         """
         self._enabled = value
 
+    def setSkipUnchanged(self, value: bool) -> None:
+        """
+        Enable or disable skipping the simulator calls for targets whose values
+        didn't change since the last time they were applied. Skipping can't be
+        enabled for variations whose targets may be modified by the scene or
+        the task (see CAN_SKIP_UNCHANGED)
+
+        Parameters
+        ----------
+            value: bool
+                The value to set the skip flag to
+        """
+        if value and not self.CAN_SKIP_UNCHANGED:
+            warnings.warn(
+                f"IVariation > variation '{self._name}' can't skip unchanged "
+                + "values, as its targets may be modified on reset"
+            )
+            value = False
+        self._skip_unchanged = value
+        self._last_applied.clear()
+
+    def setSampling(self, mode: SamplingMode, count: int = 1) -> None:
+        """
+        Sets how the continuous values of this variation are spread across
+        episodes. Low discrepancy modes only cover the space evenly over
+        batches of episodes, so `count` episodes are sampled at once and then
+        consumed one at a time when randomizing
+
+        Parameters
+        ----------
+            mode: SamplingMode
+                The sampling mode used by sample_params
+            count: int
+                The number of episodes sampled together when randomizing
+        """
+        self._sampling = mode
+        self._sampling_count = max(int(count), 1)
+        self._sampled_params = None
+        self._sampled_idx = 0
+
+    @property
+    def sampling(self) -> SamplingMode:
+        return self._sampling
+
+    @property
+    def num_applied(self) -> int:
+        """The number of values set into the simulation"""
+        return self._num_applied
+
+    @property
+    def num_skipped(self) -> int:
+        """The number of values skipped, as the simulation had them already"""
+        return self._num_skipped
+
     @property
     def enabled(self) -> bool:
         return self._enabled
@@ -87,13 +172,141 @@ class IVariation(abc.ABC):
     def name(self) -> str:
         return self._name
 
+    @property
+    def rng(self) -> np.random.Generator:
+        return self._rng
+
+    @property
+    def targets_names(self) -> List[str]:
+        """The names of the targets found, in the order used by parameters"""
+        return list(self._targets.keys())
+
+    @property
+    def applied_params(self) -> Optional[Dict[str, NDArray]]:
+        """The parameters applied in the current episode, if any"""
+        return self._applied_params
+
+    def clear_applied_params(self) -> None:
+        """Forgets the parameters applied in the previous episode"""
+        self._applied_params = None
+
     @abc.abstractmethod
-    def randomize(self) -> None:
+    def sample_params(
+        self, rng: np.random.Generator, n: int
+    ) -> Dict[str, NDArray]:
         """
-        Apply the factor's effect into the targets in the simulation
+        Samples the parameters of this variation for a number of episodes
+
+        Parameters
+        ----------
+            rng: np.random.Generator
+                The random generator used to make the sampling process
+            n: int
+                The number of episodes to sample parameters for
+
+        Returns
+        -------
+            Dict[str, NDArray]
+                A map from parameter name to an array with the values for each
+                episode along the first axis. Values that couldn't be sampled
+                are given as NaN, and are skipped when applied
         """
         ...
 
+    @abc.abstractmethod
+    def apply(self, params: Dict[str, NDArray]) -> None:
+        """
+        Applies the parameters of a single episode into the targets in the
+        simulation
+
+        Parameters
+        ----------
+            params: Dict[str, NDArray]
+                A map from parameter name to the values for this episode, as
+                returned by `sample_params` after selecting a single episode
+        """
+        ...
+
+    def _shouldApply(self, key: str, value: Any) -> bool:
+        """
+        Checks whether a value has to be set into the simulation, or if it's
+        the same value applied last time to the same target, and remembers it
+
+        Parameters
+        ----------
+            key: str
+                An identifier of the target (and property) the value is for
+            value: Any
+                The value about to be applied
+
+        Returns
+        -------
+            bool
+                True if the value must be applied, False if it can be skipped
+        """
+        value = np.asarray(value)
+        last_value = self._last_applied.get(key, None)
+        if (
+            self._skip_unchanged
+            and last_value is not None
+            and np.array_equal(last_value, value)
+        ):
+            self._num_skipped += 1
+            return False
+        self._last_applied[key] = value.copy()
+        self._num_applied += 1
+        return True
+
+    def asset_filenames(self) -> Dict[str, List[str]]:
+        """
+        Returns the filenames of the assets (e.g. textures or models) that the
+        parameters of this variation refer to by index, keyed by parameter
+        name, so recorded parameters can be matched to the same assets on other
+        machines (see manager.remapPlanAssets)
+        """
+        return {}
+
+    def set_next_params(self, params: Optional[Dict[str, NDArray]]) -> None:
+        """
+        Sets the parameters used the next time the variation is randomized,
+        instead of sampling new ones (e.g. parameters from a precomputed plan)
+
+        Parameters
+        ----------
+            params: Optional[Dict[str, NDArray]]
+                The parameters of a single episode, or None to sample them
+        """
+        self._next_params = params
+
+    def randomize(self) -> None:
+        """
+        Apply the factor's effect into the targets in the simulation, using
+        the parameters set for this episode if any, or sampling new ones
+        """
+        params = self._next_params
+        self._next_params = None
+        if params is None:
+            params = self.draw_params()
+        self.apply(params)
+        self._applied_params = params
+
+    def draw_params(self) -> Dict[str, NDArray]:
+        """
+        Returns the parameters of the next episode from the batch sampled
+        ahead, sampling a new batch of `sampling_count` episodes when needed.
+        These are the parameters randomize uses when none were set
+        """
+        if self._sampled_params is None or (
+            self._sampled_idx >= self._sampling_count
+        ):
+            self._sampled_params = self.sample_params(
+                self._rng, self._sampling_count
+            )
+            self._sampled_idx = 0
+        params = sliceParams(self._sampled_params, self._sampled_idx)
+        self._sampled_idx += 1
+        return params
+
     def on_init_episode(self) -> None:
         """
         Called when the episode is initialized
@@ -106,3 +319,11 @@ class IVariation(abc.ABC):
         Called when the simulation is advanced one step
         """
         pass
+
+    @property
+    def needs_step(self) -> bool:
+        """
+        Whether on_step_episode has to be called on the next simulation steps
+        of the current episode. By default, only if the variation overrides it
+        """
+        return type(self).on_step_episode is not IVariation.on_step_episode
@@ -16,6 +16,13 @@ setup(
             "collect_demo=colosseum.tools.collect_demo:main",
             "visualize_task=colosseum.tools.visualize_task:main",
             "dataset_generator=colosseum.tools.dataset_generator:main",
+            "dataset_catalog=colosseum.tools.dataset_catalog:main",
+            "compute_keyframes=colosseum.tools.compute_keyframes:main",
+            "dataset_stats=colosseum.tools.dataset_stats:main",
+            "convert_dataset=colosseum.tools.convert_dataset:main",
+            "validate_dataset=colosseum.tools.validate_dataset:main",
+            "preprocess_textures=colosseum.tools.preprocess_textures:main",
+            "preview_variations=colosseum.tools.preview_variations:main",
         ]
     },
 )